@@ -0,0 +1,176 @@
+# RFM Matrix - Batch Scoring Module
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, Any, Iterable
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import BATCH_SCORING_CONFIG
+
+from rfm_analysis import RFMAnalysis, load_models, segment_rule_lookup
+from scoring import assign_scores, rfm_group_code
+
+
+class BatchScorer:
+    """Applies saved churn and LTV models to new customer files in fixed-size chunks."""
+
+    def __init__(self, bundle: Dict[str, Any], chunk_size: int = None):
+        """
+        Initialize the scorer with a model bundle.
+
+        Args:
+            bundle: Model bundle as returned by rfm_analysis.load_models
+            chunk_size: Number of rows scored per chunk. Defaults to the configured size.
+        """
+        self.bundle = bundle
+        self.chunk_size = chunk_size or BATCH_SCORING_CONFIG['chunk_size']
+        self.mapping = bundle['column_mapping']
+        self.feature_columns = bundle['feature_columns']
+        self.n_tiles = bundle['n_tiles']
+
+        # Segment names only depend on the (r, f, m) scores, so resolve them once
+        self.segment_lookup = segment_rule_lookup(self.n_tiles)
+
+    @classmethod
+    def from_path(cls, model_path: str, chunk_size: int = None) -> 'BatchScorer':
+        """
+        Create a scorer from a saved model bundle.
+
+        Args:
+            model_path: Path of the bundle written by PredictiveAnalytics.save_models
+            chunk_size: Number of rows scored per chunk
+
+        Returns:
+            BatchScorer instance
+        """
+        return cls(load_models(model_path), chunk_size)
+
+    def score_chunk(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Score a chunk of customers with the saved models.
+
+        Args:
+            chunk: DataFrame with the columns of the original column mapping
+
+        Returns:
+            DataFrame with customer ID, churn probability and predicted LTV
+        """
+        rfm = RFMAnalysis(
+            chunk,
+            self.mapping['user_id'],
+            self.mapping['recency'],
+            self.mapping['frequency'],
+            self.mapping['monetary'],
+            self.bundle['segment_type']
+        )
+        data = rfm.preprocess_data()
+
+        # Assign scores with the breakpoints learned at training time
+        breakpoints = self.bundle['breakpoints']
+        features = pd.DataFrame(index=data.index)
+        features['r_score'] = assign_scores(data['recency_days'], breakpoints['recency'], reverse=True)
+        features['f_score'] = assign_scores(data[self.mapping['frequency']], breakpoints['frequency'])
+        features['m_score'] = assign_scores(data[self.mapping['monetary']], breakpoints['monetary'])
+        features['rfm_score'] = rfm_group_code(features['r_score'], features['f_score'], features['m_score'], self.n_tiles)
+        features['recency_days'] = data['recency_days']
+
+        # One-hot encode segments with the same columns the models were trained on
+        segments = features['rfm_score'].map(self.segment_lookup)
+        features = pd.concat([features, pd.get_dummies(segments, prefix='segment')], axis=1)
+        features = features.reindex(columns=self.feature_columns, fill_value=0)
+
+        return pd.DataFrame({
+            self.mapping['user_id']: data[self.mapping['user_id']].to_numpy(),
+            'churn_probability': self.bundle['churn_model'].predict_proba(features)[:, 1].astype(np.float32),
+            'predicted_ltv': self.bundle['ltv_model'].predict(features).astype(np.float64)
+        })
+
+    def output_schema(self) -> pa.Schema:
+        """
+        Get the schema of the scores written by score_file.
+        """
+        return pa.schema([
+            (self.mapping['user_id'], pa.string()),
+            ('churn_probability', pa.float32()),
+            ('predicted_ltv', pa.float64())
+        ])
+
+    def iter_chunks(self, input_path: str) -> Iterable[pd.DataFrame]:
+        """
+        Read a customer CSV file in fixed-size chunks, loading only the mapped columns.
+        """
+        return pd.read_csv(
+            input_path,
+            usecols=list(self.mapping.values()),
+            chunksize=self.chunk_size
+        )
+
+    def score_file(self, input_path: str, output_path: str) -> Dict[str, Any]:
+        """
+        Stream a customer file through the saved models and write the scores as Parquet.
+
+        Only one chunk is held in memory at a time, so memory use does not grow
+        with the size of the input file.
+
+        Args:
+            input_path: Path of the customer CSV file
+            output_path: Path of the Parquet file to write
+
+        Returns:
+            Dictionary with row count, elapsed time and throughput
+        """
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+        start = time.perf_counter()
+        rows = 0
+        writer = None
+
+        try:
+            for chunk in self.iter_chunks(input_path):
+                if chunk.empty:
+                    continue
+                scored = self.score_chunk(chunk)
+                table = pa.Table.from_pandas(scored, preserve_index=False)
+
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)
+
+                rows += len(scored)
+            if writer is None:
+                # No customers: still write the file the caller is told about, with the output schema
+                writer = pq.ParquetWriter(output_path, self.output_schema())
+        finally:
+            if writer is not None:
+                writer.close()
+
+        elapsed = time.perf_counter() - start
+
+        return {
+            'rows': rows,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(rows / elapsed, 1) if elapsed > 0 else None,
+            'chunk_size': self.chunk_size,
+            'output_file': output_path
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a customer file with saved churn and LTV models")
+    parser.add_argument("--model", required=True, help="Path of the saved model bundle")
+    parser.add_argument("--input", required=True, help="Customer CSV file to score")
+    parser.add_argument("--output", required=True, help="Parquet file to write")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Rows per chunk")
+    args = parser.parse_args()
+
+    scorer = BatchScorer.from_path(args.model, args.chunk_size)
+    stats = scorer.score_file(args.input, args.output)
+    print(f"Scored {stats['rows']} rows in {stats['elapsed_seconds']}s ({stats['rows_per_second']} rows/s) -> {stats['output_file']}")
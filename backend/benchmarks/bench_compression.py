@@ -0,0 +1,78 @@
+# RFM Matrix - Response Compression Benchmark
+#
+# Compresses /analyze-rfm shaped payloads (treemap data, segment stats and
+# per-customer churn predictions) of increasing size with every encoding
+# and level of CompressionMiddleware, reporting bytes on the wire and the
+# CPU time spent per response.
+#
+# Usage: python benchmarks/bench_compression.py
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compression import available_encodings
+import serialization
+
+SEGMENTS = ['Campeões', 'Clientes Fiéis', 'Potenciais Fiéis', 'Novos Clientes', 'Promissores',
+            'Precisam de Atenção', 'Prestes a Dormir', 'Clientes em Risco', 'Não Posso Perdê-los',
+            'Hibernando', 'Clientes Perdidos']
+
+# Encoding levels measured, the configured default first
+LEVELS = {'gzip': (6, 1, 9), 'br': (4, 1, 9), 'zstd': (3, 1, 9)}
+
+
+def build_payload(n_customers: int) -> bytes:
+    """
+    Build the JSON body of an analysis response with n_customers churn predictions.
+    """
+    rng = np.random.default_rng(42)
+    segments = rng.integers(0, len(SEGMENTS), n_customers)
+    return serialization.dumps({
+        'treemap_data': [{'segment': name, 'count': int((segments == i).sum())} for i, name in enumerate(SEGMENTS)],
+        'segment_stats': {name: {'recency': rng.random() * 365, 'frequency': rng.random() * 20,
+                                 'monetary': rng.random() * 1000} for name in SEGMENTS},
+        'churn_predictions': [
+            {'customer_id': f'cust_{i}', 'segment': SEGMENTS[s], 'recency': int(r), 'frequency': int(f),
+             'monetary': round(float(m), 2), 'churn_probability': float(p)}
+            for i, s, r, f, m, p in zip(range(n_customers), segments, rng.integers(0, 365, n_customers),
+                                        rng.integers(1, 50, n_customers), rng.gamma(2, 100, n_customers),
+                                        rng.random(n_customers))
+        ]
+    })
+
+
+def measure(factory, level: int, body: bytes, chunk_size: int = None, repeat: int = 3) -> tuple:
+    best = float('inf')
+    size = 0
+    for _ in range(repeat):
+        start = time.process_time()
+        compressor = factory(level)
+        if chunk_size is None:
+            size = len(compressor.compress(body)) + len(compressor.finish())
+        else:
+            # Streamed body, compressed chunk by chunk
+            size = sum(len(compressor.compress(body[i:i + chunk_size])) for i in range(0, len(body), chunk_size))
+            size += len(compressor.finish())
+        best = min(best, time.process_time() - start)
+    return best, size
+
+
+if __name__ == "__main__":
+    encodings = available_encodings()
+    print(f"{'customers':>10} {'body MB':>8} {'encoding':>9} {'level':>5} {'wire MB':>8} {'ratio':>6} "
+          f"{'CPU ms':>8} {'MB/s':>7} {'stream ms':>9}")
+    for n in (1_000, 10_000, 100_000, 500_000):
+        body = build_payload(n)
+        mb = len(body) / 1e6
+        for name, levels in LEVELS.items():
+            if name not in encodings:
+                continue
+            for level in levels:
+                seconds, size = measure(encodings[name], level, body)
+                stream_seconds, _ = measure(encodings[name], level, body, chunk_size=64 * 1024)
+                print(f"{n:>10} {mb:>8.2f} {name:>9} {level:>5} {size / 1e6:>8.3f} {len(body) / size:>6.1f} "
+                      f"{seconds * 1000:>8.1f} {mb / max(seconds, 1e-9):>7.0f} {stream_seconds * 1000:>9.1f}")
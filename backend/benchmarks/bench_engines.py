@@ -0,0 +1,97 @@
+# RFM Matrix - Analysis Engine Benchmark
+#
+# Runs the full RFM pipeline (preprocess, aggregate, score, segment,
+# summarize) with every analysis engine, in plain and time-decayed scoring
+# mode, on several transaction counts and prints a matrix of wall time and
+# peak memory. Each cell runs in a fresh process so peak RSS is not shared
+# between runs; the peak is read from /proc, so the benchmark runs on Linux.
+#
+# Usage: python benchmarks/bench_engines.py [transactions ...]
+
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_SIZES = [1_000_000, 5_000_000, 20_000_000]
+ENGINE_NAMES = ['pandas', 'polars']
+# Scoring modes by decay half-life in days (0 scores plain counts and sums)
+SCORING_MODES = {'plain': 0, 'decayed': 90}
+
+
+def build_transactions(n_transactions: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    n_customers = max(1, n_transactions // 20)
+    return pd.DataFrame({
+        'customer_id': pd.Categorical.from_codes(
+            rng.integers(0, n_customers, n_transactions),
+            categories=[f"cust_{i}" for i in range(n_customers)]
+        ),
+        'transaction_id': np.arange(n_transactions).astype(str),
+        'transaction_date': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 730 * 86400, n_transactions), unit='s'),
+        'transaction_amount': rng.gamma(2, 50, n_transactions).astype(np.float32)
+    })
+
+
+def read_status(field: str) -> int:
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) * 1024
+
+
+def run_cell(engine: str, mode: str, n_transactions: int) -> dict:
+    """
+    Run one engine in one scoring mode on one dataset size in this process.
+    """
+    from rfm_service import RFMAnalysisService
+
+    data = build_transactions(n_transactions)
+    gc.collect()
+
+    # Reset the RSS high-water mark so building the data is not counted (Linux only)
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+    baseline = read_status('VmRSS')
+
+    start = time.perf_counter()
+    summary = RFMAnalysisService(
+        data, engine=engine, decay_half_life=SCORING_MODES[mode]
+    ).perform_full_analysis(datetime(2025, 1, 1))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'seconds': elapsed,
+        'peak_mb': (read_status('VmHWM') - baseline) / 2 ** 20,
+        'customers': summary['total_customers']
+    }
+
+
+def main() -> None:
+    if len(sys.argv) == 5 and sys.argv[1] == '--cell':
+        print(json.dumps(run_cell(sys.argv[2], sys.argv[3], int(sys.argv[4]))))
+        return
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{'transactions':>14} {'engine':>8} {'scoring':>8} {'seconds':>9} {'extra peak MB':>14}")
+    for n_transactions in sizes:
+        for engine in ENGINE_NAMES:
+            for mode in SCORING_MODES:
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--cell', engine, mode, str(n_transactions)],
+                    capture_output=True, text=True, check=True
+                ).stdout
+                cell = json.loads(output.strip().splitlines()[-1])
+                print(f"{n_transactions:>14,} {engine:>8} {mode:>8} {cell['seconds']:>9.2f} {cell['peak_mb']:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
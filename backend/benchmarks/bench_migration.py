@@ -0,0 +1,52 @@
+# RFM Matrix - Segment Migration Benchmark
+#
+# Writes two scored-customer tables sharing 95% of their customers, then
+# times writing one table and computing the segment migration matrix.
+#
+# Usage: python benchmarks/bench_migration.py [customers]
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from customer_store import write_scored_customers
+from migration import migration_matrix
+
+SEGMENTS = ['Campeões', 'Clientes Fiéis', 'Clientes em Risco', 'Clientes Perdidos', 'Unknown']
+
+
+def build_customers(n_customers: int, first_id: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'monetary': rng.gamma(2, 50, n_customers),
+        'segment': pd.Categorical.from_codes(rng.integers(0, len(SEGMENTS), n_customers), categories=SEGMENTS)
+    }, index=pd.Index([f"cust_{i}" for i in range(first_id, first_id + n_customers)], name='customer_id'))
+
+
+def main() -> None:
+    n_customers = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    before = build_customers(n_customers, 0, 1)
+    after = build_customers(n_customers, n_customers // 20, 2)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        before_path = os.path.join(temp_dir, 'before.parquet')
+        after_path = os.path.join(temp_dir, 'after.parquet')
+
+        start = time.perf_counter()
+        write_scored_customers(before, before_path)
+        print(f"write {n_customers:,} customers: {time.perf_counter() - start:6.2f} s")
+        write_scored_customers(after, after_path)
+
+        start = time.perf_counter()
+        result = migration_matrix(before_path, after_path)
+        print(f"migration matrix:        {time.perf_counter() - start:6.2f} s")
+        print(f"retained {result['retained_customers']:,}, new {result['new_customers']:,}, lost {result['lost_customers']:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# RFM Matrix - Parallel Aggregation Benchmark
+#
+# Measures how hash-partitioned, shared-memory RFM aggregation scales with the
+# number of worker processes (1, 2, 4, 8, 16 and 32), against the
+# single-process groupby of RFMAnalysisService.calculate_rfm.
+#
+# Usage: python benchmarks/bench_parallel_aggregation.py [transactions] [customers]
+
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rfm_service import RFMAnalysisService
+from parallel_aggregation import parallel_calculate_rfm
+
+WORKER_COUNTS = [1, 2, 4, 8, 16, 32]
+
+
+def build_transactions(n_transactions: int, n_customers: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    customer_ids = pd.Categorical.from_codes(
+        rng.integers(0, n_customers, n_transactions),
+        categories=[f"cust_{i}" for i in range(n_customers)]
+    )
+    return pd.DataFrame({
+        'customer_id': customer_ids,
+        'transaction_id': np.arange(n_transactions),
+        'transaction_date': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 730 * 86400, n_transactions), unit='s'),
+        'transaction_amount': rng.gamma(2, 50, n_transactions).astype(np.float32)
+    })
+
+
+def main() -> None:
+    n_transactions = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000_000
+    n_customers = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    analysis_date = datetime(2025, 1, 1)
+
+    data = build_transactions(n_transactions, n_customers)
+    print(f"{n_transactions:,} transactions, {n_customers:,} customers, {os.cpu_count()} CPUs")
+
+    service = RFMAnalysisService(data, n_workers=1)
+    start = time.perf_counter()
+    expected = service.calculate_rfm(analysis_date)
+    serial = time.perf_counter() - start
+    print(f"{'groupby (1 process)':>22}: {serial:8.2f} s")
+
+    baseline = None
+    for n_workers in WORKER_COUNTS:
+        start = time.perf_counter()
+        result = parallel_calculate_rfm(data, analysis_date, n_workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+
+        pd.testing.assert_frame_equal(result.sort_index(), expected.sort_index())
+        print(f"{n_workers:>14} workers: {elapsed:8.2f} s  speedup x{baseline / elapsed:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
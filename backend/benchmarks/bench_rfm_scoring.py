@@ -0,0 +1,88 @@
+# RFM Matrix - RFM Scoring Benchmark
+#
+# Compares the previous score assignment (categorical quartiles concatenated
+# into string rfm_group values, rules matched on strings) with int8 scores,
+# integer-coded rfm_group and rules resolved once per score cell.
+#
+# Usage: python benchmarks/bench_rfm_scoring.py [customers]
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rfm_service import RFMAnalysisService, RFM_SEGMENTS
+
+SCORE_COLUMNS = ['r_quartile', 'f_quartile', 'm_quartile', 'rfm_score', 'rfm_group', 'segment']
+
+
+def build_rfm(n_customers: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    return pd.DataFrame({
+        'recency': rng.integers(0, 730, n_customers),
+        'frequency': rng.poisson(5, n_customers) + rng.random(n_customers),
+        'monetary': rng.gamma(2, 100, n_customers),
+    })
+
+
+def previous_scoring(rfm: pd.DataFrame) -> pd.DataFrame:
+    scores = rfm.copy()
+    scores['r_quartile'] = pd.qcut(scores['recency'], q=4, labels=[4, 3, 2, 1])
+    scores['f_quartile'] = pd.qcut(scores['frequency'], q=4, labels=[4, 3, 2, 1])
+    scores['m_quartile'] = pd.qcut(scores['monetary'], q=4, labels=[4, 3, 2, 1])
+    scores['rfm_score'] = (
+        scores['r_quartile'].astype(int) * 100 +
+        scores['f_quartile'].astype(int) * 10 +
+        scores['m_quartile'].astype(int)
+    )
+    scores['rfm_group'] = (
+        scores['r_quartile'].astype(str) +
+        scores['f_quartile'].astype(str) +
+        scores['m_quartile'].astype(str)
+    )
+
+    segmented = scores.copy()
+    segmented['segment'] = 'Unknown'
+    for segment_name, rules in RFM_SEGMENTS.items():
+        segment_mask = pd.Series(False, index=segmented.index)
+        for rule in rules:
+            condition = pd.Series(True, index=segmented.index)
+            for metric, values in rule.items():
+                if metric in ('rfm_score', 'rfm_group'):
+                    values = values if isinstance(values, list) else [values]
+                    condition &= segmented[metric].isin(values)
+                elif isinstance(values, dict):
+                    if 'min' in values:
+                        condition &= (segmented[metric].astype(int) >= values['min'])
+                    if 'max' in values:
+                        condition &= (segmented[metric].astype(int) <= values['max'])
+                else:
+                    condition &= (segmented[metric].astype(int) == values)
+            segment_mask |= condition
+        segmented.loc[segment_mask, 'segment'] = segment_name
+    return segmented
+
+
+def current_scoring(rfm: pd.DataFrame) -> pd.DataFrame:
+    service = RFMAnalysisService(pd.DataFrame())
+    service.rfm_df = rfm
+    service.assign_rfm_scores()
+    return service.assign_segments()
+
+
+if __name__ == "__main__":
+    n_customers = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    rfm = build_rfm(n_customers)
+
+    print(f"{n_customers} customers")
+    print(f"{'scoring':>10} {'seconds':>9} {'bytes/customer':>15}")
+    for name, fn in (("previous", previous_scoring), ("current", current_scoring)):
+        start = time.perf_counter()
+        segmented = fn(rfm)
+        elapsed = time.perf_counter() - start
+        per_customer = segmented[SCORE_COLUMNS].memory_usage(deep=True, index=False).sum() / n_customers
+        print(f"{name:>10} {elapsed:>9.2f} {per_customer:>15.1f}")
+        del segmented
@@ -0,0 +1,84 @@
+# RFM Matrix - Serialization Benchmark
+#
+# Compares the stdlib encoder used previously (json.dumps with indent=2 after
+# converting NumPy values) with the shared serialization layer on analysis
+# summaries of increasing size.
+#
+# Usage: python benchmarks/bench_serialization.py
+
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import serialization
+
+
+def build_summary(n_customers: int) -> dict:
+    """
+    Build an analysis result shaped like the stored results, with one
+    page of per-customer rows holding NumPy scalars.
+    """
+    rng = np.random.default_rng(42)
+    segments = [f"segment_{i}" for i in range(11)]
+
+    return {
+        "summary": {
+            "total_customers": np.int64(n_customers),
+            "total_revenue": np.float64(rng.gamma(2, 100, n_customers).sum()),
+            "segment_distribution": {
+                name: {
+                    "count": np.int64(rng.integers(1, n_customers)),
+                    "percentage": np.float64(rng.random() * 100),
+                    "avg_recency": np.float64(rng.random() * 365),
+                    "avg_frequency": np.float64(rng.random() * 20),
+                    "avg_monetary": np.float64(rng.random() * 1000),
+                }
+                for name in segments
+            },
+        },
+        "customers": [
+            {
+                "customer_id": int(i),
+                "recency": np.int64(r),
+                "frequency": np.int64(f),
+                "monetary": np.float64(m),
+                "churn_probability": np.float32(p),
+                "segment": segments[i % len(segments)],
+            }
+            for i, r, f, m, p in zip(
+                range(n_customers),
+                rng.integers(0, 365, n_customers),
+                rng.integers(1, 50, n_customers),
+                rng.gamma(2, 100, n_customers),
+                rng.random(n_customers),
+            )
+        ],
+    }
+
+
+def stdlib_dumps(obj) -> bytes:
+    return json.dumps(obj, indent=2, default=serialization._default).encode("utf-8")
+
+
+def measure(fn, obj, repeat: int = 3) -> tuple:
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(fn(obj))
+        best = min(best, time.perf_counter() - start)
+    return best, size
+
+
+if __name__ == "__main__":
+    print(f"{'customers':>10} {'encoder':>14} {'seconds':>9} {'MB':>8} {'MB/s':>8}")
+    for n in (1_000, 10_000, 100_000, 500_000):
+        obj = build_summary(n)
+        for name, fn in (("json indent=2", stdlib_dumps), ("serialization", serialization.dumps)):
+            seconds, size = measure(fn, obj)
+            mb = size / 1e6
+            print(f"{n:>10} {name:>14} {seconds:>9.3f} {mb:>8.2f} {mb / seconds:>8.1f}")
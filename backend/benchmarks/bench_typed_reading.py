@@ -0,0 +1,82 @@
+# RFM Matrix - Typed CSV Reading Benchmark
+#
+# Compares the previous load path (pd.read_csv with inferred dtypes, then
+# pd.to_datetime on every column named like a date) with schema-aware typed
+# reading (usecols, declared dtypes, date format inferred once from a sample).
+#
+# Usage: python benchmarks/bench_typed_reading.py [rows]
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ingestion import TRANSACTION_SCHEMA, read_typed_csv
+
+
+def write_transactions(path: str, n_rows: int) -> None:
+    """
+    Write a transaction CSV with the required columns plus unused ones.
+    """
+    rng = np.random.default_rng(42)
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365 * 24 * 3600, n_rows), unit="s")
+    pd.DataFrame({
+        "customer_id": rng.integers(0, n_rows // 10, n_rows),
+        "transaction_id": np.arange(n_rows),
+        "transaction_date": dates.strftime("%d/%m/%Y %H:%M:%S"),
+        "transaction_amount": rng.gamma(2, 100, n_rows).round(2),
+        "product_name": rng.choice(["camiseta", "calça", "tênis", "boné", "meia"], n_rows),
+        "store": rng.choice([f"loja_{i}" for i in range(50)], n_rows),
+        "updated_time": dates.strftime("%Y-%m-%d %H:%M:%S"),
+        "notes": "sem observações",
+    }).to_csv(path, index=False)
+
+
+def previous_path(path: str) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    for col in df.columns:
+        if "date" in col.lower() or "time" in col.lower():
+            try:
+                df[col] = pd.to_datetime(df[col], dayfirst=True)
+            except Exception:
+                pass
+    df["transaction_amount"] = pd.to_numeric(df["transaction_amount"], errors="coerce")
+    return df
+
+
+def typed_path(path: str) -> pd.DataFrame:
+    part = {"kind": "csv", "path": path, "name": path, "compression": None}
+    return read_typed_csv(part, TRANSACTION_SCHEMA)
+
+
+def measure(fn, path: str) -> tuple:
+    # Time without tracing, then measure peak allocations in a second run
+    start = time.perf_counter()
+    df = fn(path)
+    elapsed = time.perf_counter() - start
+    frame = df.memory_usage(deep=True).sum()
+    del df
+
+    tracemalloc.start()
+    fn(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, frame
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "transactions.csv")
+        write_transactions(path, n_rows)
+        print(f"{n_rows} rows, {os.path.getsize(path) / 1e6:.1f} MB on disk")
+        print(f"{'path':>10} {'seconds':>9} {'peak MB':>9} {'frame MB':>9}")
+        for name, fn in (("previous", previous_path), ("typed", typed_path)):
+            elapsed, peak, frame = measure(fn, path)
+            print(f"{name:>10} {elapsed:>9.2f} {peak / 1e6:>9.1f} {frame / 1e6:>9.1f}")
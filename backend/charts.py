@@ -0,0 +1,59 @@
+# RFM Matrix - Chart Payloads Module
+
+import os
+import sys
+from functools import lru_cache
+from typing import Dict, Any, Tuple
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import CHART_CACHE_CONFIG
+
+import serialization
+
+# Charts materialized when an analysis completes
+CHART_NAMES = ('treemap', 'polar_area', 'segment_stats', 'churn_histogram', 'ltv_histogram')
+
+
+def write_chart_payloads(payloads: Dict[str, Any], path: str) -> None:
+    """
+    Store the chart payloads of an analysis as one JSON document.
+
+    Args:
+        payloads: Chart name -> chart-ready data
+        path: Destination file
+    """
+    serialization.dump(payloads, path)
+
+
+@lru_cache(maxsize=CHART_CACHE_CONFIG['max_entries'])
+def _load_chart_payloads(path: str, version: int) -> Tuple[bytes, Dict[str, bytes]]:
+    # Keyed by modification time, so a rewritten file is read again
+    with open(path, 'rb') as f:
+        document = f.read()
+    charts = {name: serialization.dumps(payload) for name, payload in serialization.loads(document).items()}
+    return document, charts
+
+
+def load_chart_payload(path: str, chart: str = None) -> bytes:
+    """
+    Get stored chart payloads as JSON, ready to be sent.
+
+    Payloads are kept serialized in a small in-process LRU cache, so
+    repeated dashboard loads neither read the file nor encode JSON.
+
+    Args:
+        path: File written by write_chart_payloads
+        chart: Name of one chart; None for all of them
+
+    Returns:
+        JSON document
+
+    Raises:
+        FileNotFoundError: If no charts are stored at path
+        KeyError: If the chart is not stored
+    """
+    document, charts = _load_chart_payloads(path, os.stat(path).st_mtime_ns)
+    if chart is None:
+        return document
+    return charts[chart]
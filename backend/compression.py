@@ -0,0 +1,223 @@
+# RFM Matrix - Response Compression Module
+
+import os
+import sys
+import zlib
+from typing import Callable, Dict, List, Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional encoding
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional encoding
+    zstandard = None
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import COMPRESSION_CONFIG
+
+# Content types worth compressing; Parquet, images and archives are compressed already
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml',
+                      'application/vnd.apache.arrow')
+
+
+class _Compressor:
+    """Streaming compressor: compress() returns what is ready, finish() the rest."""
+
+    def __init__(self, compress: Callable[[bytes], bytes], finish: Callable[[], bytes]):
+        self.compress = compress
+        self.finish = finish
+
+
+def _gzip(level: int) -> _Compressor:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return _Compressor(compressor.compress, compressor.flush)
+
+
+def _brotli(level: int) -> _Compressor:
+    compressor = brotli.Compressor(quality=level)
+    return _Compressor(compressor.process, compressor.finish)
+
+
+def _zstd(level: int) -> _Compressor:
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    return _Compressor(compressor.compress, compressor.flush)
+
+
+def available_encodings() -> Dict[str, Callable[[int], _Compressor]]:
+    """
+    Get the supported content codings, most preferred first.
+
+    zstd and br need the zstandard and brotli packages; gzip is always available.
+    """
+    encodings = {}
+    if zstandard is not None:
+        encodings['zstd'] = _zstd
+    if brotli is not None:
+        encodings['br'] = _brotli
+    encodings['gzip'] = _gzip
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: Optional[str], encodings: List[str]) -> Optional[str]:
+    """
+    Choose a content coding from an Accept-Encoding header.
+
+    The coding with the highest q-value wins; ties go to the order of
+    encodings. Codings with q=0 are refused, and '*' stands for any coding
+    not listed.
+
+    Args:
+        accept_encoding: Accept-Encoding header value
+        encodings: Supported codings, most preferred first
+
+    Returns:
+        Chosen coding, or None to send the response uncompressed
+    """
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with zstd, brotli or gzip, as negotiated with the client.
+
+    Responses smaller than minimum_size, already encoded, partial (206) or
+    of a content type that does not compress are sent as they are. Bodies
+    sent in one message are compressed in a worker thread once they reach
+    threadpool_min_size, so large payloads do not block the event loop;
+    streamed bodies are compressed chunk by chunk as they are sent.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = None, levels: Dict[str, int] = None,
+                 threadpool_min_size: int = None) -> None:
+        self.app = app
+        self.minimum_size = COMPRESSION_CONFIG['minimum_size'] if minimum_size is None else minimum_size
+        self.levels = {**COMPRESSION_CONFIG['levels'], **(levels or {})}
+        self.threadpool_min_size = (COMPRESSION_CONFIG['threadpool_min_size']
+                                    if threadpool_min_size is None else threadpool_min_size)
+        self.encodings = {
+            name: factory for name, factory in available_encodings().items()
+            if name in COMPRESSION_CONFIG['encodings']
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding'), list(self.encodings))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding)
+        await self.app(scope, receive, responder.wrap(send))
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self.start_message: Message = {}
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+        self.started = False
+
+    def wrap(self, send: Send) -> Send:
+        async def send_compressed(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                # Held back until the first body chunk tells whether to compress
+                self.start_message = message
+                self.passthrough = not self._compressible(Headers(raw=message['headers']), message['status'])
+                return
+            if message['type'] != 'http.response.body':
+                await send(message)
+                return
+
+            if self.passthrough:
+                if not self.started:
+                    await self._start(send)
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+            if not self.started:
+                if not more_body and len(body) < self.middleware.minimum_size:
+                    await self._start(send)
+                    await send(message)
+                    return
+
+                self.compressor = self.middleware.encodings[self.encoding](self.middleware.levels[self.encoding])
+                headers = MutableHeaders(raw=self.start_message['headers'])
+                headers['content-encoding'] = self.encoding
+                headers.add_vary_header('accept-encoding')
+                if 'etag' in headers and not headers['etag'].startswith('W/'):
+                    # The encoded body is another representation; a weak ETag still validates If-None-Match
+                    headers['etag'] = 'W/' + headers['etag']
+                if 'accept-ranges' in headers:
+                    # Ranges are served on the identity encoding only
+                    del headers['accept-ranges']
+
+                if not more_body:
+                    body = await self._compress_all(body)
+                    headers['content-length'] = str(len(body))
+                    await self._start(send)
+                    await send({'type': 'http.response.body', 'body': body})
+                    return
+                del headers['content-length']
+                await self._start(send)
+
+            chunk = self.compressor.compress(body)
+            if not more_body:
+                chunk += self.compressor.finish()
+            if chunk or not more_body:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': more_body})
+
+        return send_compressed
+
+    def _compressible(self, headers: Headers, status: int) -> bool:
+        if status < 200 or status in (204, 206, 304) or 'content-encoding' in headers:
+            return False
+        content_type = headers.get('content-type', '')
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def _start(self, send: Send) -> None:
+        self.started = True
+        await send(self.start_message)
+
+    async def _compress_all(self, body: bytes) -> bytes:
+        def compress() -> bytes:
+            return self.compressor.compress(body) + self.compressor.finish()
+
+        if len(body) >= self.middleware.threadpool_min_size:
+            return await anyio.to_thread.run_sync(compress)
+        return compress()
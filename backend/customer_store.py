@@ -0,0 +1,291 @@
+# RFM Matrix - Customer Store Module
+
+import functools
+import io
+import operator
+import os
+import sys
+from typing import Dict, Any, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import CUSTOMER_STORE_CONFIG
+
+# Formats of streamed customer exports and their content types
+EXPORT_FORMATS = {
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+    'csv': 'text/csv'
+}
+
+
+def write_customer_table(df: pd.DataFrame, path: str) -> Dict[str, Any]:
+    """
+    Persist a per-customer table as Parquet so it can be paged or downloaded later.
+
+    Args:
+        df: DataFrame with one row per customer
+        path: Destination Parquet file
+
+    Returns:
+        Dictionary with the number of rows and the file written
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(table, path, row_group_size=CUSTOMER_STORE_CONFIG['row_group_size'])
+
+    return {'rows': table.num_rows, 'file': path}
+
+
+def read_customer_page(path: str, offset: int = 0, limit: int = 1000) -> Dict[str, Any]:
+    """
+    Read one page of a stored customer table.
+
+    Only the row groups overlapping the requested page are read from disk,
+    so the cost of a page does not depend on the size of the table.
+
+    Args:
+        path: Parquet file written by write_customer_table
+        offset: Index of the first customer to return
+        limit: Maximum number of customers to return
+
+    Returns:
+        Dictionary with the page of customers and paging information
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Customer table not found: {path}")
+
+    limit = max(0, min(limit, CUSTOMER_STORE_CONFIG['max_page_size']))
+    offset = max(0, offset)
+
+    parquet_file = pq.ParquetFile(path)
+    total = parquet_file.metadata.num_rows
+    end = min(offset + limit, total)
+
+    # Find the row groups covering [offset, end)
+    row_groups = []
+    first_row = None
+    group_start = 0
+    for i in range(parquet_file.num_row_groups):
+        group_rows = parquet_file.metadata.row_group(i).num_rows
+        group_end = group_start + group_rows
+        if group_end > offset and group_start < end:
+            row_groups.append(i)
+            if first_row is None:
+                first_row = group_start
+        group_start = group_end
+
+    customers = []
+    if row_groups:
+        table = parquet_file.read_row_groups(row_groups)
+        customers = table.slice(offset - first_row, end - offset).to_pylist()
+
+    return {
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'next_offset': end if end < total else None,
+        'customers': customers
+    }
+
+
+def customer_keys(customer_ids: pd.Index) -> np.ndarray:
+    """
+    Compute a 64-bit key for every customer ID, hashed from its string form.
+
+    Keys let analyses be joined on integers instead of strings. With 64 bits,
+    a collision between two of 10 million customers has a probability of
+    about 3 in a million.
+
+    Args:
+        customer_ids: Customer IDs (categorical IDs are hashed per category)
+
+    Returns:
+        uint64 key of every customer
+    """
+    codes = None
+    if isinstance(customer_ids.dtype, pd.CategoricalDtype):
+        codes = customer_ids.codes
+        customer_ids = customer_ids.categories
+    if customer_ids.inferred_type != 'string':
+        customer_ids = customer_ids.astype(str)
+
+    keys = pd.util.hash_array(customer_ids.to_numpy(dtype=object), categorize=False)
+    return keys if codes is None else keys[codes]
+
+
+def write_scored_customers(segmented: pd.DataFrame, path: str) -> Dict[str, Any]:
+    """
+    Persist the scored customers of an analysis, sorted by customer key.
+
+    The customer_id index is written as a column next to its customer_key
+    (see customer_keys), and rows are sorted by key so two analyses can be
+    merge-joined. The segment is stored dictionary-encoded.
+
+    Args:
+        segmented: RFMAnalysisService.segmented_df (indexed by customer_id)
+        path: Destination Parquet file
+
+    Returns:
+        Dictionary with the number of rows and the file written
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    keys = customer_keys(segmented.index)
+    order = np.argsort(keys, kind='stable')
+
+    table = pa.Table.from_pandas(segmented, preserve_index=True)
+    customer_ids = table.column('customer_id')
+    if pa.types.is_dictionary(customer_ids.type):
+        # IDs are unique per customer; a dictionary as large as the column only slows writing
+        table = table.set_column(table.schema.get_field_index('customer_id'), 'customer_id', customer_ids.cast(customer_ids.type.value_type))
+    table = table.append_column('customer_key', pa.array(keys)).take(order)
+    # Only the segment repeats enough to be worth dictionary encoding
+    pq.write_table(table, path, row_group_size=CUSTOMER_STORE_CONFIG['row_group_size'], use_dictionary=['segment'])
+
+    return {'rows': table.num_rows, 'file': path}
+
+
+def segment_filter(segments: Optional[List[str]]) -> Optional[ds.Expression]:
+    """
+    Build a filter keeping the customers of the given segments.
+
+    Args:
+        segments: Segment names; None or empty keeps every customer
+
+    Returns:
+        Filter expression for export_customer_table, or None
+    """
+    if not segments:
+        return None
+    return ds.field('segment').isin(segments)
+
+
+def prediction_filter(segments: Optional[List[str]] = None, churn_above: Optional[float] = None,
+                      churn_below: Optional[float] = None, ltv_segments: Optional[List[str]] = None,
+                      upsell: Optional[bool] = None, crosssell: Optional[bool] = None) -> Optional[ds.Expression]:
+    """
+    Build a filter on the segments and predictions of a stored customer table.
+
+    Conditions are combined with AND; those left as None are not applied.
+    Churn bounds are strict, as in PredictiveAnalytics.get_predictive_insights
+    (high value at risk: ltv_segments=['High', 'Very High'], churn_above=0.5).
+
+    Args:
+        segments: RFM segments to keep
+        churn_above: Keep customers whose churn_probability is above this
+        churn_below: Keep customers whose churn_probability is below this
+        ltv_segments: LTV segments to keep
+        upsell: Keep customers with (True) or without (False) upsell potential
+        crosssell: Keep customers with (True) or without (False) cross-sell potential
+
+    Returns:
+        Filter expression for export_customer_table, or None
+    """
+    conditions = []
+    if segments:
+        conditions.append(segment_filter(segments))
+    if churn_above is not None:
+        conditions.append(ds.field('churn_probability') > churn_above)
+    if churn_below is not None:
+        conditions.append(ds.field('churn_probability') < churn_below)
+    if ltv_segments:
+        conditions.append(ds.field('ltv_segment').isin(ltv_segments))
+    if upsell is not None:
+        conditions.append(ds.field('upsell_potential') == upsell)
+    if crosssell is not None:
+        conditions.append(ds.field('crosssell_potential') == crosssell)
+
+    return functools.reduce(operator.and_, conditions) if conditions else None
+
+
+def export_customer_table(path: str, export_format: str, columns: Optional[List[str]] = None,
+                          row_filter: Optional[ds.Expression] = None) -> Iterator[bytes]:
+    """
+    Stream a stored customer table as Arrow IPC, Parquet or CSV.
+
+    The table is scanned batch by batch with the column selection and filter
+    pushed down into the Parquet read: only the selected columns are
+    decoded, row groups whose statistics exclude the filter are skipped, and
+    rows are filtered in Arrow without building Python objects. Each batch
+    is encoded and yielded as soon as it is read, so memory use does not
+    depend on the size of the table.
+
+    The file, format and columns are checked before the first chunk is
+    requested, so errors can still be reported as such.
+
+    Args:
+        path: Parquet file written by write_customer_table or write_scored_customers
+        export_format: One of EXPORT_FORMATS
+        columns: Columns to export, in this order; all of them by default
+        row_filter: Row filter expression (see segment_filter)
+
+    Returns:
+        Iterator over the encoded chunks of the export
+
+    Raises:
+        FileNotFoundError: If no table is stored at path
+        ValueError: If the format, a column or a filtered column is unknown
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Export format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Customer table not found: {path}")
+
+    dataset = ds.dataset(path, format='parquet')
+    unknown = [column for column in columns or [] if column not in dataset.schema.names]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+
+    scanner = dataset.scanner(columns=columns or None, filter=row_filter,
+                              batch_size=CUSTOMER_STORE_CONFIG['export_batch_size'])
+    return _encode_batches(scanner, export_format)
+
+
+def _encode_batches(scanner: ds.Scanner, export_format: str) -> Iterator[bytes]:
+    # Pandas metadata would describe columns that may not have been selected
+    schema = scanner.projected_schema.remove_metadata()
+    sink = io.BytesIO()
+
+    if export_format == 'arrow':
+        writer = pa.ipc.new_stream(sink, schema)
+    elif export_format == 'parquet':
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa_csv.CSVWriter(sink, schema)
+
+    def drain() -> bytes:
+        chunk = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return chunk
+
+    # Filtered batches can be small; Parquet row groups are filled up to the batch size
+    pending, pending_rows = [], 0
+    for batch in scanner.to_batches():
+        if batch.num_rows == 0:
+            continue
+        batch = pa.RecordBatch.from_arrays(batch.columns, schema=schema)
+        if export_format == 'parquet':
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if pending_rows < CUSTOMER_STORE_CONFIG['export_batch_size']:
+                continue
+            writer.write_table(pa.Table.from_batches(pending, schema=schema))
+            pending, pending_rows = [], 0
+        else:
+            writer.write_batch(batch)
+        yield drain()
+
+    if pending:
+        writer.write_table(pa.Table.from_batches(pending, schema=schema))
+    writer.close()
+    yield drain()
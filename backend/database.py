@@ -1,6 +1,6 @@
 import os
 import sys
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Float, ForeignKey, Boolean
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Float, ForeignKey, Boolean, Index, BigInteger
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -29,6 +29,7 @@ class User(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     analyses = relationship("Analysis", back_populates="user")
+    usage = relationship("UserUsage", uselist=False, back_populates="user")
     
 class Analysis(Base):
     __tablename__ = "analyses"
@@ -45,6 +46,11 @@ class Analysis(Base):
     
     user = relationship("User", back_populates="analyses")
     
+    # History pages are read newest first per user (see history.keyset_page)
+    __table_args__ = (
+        Index("idx_analyses_user_date", "user_id", date_created.desc(), id.desc()),
+    )
+    
 class CustomerSegment(Base):
     __tablename__ = "customer_segments"
     
@@ -61,6 +67,35 @@ class CustomerSegment(Base):
     
     analysis = relationship("Analysis")
     
+class UserUsage(Base):
+    __tablename__ = "user_usage"
+    
+    # Counters maintained with the analyses (see usage.py)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    analysis_count = Column(Integer, nullable=False, default=0)
+    storage_bytes = Column(BigInteger, nullable=False, default=0)
+    customers_analyzed = Column(BigInteger, nullable=False, default=0)
+    llm_tokens = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    user = relationship("User", back_populates="usage")
+    
+class AnalysisMetadata(Base):
+    __tablename__ = "analysis_metadata"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    analysis_key = Column(String(64), unique=True, index=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    file_name = Column(String(255), nullable=True)
+    segment_type = Column(String(64), nullable=True)
+    record_count = Column(Integer, nullable=True)
+    total_customers = Column(Integer, nullable=True)
+    details = Column(Text, nullable=True)  # Full history entry as JSON
+    
+    __table_args__ = (
+        Index("idx_analysis_metadata_created", created_at.desc(), id.desc()),
+    )
+    
 # Database dependency
 def get_db():
     db = SessionLocal()
@@ -72,6 +107,10 @@ def get_db():
 # Create all tables
 def create_tables():
     Base.metadata.create_all(bind=engine)
+    # create_all skips existing tables; add indexes introduced since they were created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
 if __name__ == "__main__":
     create_tables()
@@ -0,0 +1,460 @@
+# RFM Matrix - Distributed Analysis Module
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from multiprocessing import Process
+from multiprocessing.connection import Listener, Client, Connection
+from typing import Dict, Any, List
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import DISTRIBUTED_CONFIG
+
+import serialization
+from ingestion import read_files, TRANSACTION_SCHEMA
+from quantile_sketch import RFMSketch
+from rfm_service import RFMAnalysisService, score_cell_histogram, summarize_cells
+from scoring import quantile_levels
+
+# Columns of a per-customer partial state
+STATE_COLUMNS = ['last_date', 'frequency', 'monetary']
+
+
+def _authkey() -> bytes:
+    authkey = DISTRIBUTED_CONFIG['authkey']
+    if not authkey:
+        raise ValueError("No cluster authkey: set RFM_CLUSTER_AUTHKEY or pass --authkey")
+    return authkey.encode('utf-8')
+
+
+def owner_of(customer_ids: pd.Series, n_owners: int) -> np.ndarray:
+    """
+    Assign customers to the worker that owns their final state.
+
+    The hash only depends on the customer ID, so every worker routes a
+    customer to the same owner.
+
+    Args:
+        customer_ids: Customer IDs
+        n_owners: Number of workers
+
+    Returns:
+        Owner index of every customer
+    """
+    values = customer_ids.astype(str).to_numpy(dtype=object)
+    return (pd.util.hash_array(values) % np.uint64(n_owners)).astype(np.int64)
+
+
+def aggregate_states(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate transactions into mergeable per-customer states.
+
+    Args:
+        data: Preprocessed transactions
+
+    Returns:
+        DataFrame with last_date, frequency and monetary columns indexed by customer_id
+    """
+    states = data.groupby(data['customer_id'].astype(str)).agg(
+        last_date=('transaction_date', 'max'),
+        frequency=('transaction_id', 'count'),
+        monetary=('transaction_amount', 'sum')
+    )
+    states.index.name = 'customer_id'
+    return states
+
+
+def merge_states(states: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Merge partial states of the same customers computed on different partitions.
+
+    Args:
+        states: Partial states from aggregate_states
+
+    Returns:
+        Merged states, one row per customer
+    """
+    states = [s for s in states if len(s)]
+    if not states:
+        return pd.DataFrame(columns=STATE_COLUMNS, index=pd.Index([], name='customer_id'))
+
+    combined = pd.concat(states)
+    return combined.groupby(level='customer_id').agg(
+        last_date=('last_date', 'max'),
+        frequency=('frequency', 'sum'),
+        monetary=('monetary', 'sum')
+    )
+
+
+class Worker:
+    """Holds the state of one worker between protocol steps."""
+
+    def __init__(self):
+        self.service = None
+
+    def aggregate(self, files: List[str], n_owners: int) -> Dict[int, pd.DataFrame]:
+        """
+        Aggregate a partition of the transaction files and split the states by owner.
+        """
+        if not files:
+            return {}
+
+        data, _ = read_files([(path, os.path.basename(path)) for path in files], 1, TRANSACTION_SCHEMA)
+        service = RFMAnalysisService(data, n_workers=1)
+        service.preprocess_data()
+
+        states = aggregate_states(service.data)
+        owners = owner_of(states.index.to_series(), n_owners)
+        return {int(owner): states[owners == owner] for owner in np.unique(owners)}
+
+    def merge(self, states: List[pd.DataFrame], analysis_date: datetime, epsilon: float, seed: int) -> RFMSketch:
+        """
+        Merge the states of the customers this worker owns and sketch their metrics.
+        """
+        merged = merge_states(states)
+        rfm = pd.DataFrame({
+            'recency': (analysis_date - pd.to_datetime(merged['last_date'])).dt.days,
+            'frequency': merged['frequency'].astype(np.int64),
+            'monetary': merged['monetary'].astype(np.float64)
+        }, index=merged.index)
+
+        # Aggregate states hold plain counts and sums, so scoring is never time-decayed here
+        self.service = RFMAnalysisService(None, n_workers=1, decay_half_life=0)
+        self.service.rfm_df = rfm
+
+        return RFMSketch(epsilon, seed).update(rfm['recency'], rfm['frequency'], rfm['monetary'])
+
+    def score(self, breakpoints: Dict[str, List[float]]) -> Dict[str, List]:
+        """
+        Score owned customers with the broadcast breakpoints and return their score cell histogram.
+        """
+        service = self.service
+        service.breakpoints = breakpoints
+        service.n_tiles = len(breakpoints['recency']) + 1
+        if service.rfm_df.empty:
+            return score_cell_histogram([], [], [], [])
+
+        scored = service.assign_rfm_scores()
+        return score_cell_histogram(scored['rfm_group'], scored['recency'], scored['frequency'], scored['monetary'])
+
+    def handle(self, message: Dict[str, Any]) -> Any:
+        op = message['op']
+        if op == 'aggregate':
+            return self.aggregate(message['files'], message['n_owners'])
+        if op == 'merge':
+            return self.merge(message['states'], message['analysis_date'], message['epsilon'], message['seed'])
+        if op == 'score':
+            return self.score(message['breakpoints'])
+        raise ValueError(f"Unknown operation: {op}")
+
+
+def serve_worker(address: Any, authkey: bytes = None) -> None:
+    """
+    Run a worker: accept one coordinator connection and answer its requests until shutdown.
+
+    Messages are pickled, so workers must only listen on trusted networks;
+    connections are authenticated with the shared authkey, and a worker
+    refuses to start without one.
+
+    Args:
+        address: Socket path or (host, port) to listen on
+        authkey: Shared secret. Defaults to the configured key.
+
+    Raises:
+        ValueError: If no authkey is given or configured
+    """
+    worker = Worker()
+    with Listener(address, authkey=authkey or _authkey()) as listener:
+        with listener.accept() as conn:
+            while True:
+                message = conn.recv()
+                if message['op'] == 'shutdown':
+                    conn.send({'result': None})
+                    return
+                try:
+                    conn.send({'result': worker.handle(message)})
+                except Exception as e:
+                    conn.send({'error': f"{type(e).__name__}: {e}"})
+
+
+class Coordinator:
+    """Drives workers through aggregation, sketch merging, scoring and summary gathering."""
+
+    def __init__(self, addresses: List[Any], authkey: bytes = None, connect_timeout: float = None):
+        """
+        Connect to running workers.
+
+        Args:
+            addresses: Worker addresses (socket paths or (host, port) pairs)
+            authkey: Shared secret. Defaults to the configured key.
+            connect_timeout: Seconds to wait for each worker to accept connections
+        """
+        timeout = connect_timeout or DISTRIBUTED_CONFIG['connect_timeout']
+        self.connections: List[Connection] = [
+            self._connect(address, authkey or _authkey(), timeout) for address in addresses
+        ]
+
+    @staticmethod
+    def _connect(address: Any, authkey: bytes, timeout: float) -> Connection:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return Client(address, authkey=authkey)
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def _broadcast(self, messages: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Send one message to each worker, then gather every reply, so workers run concurrently.
+        """
+        for conn, message in zip(self.connections, messages):
+            conn.send(message)
+
+        results = []
+        for i, conn in enumerate(self.connections):
+            reply = conn.recv()
+            if 'error' in reply:
+                raise RuntimeError(f"Worker {i} failed: {reply['error']}")
+            results.append(reply['result'])
+        return results
+
+    def run(self, files: List[str], analysis_date: datetime = None, n_tiles: int = None,
+            epsilon: float = None) -> Dict[str, Any]:
+        """
+        Run a full RFM analysis of transaction files across the workers.
+
+        1. Each worker aggregates its share of the files into per-customer states,
+           split by owning worker.
+        2. States are shuffled to their owners, which merge them and return
+           quantile sketches of their customers' metrics.
+        3. The coordinator merges the sketches and broadcasts the breakpoints.
+        4. Workers score their customers and return score cell histograms,
+           which are merged and segmented into the summary.
+
+        Args:
+            files: Transaction files, readable by every worker
+            analysis_date: Reference date for recency calculation. If None, uses current date.
+            n_tiles: Number of score levels per metric. Defaults to the configured value.
+            epsilon: Target rank error of the breakpoints
+
+        Returns:
+            Summary in the format of RFMAnalysisService.generate_summary
+        """
+        analysis_date = analysis_date or datetime.now()
+        n = len(self.connections)
+        levels = quantile_levels(n_tiles)
+
+        # 1. Aggregate partitions of the files
+        partitions = self._broadcast([
+            {'op': 'aggregate', 'files': files[i::n], 'n_owners': n} for i in range(n)
+        ])
+
+        # 2. Shuffle states to their owners and collect sketches
+        sketches = self._broadcast([
+            {
+                'op': 'merge',
+                'states': [p[owner] for p in partitions if owner in p],
+                'analysis_date': analysis_date,
+                'epsilon': epsilon,
+                'seed': owner
+            }
+            for owner in range(n)
+        ])
+        del partitions
+
+        # 3. Merge sketches and broadcast breakpoints
+        sketch = sketches[0]
+        for other in sketches[1:]:
+            sketch.merge(other)
+        breakpoints = sketch.breakpoints(levels)
+
+        # 4. Score and gather score cell histograms
+        histograms = self._broadcast([{'op': 'score', 'breakpoints': breakpoints}] * n)
+
+        return build_summary(histograms, breakpoints)
+
+    def close(self) -> None:
+        """
+        Shut the workers down and close the connections.
+        """
+        for conn in self.connections:
+            try:
+                conn.send({'op': 'shutdown'})
+                conn.recv()
+            except (EOFError, OSError):
+                pass
+            conn.close()
+        self.connections = []
+
+    def __enter__(self) -> 'Coordinator':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def merge_cells(histograms: List[Dict[str, List]]) -> Dict[str, List]:
+    """
+    Merge score cell histograms of disjoint sets of customers.
+
+    Args:
+        histograms: Histograms from score_cell_histogram
+
+    Returns:
+        Histogram of all the customers
+    """
+    codes = np.concatenate([np.asarray(h['codes'], dtype=np.int64) for h in histograms])
+    cell_codes, cells = np.unique(codes, return_inverse=True)
+    merged = {'codes': cell_codes.tolist()}
+    for key in ('count', 'recency', 'frequency', 'monetary'):
+        values = np.concatenate([np.asarray(h[key], dtype=np.float64) for h in histograms])
+        merged[key] = np.bincount(cells, weights=values, minlength=len(cell_codes)).tolist()
+    merged['count'] = [int(count) for count in merged['count']]
+    return merged
+
+
+def build_summary(histograms: List[Dict[str, List]], breakpoints: Dict[str, List[float]]) -> Dict[str, Any]:
+    """
+    Combine per-worker score cell histograms into an analysis summary.
+
+    Args:
+        histograms: Per worker, histogram from score_cell_histogram
+        breakpoints: Breakpoints the customers were scored with
+
+    Returns:
+        Summary in the format of RFMAnalysisService.generate_summary
+    """
+    cells = merge_cells(histograms)
+    n_tiles = len(breakpoints['recency']) + 1
+
+    total_customers = int(sum(cells['count']))
+    total_revenue = float(sum(cells['monetary']))
+
+    summary = {
+        'total_customers': total_customers,
+        'total_revenue': total_revenue,
+        'average_recency': float(sum(cells['recency']) / total_customers),
+        'average_frequency': float(sum(cells['frequency']) / total_customers),
+        'average_monetary': total_revenue / total_customers,
+        'scoring': {
+            'n_tiles': n_tiles,
+            'breakpoints': breakpoints,
+            # Aggregate states hold plain counts and sums, see Worker.merge
+            'decay_half_life': 0
+        },
+        'score_cells': cells
+    }
+
+    service = RFMAnalysisService(None, n_tiles=n_tiles)
+    summary['segment_distribution'] = summarize_cells(cells, *service.segment_lookup())
+
+    return summary
+
+
+class LocalCluster:
+    """
+    Runs workers as local processes listening on Unix sockets, for one-box runs and tests.
+
+    Each cluster authenticates with a random key of its own, so no key has to be configured.
+    """
+
+    def __init__(self, n_workers: int = None):
+        """
+        Args:
+            n_workers: Number of worker processes. Defaults to the configured value.
+        """
+        self.n_workers = n_workers or DISTRIBUTED_CONFIG['local_workers']
+        self.authkey = os.urandom(32)
+        self.directory = None
+        self.processes: List[Process] = []
+        self.addresses: List[str] = []
+
+    def start(self) -> 'LocalCluster':
+        self.directory = tempfile.mkdtemp(prefix='rfm_cluster_')
+        for i in range(self.n_workers):
+            address = os.path.join(self.directory, f'worker_{i}.sock')
+            process = Process(target=serve_worker, args=(address, self.authkey), daemon=True)
+            process.start()
+            self.processes.append(process)
+            self.addresses.append(address)
+        return self
+
+    def stop(self) -> None:
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        if self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self) -> 'LocalCluster':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def run_local_analysis(files: List[str], n_workers: int = None, analysis_date: datetime = None,
+                       n_tiles: int = None, epsilon: float = None) -> Dict[str, Any]:
+    """
+    Run the distributed analysis on a local cluster of worker processes.
+
+    Args:
+        files: Transaction files
+        n_workers: Number of worker processes
+        analysis_date: Reference date for recency calculation
+        n_tiles: Number of score levels per metric
+        epsilon: Target rank error of the breakpoints
+
+    Returns:
+        Summary in the format of RFMAnalysisService.generate_summary
+    """
+    with LocalCluster(n_workers) as cluster:
+        with Coordinator(cluster.addresses, cluster.authkey) as coordinator:
+            return coordinator.run(files, analysis_date, n_tiles, epsilon)
+
+
+def _parse_address(value: str) -> Any:
+    host, _, port = value.rpartition(':')
+    return (host, int(port)) if host else value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed RFM analysis")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    worker_parser = subparsers.add_parser("worker", help="Run a worker")
+    worker_parser.add_argument("--listen", required=True, help="host:port or socket path to listen on")
+    worker_parser.add_argument("--authkey", default=None, help="Shared secret (defaults to RFM_CLUSTER_AUTHKEY)")
+
+    coordinator_parser = subparsers.add_parser("coordinator", help="Run an analysis across workers")
+    coordinator_parser.add_argument("--workers", required=True, nargs="+", help="Worker addresses (host:port or socket path)")
+    coordinator_parser.add_argument("--input", required=True, nargs="+", help="Transaction files, readable by every worker")
+    coordinator_parser.add_argument("--output", required=True, help="JSON summary file to write")
+    coordinator_parser.add_argument("--n-tiles", type=int, default=None)
+    coordinator_parser.add_argument("--epsilon", type=float, default=None)
+    coordinator_parser.add_argument("--authkey", default=None, help="Shared secret (defaults to RFM_CLUSTER_AUTHKEY)")
+    args = parser.parse_args()
+
+    if not (args.authkey or DISTRIBUTED_CONFIG['authkey']):
+        parser.error("an authkey is required: set RFM_CLUSTER_AUTHKEY or pass --authkey")
+    authkey = args.authkey.encode('utf-8') if args.authkey else None
+
+    if args.command == "worker":
+        serve_worker(_parse_address(args.listen), authkey)
+    else:
+        with Coordinator([_parse_address(a) for a in args.workers], authkey) as coordinator:
+            result = coordinator.run(args.input, n_tiles=args.n_tiles, epsilon=args.epsilon)
+        serialization.dump(result, args.output)
+        print(f"Analyzed {result['total_customers']} customers -> {args.output}")
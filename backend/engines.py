@@ -0,0 +1,233 @@
+# RFM Matrix - Analysis Engines Module
+
+import os
+import sys
+from datetime import datetime
+from typing import Dict, Any
+
+import numpy as np
+import pandas as pd
+
+try:
+    import polars as pl
+except ImportError:  # pragma: no cover - polars is listed in requirements.txt
+    pl = None
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import AGGREGATION_CONFIG
+
+from ingestion import parse_dates
+
+NANOSECONDS_PER_DAY = 86_400_000_000_000
+
+
+class PandasEngine:
+    """Runs the RFM pipeline eagerly with pandas, step by step on the service."""
+
+    name = 'pandas'
+
+    def run(self, service: Any, analysis_date: datetime = None) -> Dict[str, Any]:
+        """
+        Preprocess, aggregate, score, segment and summarize.
+
+        Args:
+            service: RFMAnalysisService holding the transaction data
+            analysis_date: Reference date for recency calculation
+
+        Returns:
+            Analysis summary
+        """
+        service.preprocess_data()
+        service.calculate_rfm(analysis_date)
+        service.assign_rfm_scores()
+        service.assign_segments()
+        return service.generate_summary()
+
+
+class PolarsEngine:
+    """
+    Runs the RFM pipeline on Polars.
+
+    Preprocessing and aggregation are one lazy query executed by the
+    multi-threaded Polars engine over Arrow memory. Scores, segments and
+    segment summaries come from the service's own functions (score_metrics,
+    segment_lookup, summarize_cells), so results are identical to PandasEngine.
+    """
+
+    name = 'polars'
+
+    def __init__(self):
+        if pl is None:
+            raise ValueError("The polars engine requires the polars package")
+
+    def _prepare(self, data: pd.DataFrame) -> 'pl.LazyFrame':
+        """
+        Convert the transactions to a lazy Polars frame with typed columns.
+        """
+        columns = {
+            'customer_id': data['customer_id'],
+            'transaction_id': data['transaction_id'],
+            'transaction_date': data['transaction_date'],
+            'transaction_amount': data['transaction_amount']
+        }
+
+        # Same conversions as RFMAnalysisService.preprocess_data, only when not typed at read time
+        if not pd.api.types.is_datetime64_any_dtype(columns['transaction_date']):
+            columns['transaction_date'] = parse_dates(columns['transaction_date'])
+        if not pd.api.types.is_numeric_dtype(columns['transaction_amount']):
+            columns['transaction_amount'] = pd.to_numeric(columns['transaction_amount'], errors='coerce')
+        if isinstance(columns['customer_id'].dtype, pd.CategoricalDtype):
+            columns['customer_id'] = columns['customer_id'].astype(str).where(columns['customer_id'].notna())
+
+        return pl.from_pandas(pd.DataFrame(columns, copy=False)).lazy()
+
+    def aggregate(self, data: pd.DataFrame, analysis_date: datetime, decay_half_life: float = None) -> 'pl.DataFrame':
+        """
+        Preprocess and aggregate transactions per customer in one lazy query.
+
+        Args:
+            data: Raw transaction data
+            analysis_date: Reference date for recency calculation
+            decay_half_life: When given, the same query also computes the
+                decayed_frequency, decayed_monetary and cohort columns of
+                time-decayed scoring (see RFMAnalysisService.calculate_rfm)
+
+        Returns:
+            Polars frame with customer_id, recency, frequency and monetary columns
+        """
+        elapsed = pl.lit(analysis_date) - pl.col('last_date')
+        aggregations = [
+            pl.col('transaction_date').max().alias('last_date'),
+            pl.col('transaction_id').count().alias('frequency'),
+            pl.col('transaction_amount').sum().alias('monetary')
+        ]
+        columns = [
+            'customer_id',
+            # Whole days, floored like pandas Timedelta.days
+            (elapsed.dt.total_nanoseconds() // NANOSECONDS_PER_DAY).alias('recency'),
+            pl.col('frequency').cast(pl.Int64),
+            'monetary'
+        ]
+
+        if decay_half_life:
+            # Same weights as scoring.decay_weights: 2^(-age / half-life), ages clipped at 0
+            age = (pl.lit(analysis_date) - pl.col('transaction_date')).dt.total_nanoseconds().clip(lower_bound=0)
+            weight = (age.cast(pl.Float64) * (-np.log(2) / (decay_half_life * NANOSECONDS_PER_DAY))).exp()
+            aggregations += [
+                weight.filter(pl.col('transaction_id').is_not_null()).sum().alias('decayed_frequency'),
+                (weight * pl.col('transaction_amount')).sum().alias('decayed_monetary'),
+                pl.col('transaction_date').min().dt.truncate('1mo').alias('cohort')
+            ]
+            columns += ['decayed_frequency', 'decayed_monetary', 'cohort']
+
+        return (
+            self._prepare(data)
+            .filter(
+                pl.col('customer_id').is_not_null()
+                & pl.col('transaction_date').is_not_null()
+                & pl.col('transaction_amount').is_not_null()
+                & (pl.col('transaction_amount') > 0)
+            )
+            .group_by('customer_id')
+            .agg(*aggregations)
+            .select(*columns)
+            .sort('customer_id')
+            .collect()
+        )
+
+    def summarize(self, service: Any, segmented: 'pl.DataFrame') -> Dict[str, Any]:
+        """
+        Summarize the segmented customers in the format of RFMAnalysisService.generate_summary.
+        """
+        # Imported here as rfm_service imports this module
+        from rfm_service import score_cell_histogram, summarize_cells, cohort_counts
+
+        summary = {
+            'total_customers': segmented.height,
+            'total_revenue': float(segmented['monetary'].sum()),
+            'average_recency': float(segmented['recency'].mean()),
+            'average_frequency': float(segmented['frequency'].mean()),
+            'average_monetary': float(segmented['monetary'].mean()),
+            'scoring': {
+                'n_tiles': service.n_tiles,
+                'breakpoints': service.breakpoints,
+                'decay_half_life': service.decay_half_life
+            },
+            'score_cells': score_cell_histogram(
+                segmented['rfm_score'].to_numpy(),
+                segmented['recency'].to_numpy(),
+                segmented['frequency'].to_numpy(),
+                segmented['monetary'].to_numpy()
+            )
+        }
+        summary['segment_distribution'] = summarize_cells(summary['score_cells'], *service.segment_lookup())
+
+        if service.decay_half_life:
+            summary['cohorts'] = cohort_counts(segmented['cohort'].to_numpy())
+
+        return summary
+
+    def run(self, service: Any, analysis_date: datetime = None) -> Dict[str, Any]:
+        """
+        Preprocess, aggregate, score, segment and summarize.
+
+        The service's rfm_df, segmented_df and summary are filled in as with
+        PandasEngine, so the rest of the service API works unchanged.
+
+        Args:
+            service: RFMAnalysisService holding the transaction data
+            analysis_date: Reference date for recency calculation
+
+        Returns:
+            Analysis summary
+        """
+        analysis_date = analysis_date or datetime.now()
+        rfm = self.aggregate(service.data, analysis_date, service.decay_half_life)
+
+        # Score with the service so every engine uses the same breakpoints and codes
+        frequency, monetary = service.scored_metrics()
+        scores = service.score_metrics(rfm['recency'].to_numpy(), rfm[frequency].to_numpy(), rfm[monetary].to_numpy())
+        lookup, segment_names = service.segment_lookup()
+        segment_codes = lookup[scores['rfm_score']]
+
+        segmented = rfm.with_columns(
+            pl.Series('r_quartile', scores['r_quartile']),
+            pl.Series('f_quartile', scores['f_quartile']),
+            pl.Series('m_quartile', scores['m_quartile']),
+            pl.Series('rfm_score', scores['rfm_score'])
+        )
+        summary = self.summarize(service, segmented)
+
+        # Expose pandas views for the rest of the service API
+        segmented_df = segmented.to_pandas().set_index('customer_id')
+        segmented_df['rfm_group'] = segmented_df['rfm_score']
+        segmented_df['segment'] = pd.Categorical.from_codes(segment_codes, categories=segment_names)
+
+        service.rfm_df = segmented_df
+        service.segmented_df = segmented_df
+        service.summary = summary
+        return summary
+
+
+# Available engines by name
+ENGINES = {
+    PandasEngine.name: PandasEngine,
+    PolarsEngine.name: PolarsEngine
+}
+
+
+def get_engine(name: str = None) -> Any:
+    """
+    Get an analysis engine by name.
+
+    Args:
+        name: 'pandas' or 'polars'. Defaults to the configured engine.
+
+    Returns:
+        Engine instance
+    """
+    name = name or AGGREGATION_CONFIG['engine']
+    if name not in ENGINES:
+        raise ValueError(f"Unknown analysis engine: {name}. Available engines: {', '.join(ENGINES)}")
+    return ENGINES[name]()
@@ -0,0 +1,198 @@
+# RFM Matrix - Analysis History Module
+
+import base64
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import HISTORY_CONFIG
+
+from database import AnalysisMetadata
+import serialization
+
+
+def encode_cursor(created: datetime, row_id: int) -> str:
+    """
+    Encode the position after a history row as an opaque cursor.
+    """
+    return base64.urlsafe_b64encode(f"{created.isoformat()}|{row_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor from encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        created, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created), int(row_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def keyset_page(query: Any, created_column: Any, id_column: Any, cursor: Optional[str] = None,
+                limit: int = None) -> Tuple[List[Any], Optional[str]]:
+    """
+    Read one page of a history query, newest first, by keyset pagination.
+
+    Rows are ordered by (created, id) descending and a page starts strictly
+    after the cursor's row, so an index on those columns (after any equality
+    filter) serves every page with a range scan of limit rows, instead of
+    skipping the rows of all previous pages as OFFSET would.
+
+    Args:
+        query: Query selecting at least the created and id columns
+        created_column: Creation date column
+        id_column: Primary key column, breaking ties between equal dates
+        cursor: Cursor returned with the previous page; None for the first page
+        limit: Page size. Defaults to the configured value, capped at the configured maximum.
+
+    Returns:
+        Tuple of the page rows and the cursor of the next page (None on the last page)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    limit = min(limit or HISTORY_CONFIG['page_size'], HISTORY_CONFIG['max_page_size'])
+
+    if cursor is not None:
+        created, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(created_column, id_column) < tuple_(created, row_id))
+
+    # One extra row tells whether there is a next page
+    rows = query.order_by(created_column.desc(), id_column.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_column.key), getattr(last, id_column.key))
+
+    return rows, next_cursor
+
+
+def record_analysis(db: Session, history_entry: Dict[str, Any]) -> AnalysisMetadata:
+    """
+    Store the history entry of an analysis in the metadata table.
+
+    Args:
+        db: Database session
+        history_entry: Entry built by rfm_api.analyze_rfm
+
+    Returns:
+        The stored row
+    """
+    row = AnalysisMetadata(
+        analysis_key=history_entry['analysis_key'],
+        created_at=datetime.fromisoformat(history_entry['timestamp']),
+        file_name=history_entry.get('filename'),
+        segment_type=history_entry.get('segment_type'),
+        record_count=history_entry.get('record_count'),
+        total_customers=history_entry.get('summary', {}).get('total_customers'),
+        details=serialization.dumps(history_entry).decode()
+    )
+    db.add(row)
+    db.commit()
+    return row
+
+
+def list_analyses(db: Session, cursor: Optional[str] = None, limit: int = None) -> Dict[str, Any]:
+    """
+    List stored analyses, newest first, one page at a time.
+
+    Only the listed columns are read; full entries are returned by get_analysis.
+
+    Args:
+        db: Database session
+        cursor: Cursor of the page to read; None for the first page
+        limit: Page size
+
+    Returns:
+        Dictionary with the history entries and the next_cursor
+    """
+    query = db.query(
+        AnalysisMetadata.id,
+        AnalysisMetadata.analysis_key,
+        AnalysisMetadata.created_at,
+        AnalysisMetadata.file_name,
+        AnalysisMetadata.segment_type,
+        AnalysisMetadata.record_count,
+        AnalysisMetadata.total_customers
+    )
+    rows, next_cursor = keyset_page(query, AnalysisMetadata.created_at, AnalysisMetadata.id, cursor, limit)
+
+    history = [
+        {
+            'filename': row.file_name,
+            'analysis_key': row.analysis_key,
+            'model_id': row.analysis_key,
+            'timestamp': row.created_at.isoformat(),
+            'segment_type': row.segment_type,
+            'record_count': row.record_count,
+            'total_customers': row.total_customers
+        }
+        for row in rows
+    ]
+
+    return {'history': history, 'next_cursor': next_cursor}
+
+
+def get_analysis(db: Session, analysis_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Get the full history entry of a stored analysis.
+
+    Returns:
+        History entry, or None if the analysis is unknown
+    """
+    row = db.query(AnalysisMetadata.details).filter(AnalysisMetadata.analysis_key == analysis_key).first()
+    if row is None:
+        return None
+    return serialization.loads(row.details)
+
+
+def import_history_files(db: Session, directory: str) -> int:
+    """
+    Import the *_meta.json history entries written by earlier versions.
+
+    Entries already in the metadata table are skipped, so the import can be rerun.
+    Entries of versions that did not store their key are keyed by their file
+    name, the timestamp they were written at.
+
+    Args:
+        db: Database session
+        directory: Directory holding the entries
+
+    Returns:
+        Number of entries imported
+    """
+    known = {key for key, in db.query(AnalysisMetadata.analysis_key)}
+    imported = 0
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('_meta.json'):
+            continue
+        history_entry = serialization.load(os.path.join(directory, name))
+        history_entry.setdefault('analysis_key', name[:-len('_meta.json')])
+        if history_entry['analysis_key'] not in known:
+            record_analysis(db, history_entry)
+            known.add(history_entry['analysis_key'])
+            imported += 1
+
+    return imported
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        print(f"Imported {import_history_files(session, sys.argv[1] if len(sys.argv) > 1 else 'analysis_history')} history entries.")
+    finally:
+        session.close()
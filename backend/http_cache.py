@@ -0,0 +1,191 @@
+# RFM Matrix - HTTP Caching Module
+
+import mimetypes
+import os
+import sys
+from typing import AsyncIterator, Optional, Tuple
+
+import anyio
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import HTTP_CACHE_CONFIG
+
+# Files are read and sent in chunks of this size
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(ValueError):
+    """Raised when a Range header selects no byte of the file."""
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """
+    Strong ETag of a file version.
+
+    Result files are written to a temporary name and moved into place, so
+    every version has its own modification time and a file is never read
+    half written; the ETag changes whenever the content does.
+
+    Args:
+        stat_result: os.stat of the file
+
+    Returns:
+        Quoted entity tag
+    """
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag (weak comparison, as for GET).
+
+    Args:
+        if_none_match: Header value, a list of entity tags or '*'
+        etag: Current entity tag
+
+    Returns:
+        True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return etag.removeprefix('W/') in tags
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single byte range.
+
+    Headers that are missing, malformed or ask for several ranges are
+    ignored, and the whole file is sent, as allowed by RFC 9110.
+
+    Args:
+        range_header: Range header value, e.g. 'bytes=0-1023', 'bytes=1024-' or 'bytes=-512'
+        size: File size in bytes
+
+    Returns:
+        First and last byte (inclusive), or None to send the whole file
+
+    Raises:
+        RangeNotSatisfiable: If the range starts past the end of the file
+    """
+    if not range_header or not range_header.startswith('bytes=') or ',' in range_header:
+        return None
+
+    first, _, last = range_header[len('bytes='):].strip().partition('-')
+    try:
+        start = int(first) if first else None
+        end = int(last) if last else None
+    except ValueError:
+        return None
+
+    if start is None:
+        # Suffix range: the last end bytes
+        if end is None:
+            return None
+        if end <= 0 or size == 0:
+            raise RangeNotSatisfiable(range_header)
+        return max(0, size - end), size - 1
+
+    if end is not None and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(range_header)
+    if end is None:
+        end = size - 1
+    return start, min(end, size - 1)
+
+
+async def _read_range(path: str, start: int, end: int) -> AsyncIterator[bytes]:
+    async with await anyio.open_file(path, mode='rb') as f:
+        await f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def file_response(request: Request, path: str, media_type: str = None, cache_control: str = None,
+                  stat_result: os.stat_result = None, filename: str = None) -> Response:
+    """
+    Serve a file with a strong ETag, conditional GET and byte range support.
+
+    A request whose If-None-Match matches the current version gets an empty
+    304 response, without the file being read. A single Range is answered
+    with 206 and only the requested bytes, unless an If-Range names an older
+    version, in which case the whole current file is sent.
+
+    Args:
+        request: Incoming request
+        path: File to serve
+        media_type: Content type (guessed from the name if omitted)
+        cache_control: Cache-Control header of the response
+        stat_result: os.stat of the file, if already known
+        filename: Sent as an attachment under this name
+
+    Returns:
+        Response to return from the endpoint
+    """
+    stat_result = stat_result or os.stat(path)
+    etag = file_etag(stat_result)
+    headers = {'etag': etag, 'accept-ranges': 'bytes'}
+    if cache_control:
+        headers['cache-control'] = cache_control
+
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+
+    if_range = request.headers.get('if-range')
+    if request.method == 'GET' and (if_range is None or if_range == etag):
+        size = stat_result.st_size
+        try:
+            byte_range = parse_range(request.headers.get('range'), size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, 'content-range': f'bytes */{size}'})
+
+        if byte_range is not None:
+            start, end = byte_range
+            headers['content-range'] = f'bytes {start}-{end}/{size}'
+            headers['content-length'] = str(end - start + 1)
+            response = StreamingResponse(_read_range(path, start, end), status_code=206, headers=headers,
+                                         media_type=media_type or mimetypes.guess_type(path)[0] or 'text/plain')
+            if filename:
+                response.headers['content-disposition'] = f'attachment; filename="{filename}"'
+            return response
+
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result,
+                        method=request.method, filename=filename)
+
+
+def static_cache_control(path: str) -> str:
+    """
+    Cache-Control of a stored file.
+
+    Analysis results (JSON) are replaced as the analysis progresses and when
+    their insights are regenerated, so they are always revalidated (a 304 as
+    long as they are unchanged); every other stored file is written once
+    under the unique name of its analysis and never changes.
+    """
+    if path.endswith('.json'):
+        return 'private, no-cache'
+    return f"private, max-age={HTTP_CACHE_CONFIG['immutable_max_age']}, immutable"
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with strong ETags, Cache-Control and byte range support."""
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        if status_code != 200:
+            # Error pages (html mode 404.html) are served as is
+            return super().file_response(full_path, stat_result, scope, status_code)
+        path = str(full_path)
+        return file_response(Request(scope), path, cache_control=static_cache_control(path), stat_result=stat_result)
@@ -0,0 +1,416 @@
+# RFM Matrix - Ingestion Module
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional, Tuple, BinaryIO
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import INGESTION_CONFIG
+
+# Supported upload formats
+CSV_EXTENSIONS = ('.csv', '.csv.gz', '.gz')
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+ARCHIVE_EXTENSIONS = ('.zip',)
+SUPPORTED_EXTENSIONS = CSV_EXTENSIONS + EXCEL_EXTENSIONS + ARCHIVE_EXTENSIONS
+
+# Declared input schema for transaction files. Columns not listed are never loaded.
+# Money stays in float64: float32 keeps about 7 significant digits and loses cents above 100,000.
+TRANSACTION_SCHEMA = {
+    'customer_id': 'category',
+    'transaction_id': 'object',
+    'transaction_date': 'datetime',
+    'transaction_amount': 'float64'
+}
+
+# Date formats tried, in order, when inferring the format of a date column
+DATE_FORMATS = [
+    '%Y-%m-%d',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S',
+    '%d/%m/%Y',
+    '%d/%m/%Y %H:%M',
+    '%d/%m/%Y %H:%M:%S',
+    '%m/%d/%Y',
+    '%Y/%m/%d',
+    '%d-%m-%Y',
+    '%d.%m.%Y'
+]
+
+# Number of rows sampled to infer date formats
+DATE_SAMPLE_ROWS = 1000
+
+# Worker processes parsing file parts, shared by all requests (see _process_pool)
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class MissingColumnsError(ValueError):
+    """Raised when an input file does not contain the columns of the schema."""
+
+    def __init__(self, missing: List[str]):
+        self.missing = missing
+        super().__init__(f"Data is missing required columns: {', '.join(missing)}")
+
+
+def customer_schema(user_id_col: str, recency_col: str, frequency_col: str, monetary_col: str) -> Dict[str, str]:
+    """
+    Build the input schema for per-customer files with mapped column names.
+
+    Args:
+        user_id_col: Column name for customer ID
+        recency_col: Column name for the date of last purchase/activity
+        frequency_col: Column name for number of purchases/activities
+        monetary_col: Column name for total spent
+
+    Returns:
+        Schema mapping column names to dtypes
+    """
+    return {
+        user_id_col: 'category',
+        recency_col: 'datetime',
+        frequency_col: 'float32',
+        monetary_col: 'float64'
+    }
+
+
+def infer_date_format(sample: pd.Series) -> Optional[str]:
+    """
+    Find the first known date format that parses every value of a sample.
+
+    Args:
+        sample: Sample of raw date strings
+
+    Returns:
+        strftime-style format, or None if no known format matches
+    """
+    sample = sample.dropna().astype(str)
+    if sample.empty:
+        return None
+
+    for date_format in DATE_FORMATS:
+        try:
+            pd.to_datetime(sample, format=date_format)
+            return date_format
+        except (ValueError, TypeError):
+            continue
+
+    return None
+
+
+def parse_dates(values: pd.Series, date_format: str = None) -> pd.Series:
+    """
+    Convert raw values to datetimes with a single format.
+
+    The format is inferred from a sample when not given. Values that do not
+    match it (e.g. a timestamp in a column of dates) are parsed again without
+    a fixed format; values that still cannot be parsed become NaT.
+
+    Args:
+        values: Raw date values
+        date_format: strftime-style format, or None to infer it
+
+    Returns:
+        Series of datetimes
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+
+    if date_format is None:
+        date_format = infer_date_format(values.head(DATE_SAMPLE_ROWS))
+
+    if date_format is None:
+        return pd.to_datetime(values, errors='coerce')
+    dates = pd.to_datetime(values, format=date_format, errors='coerce', cache=True)
+
+    unmatched = dates.isna() & values.notna() & (values.astype(str).str.strip() != '')
+    if unmatched.any():
+        dates[unmatched] = pd.to_datetime(values[unmatched], errors='coerce', dayfirst=date_format.startswith('%d'))
+    return dates
+
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, str], date_formats: Dict[str, str] = None) -> pd.DataFrame:
+    """
+    Cast the columns of a DataFrame to the types declared in a schema.
+
+    Args:
+        df: DataFrame holding the schema columns
+        schema: Schema mapping column names to dtypes
+        date_formats: Known formats of the datetime columns
+
+    Returns:
+        The same DataFrame with typed columns
+    """
+    date_formats = date_formats or {}
+
+    for col, dtype in schema.items():
+        if dtype == 'datetime':
+            df[col] = parse_dates(df[col], date_formats.get(col))
+        elif dtype in ('float32', 'float64') and not pd.api.types.is_float_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+        elif df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+
+    return df
+
+
+@contextmanager
+def _open_csv(part: Dict[str, Any]):
+    """
+    Open the raw bytes of a CSV part.
+    """
+    if part['kind'] == 'zip':
+        with zipfile.ZipFile(part['path']) as archive, archive.open(part['member']) as member:
+            yield member
+    else:
+        with open(part['path'], 'rb') as f:
+            yield f
+
+
+def _csv_compression(part: Dict[str, Any]) -> Optional[str]:
+    if part['kind'] == 'zip':
+        return 'gzip' if part['member'].lower().endswith('.gz') else None
+    return part['compression']
+
+
+def read_typed_csv(part: Dict[str, Any], schema: Dict[str, str]) -> pd.DataFrame:
+    """
+    Read a CSV part with the declared schema applied at read time.
+
+    Only the schema columns are loaded (usecols), non-date columns are parsed
+    directly into their declared dtypes, and the format of each date column
+    is inferred once from a sample of the file.
+
+    Args:
+        part: CSV or zip part description from plan_parts
+        schema: Schema mapping column names to dtypes
+
+    Returns:
+        Typed DataFrame with only the schema columns
+    """
+    compression = _csv_compression(part)
+    date_cols = [col for col, dtype in schema.items() if dtype == 'datetime']
+
+    # Check the header and sample the date columns
+    with _open_csv(part) as f:
+        sample = pd.read_csv(f, compression=compression, nrows=DATE_SAMPLE_ROWS, dtype=str, encoding='utf-8')
+
+    missing = [col for col in schema if col not in sample.columns]
+    if missing:
+        raise MissingColumnsError(missing)
+
+    date_formats = {col: infer_date_format(sample[col]) for col in date_cols}
+    dtypes = {col: ('str' if dtype == 'datetime' else dtype) for col, dtype in schema.items()}
+
+    try:
+        with _open_csv(part) as f:
+            df = pd.read_csv(f, compression=compression, usecols=list(schema), dtype=dtypes, encoding='utf-8')
+    except ValueError:
+        # Non-numeric values in a numeric column: read as text and coerce
+        dtypes = {col: (dtype if dtype in ('category', 'object') else 'str') for col, dtype in dtypes.items()}
+        with _open_csv(part) as f:
+            df = pd.read_csv(f, compression=compression, usecols=list(schema), dtype=dtypes, encoding='utf-8')
+
+    return apply_schema(df, schema, date_formats)
+
+
+def is_supported(filename: str) -> bool:
+    """
+    Check whether a file name has a supported upload format.
+
+    Args:
+        filename: Name of the uploaded file
+
+    Returns:
+        True if the file can be ingested
+    """
+    return filename is not None and filename.lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def spool_upload(fileobj: BinaryIO, directory: str) -> str:
+    """
+    Copy an uploaded file to disk in blocks, without reading it into memory.
+
+    Args:
+        fileobj: Binary file object of the upload
+        directory: Directory to write the file to
+
+    Returns:
+        Path of the spooled file
+    """
+    fd, path = tempfile.mkstemp(dir=directory, prefix='upload_')
+    with os.fdopen(fd, 'wb') as f:
+        shutil.copyfileobj(fileobj, f, length=1024 * 1024)
+    return path
+
+
+def plan_parts(path: str, filename: str = None) -> List[Dict[str, Any]]:
+    """
+    Split a file into independently parseable parts.
+
+    CSV files (optionally gzip-compressed) are a single part, Excel workbooks
+    have one part per sheet and zip archives have one part per CSV member.
+
+    Args:
+        path: Path of the file on disk
+        filename: Original file name, used to detect the format
+
+    Returns:
+        List of part descriptions for parse_part
+    """
+    name = (filename or path).lower()
+
+    if name.endswith(('.csv.gz', '.gz')):
+        return [{'kind': 'csv', 'path': path, 'name': filename, 'compression': 'gzip'}]
+
+    if name.endswith('.csv'):
+        return [{'kind': 'csv', 'path': path, 'name': filename, 'compression': None}]
+
+    if name.endswith(EXCEL_EXTENSIONS):
+        with pd.ExcelFile(path) as workbook:
+            sheets = workbook.sheet_names
+        return [{'kind': 'excel', 'path': path, 'name': filename, 'sheet': sheet} for sheet in sheets]
+
+    if name.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            members = [
+                info.filename for info in archive.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(('.csv', '.csv.gz'))
+            ]
+        if not members:
+            raise ValueError(f"Archive {filename} does not contain CSV files")
+        return [{'kind': 'zip', 'path': path, 'name': filename, 'member': member} for member in members]
+
+    raise ValueError(f"Unsupported file format: {filename}")
+
+
+def parse_part(part: Dict[str, Any], schema: Dict[str, str] = None) -> pd.DataFrame:
+    """
+    Parse a single part into a DataFrame.
+
+    CSV bytes are decoded by the pandas C parser directly from the file, so no
+    intermediate Python string of the whole file is created.
+
+    Args:
+        part: Part description from plan_parts
+        schema: Optional schema; when given only its columns are loaded, already typed
+
+    Returns:
+        Parsed DataFrame
+    """
+    if part['kind'] in ('csv', 'zip'):
+        if schema is not None:
+            return read_typed_csv(part, schema)
+        with _open_csv(part) as f:
+            return pd.read_csv(f, compression=_csv_compression(part), encoding='utf-8')
+
+    if part['kind'] == 'excel':
+        if schema is None:
+            return pd.read_excel(part['path'], sheet_name=part['sheet'])
+
+        df = pd.read_excel(part['path'], sheet_name=part['sheet'], usecols=lambda col: col in schema)
+        missing = [col for col in schema if col not in df.columns]
+        if missing:
+            raise MissingColumnsError(missing)
+        return apply_schema(df, schema)
+
+    raise ValueError(f"Unknown part kind: {part['kind']}")
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    """
+    Get the process pool shared by all reads, starting it on first use.
+
+    Starting worker processes costs more than parsing a small file, so the
+    pool is kept for the life of the process instead of per request.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=INGESTION_CONFIG['max_workers'])
+        return _executor
+
+
+def _reset_process_pool() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def read_files(files: List[Tuple[str, str]], max_workers: int = None,
+               schema: Dict[str, str] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Read one or more files (and all of their sheets or members) into a single DataFrame.
+
+    Parts are parsed in parallel in the shared worker processes when there is
+    more than one; a single part is parsed in the calling process.
+
+    Args:
+        files: List of (path on disk, original file name) pairs
+        max_workers: Maximum number of worker processes (1 parses in the calling process).
+            Defaults to the configured value, which is also the size of the shared pool.
+        schema: Optional input schema applied at read time (see TRANSACTION_SCHEMA)
+
+    Returns:
+        Tuple of the concatenated DataFrame and an ingestion report with throughput
+        and the number of missing dates per date column
+    """
+    start = time.perf_counter()
+
+    parts = []
+    for path, filename in files:
+        parts.extend(plan_parts(path, filename))
+
+    max_workers = min(max_workers or INGESTION_CONFIG['max_workers'], INGESTION_CONFIG['max_workers'], len(parts))
+    if max_workers > 1:
+        try:
+            frames = list(_process_pool().map(parse_part, parts, [schema] * len(parts)))
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a new pool for the next read
+            _reset_process_pool()
+            raise
+    else:
+        frames = [parse_part(part, schema) for part in parts]
+
+    if len(frames) == 1:
+        df = frames[0]
+    else:
+        # Align categories so concatenation keeps categorical columns compact
+        if schema is not None:
+            for col, dtype in schema.items():
+                if dtype == 'category':
+                    categories = union_categoricals([frame[col] for frame in frames]).categories
+                    for frame in frames:
+                        frame[col] = frame[col].cat.set_categories(categories)
+        df = pd.concat(frames, ignore_index=True)
+
+    elapsed = time.perf_counter() - start
+    total_bytes = sum(os.path.getsize(path) for path, _ in files)
+
+    report = {
+        'files': [filename for _, filename in files],
+        'parts': len(parts),
+        'workers': max(max_workers, 1),
+        'rows': len(df),
+        # Blank or unparseable dates; these rows are dropped by the analysis
+        'missing_dates': {col: int(df[col].isna().sum()) for col, dtype in (schema or {}).items() if dtype == 'datetime'},
+        'bytes': total_bytes,
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(len(df) / elapsed, 1) if elapsed > 0 else None,
+        'mb_per_second': round(total_bytes / 1e6 / elapsed, 2) if elapsed > 0 else None
+    }
+
+    return df, report
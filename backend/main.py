@@ -1,12 +1,11 @@
+import asyncio
 import os
 import json
 import sys
-import pandas as pd
 from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Form, BackgroundTasks, Body
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer
-from fastapi.staticfiles import StaticFiles
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 import jwt
@@ -15,17 +14,20 @@ import uuid
 
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.config import PROJECT_NAME, BACKEND_URL, FRONTEND_URL, JWT_SECRET, JWT_ALGORITHM, JWT_EXPIRATION
+from config.config import PROJECT_NAME, BACKEND_URL, FRONTEND_URL, JWT_SECRET, JWT_ALGORITHM, JWT_EXPIRATION, USAGE_CONFIG
 
 # Import local modules
-from rfm_service import RFMAnalysisService
-from openai_service import OpenAIService
 from database import create_tables
+import auth
+from usage import reconcile_periodically
+from http_cache import CachedStaticFiles
+from compression import CompressionMiddleware
 
 # Import routers
 from routes.auth import router as auth_router
 from routes.analysis import router as analysis_router
 from routes.users import router as users_router
+from rfm_api import router as rfm_router
 
 # Models
 class AnalysisResult(BaseModel):
@@ -50,19 +52,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses (analysis results, chart data) for the trip through the proxy
+app.add_middleware(CompressionMiddleware)
+
 # OAuth2 scheme for authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 # Create storage directory if it doesn't exist
 os.makedirs("storage/analysis_history", exist_ok=True)
 
-# Serve static files (analysis results)
-app.mount("/storage", StaticFiles(directory="storage"), name="storage")
+# Serve static files (analysis results), with ETags, Cache-Control and byte ranges
+app.mount("/storage", CachedStaticFiles(directory="storage"), name="storage")
 
 # Include routers
 app.include_router(auth_router)
 app.include_router(analysis_router)
 app.include_router(users_router)
+# Column-mapped analyses, batch scoring and their history; signed-in users only
+app.include_router(rfm_router, prefix="/api", dependencies=[Depends(auth.get_current_user)])
 
 # Authentication dependency
 async def get_current_user(token: str = Depends(oauth2_scheme)):
@@ -85,6 +92,9 @@ async def health_check():
 async def startup_event():
     create_tables()
     print("Database tables created or verified.")
+    
+    # Backfill usage counters of existing users, then correct any drift, in the background
+    asyncio.create_task(reconcile_periodically(USAGE_CONFIG['reconcile_interval_seconds']))
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,113 @@
+# RFM Matrix - Segment Migration Module
+
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# State of customers missing from one of the two analyses: new customers
+# come from it, lost customers go to it
+ABSENT = 'Absent'
+
+
+def _segment_codes(column: pa.ChunkedArray, names: List[str]) -> np.ndarray:
+    """
+    Encode a segment column as indexes into names, appending unseen segments to names.
+    """
+    codes = []
+    for chunk in column.chunks:
+        if not pa.types.is_dictionary(chunk.type):
+            chunk = chunk.dictionary_encode()
+        chunk_names = chunk.dictionary.to_pylist()
+        for name in chunk_names:
+            if name not in names:
+                names.append(name)
+        remap = np.array([names.index(name) for name in chunk_names], dtype=np.int16)
+        codes.append(remap[chunk.indices.to_numpy(zero_copy_only=False)])
+
+    return np.concatenate(codes) if codes else np.zeros(0, dtype=np.int16)
+
+
+def read_scored_customers(path: str, names: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Read the customer keys, segments and monetary values of a stored scored-customer table.
+
+    Customer IDs themselves are not read: customers are matched on their keys.
+
+    Args:
+        path: Parquet file written by customer_store.write_scored_customers
+        names: Segment names seen so far; segments of this table are appended
+
+    Returns:
+        Tuple of customer keys (sorted), segment codes and monetary values
+    """
+    table = pq.read_table(path, columns=['customer_key', 'segment', 'monetary'])
+
+    keys = table.column('customer_key').to_numpy()
+    codes = _segment_codes(table.column('segment'), names)
+    monetary = table.column('monetary').to_numpy().astype(np.float64, copy=False)
+
+    # Tables are written sorted by key; sort any other input once
+    if len(keys) > 1 and not (keys[1:] >= keys[:-1]).all():
+        order = np.argsort(keys, kind='stable')
+        keys, codes, monetary = keys[order], codes[order], monetary[order]
+
+    return keys, codes, monetary
+
+
+def migration_matrix(before_path: str, after_path: str) -> Dict[str, Any]:
+    """
+    Compute how customers moved between segments from one analysis to another.
+
+    Customers are merge-joined on their sorted keys with a vectorized binary
+    search, then transitions are counted with a single bincount, so no
+    string is compared or hashed. Customers present in only one analysis
+    move from or to the ABSENT state.
+
+    Args:
+        before_path: Scored customers of the earlier analysis
+        after_path: Scored customers of the later analysis
+
+    Returns:
+        Dictionary with the list of states (segment names followed by ABSENT)
+        and three matrices indexed [state before][state after]: customers,
+        revenue_before and revenue_after (monetary value in each analysis),
+        plus the numbers of retained, new and lost customers
+    """
+    names = []
+    keys_before, codes_before, monetary_before = read_scored_customers(before_path, names)
+    keys_after, codes_after, monetary_after = read_scored_customers(after_path, names)
+
+    # Merge join: position of every later customer among the earlier ones
+    positions = np.searchsorted(keys_before, keys_after)
+    positions[positions == len(keys_before)] = 0
+    retained = (keys_before[positions] == keys_after) if len(keys_before) else np.zeros(len(keys_after), dtype=bool)
+    matched = positions[retained]
+    lost = np.ones(len(keys_before), dtype=bool)
+    lost[matched] = False
+
+    absent = len(names)
+    n_states = absent + 1
+
+    # One (before, after) pair per retained, new and lost customer
+    source = np.concatenate([codes_before[matched], np.full((~retained).sum(), absent), codes_before[lost]])
+    target = np.concatenate([codes_after[retained], codes_after[~retained], np.full(lost.sum(), absent)])
+    transitions = source.astype(np.int64) * n_states + target
+
+    def flow(weights=None) -> np.ndarray:
+        return np.bincount(transitions, weights=weights, minlength=n_states * n_states).reshape(n_states, n_states)
+
+    customers = flow()
+    revenue_before = flow(np.concatenate([monetary_before[matched], np.zeros((~retained).sum()), monetary_before[lost]]))
+    revenue_after = flow(np.concatenate([monetary_after[retained], monetary_after[~retained], np.zeros(lost.sum())]))
+
+    return {
+        'states': names + [ABSENT],
+        'customers': customers.tolist(),
+        'revenue_before': revenue_before.tolist(),
+        'revenue_after': revenue_after.tolist(),
+        'retained_customers': int(retained.sum()),
+        'new_customers': int((~retained).sum()),
+        'lost_customers': int(lost.sum())
+    }
@@ -1,26 +1,40 @@
-import openai
 import json
 import sys
 import os
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.config import OPENAI_API_KEY, OPENAI_MODEL, AI_PROMPTS
 
-# Set OpenAI API key
-openai.api_key = OPENAI_API_KEY
+def _openai():
+    """
+    Import the OpenAI client on first use and set the API key.
+    
+    The client library is slow to import, so it is kept out of API start-up.
+    """
+    import openai
+    openai.api_key = OPENAI_API_KEY
+    return openai
+
+def _record_tokens(response: Any, usage: Optional[Dict[str, int]]) -> None:
+    """
+    Add the tokens a completion used to a usage dictionary, under 'llm_tokens'.
+    """
+    if usage is not None:
+        usage['llm_tokens'] = usage.get('llm_tokens', 0) + response.usage.total_tokens
 
 class OpenAIService:
     """Service for generating insights using OpenAI GPT models."""
     
     @staticmethod
-    async def generate_rfm_insights(analysis_summary: Dict[str, Any]) -> str:
+    async def generate_rfm_insights(analysis_summary: Dict[str, Any], usage: Optional[Dict[str, int]] = None) -> str:
         """
         Generate marketing insights for RFM analysis results.
         
         Args:
             analysis_summary: Summary of RFM analysis results
+            usage: Optional dictionary the tokens used are added to (see usage.add_usage)
             
         Returns:
             Generated insights as string
@@ -33,7 +47,7 @@ class OpenAIService:
             prompt = AI_PROMPTS["rfm_insights"].format(analysis_summary=analysis_text)
             
             # Call OpenAI API
-            response = await openai.ChatCompletion.acreate(
+            response = await _openai().ChatCompletion.acreate(
                 model=OPENAI_MODEL,
                 messages=[
                     {"role": "system", "content": "You are a marketing and RFM analysis expert."},
@@ -43,6 +57,8 @@ class OpenAIService:
                 max_tokens=2000
             )
             
+            _record_tokens(response, usage)
+            
             # Extract and return the generated text
             return response.choices[0].message.content
         
@@ -51,12 +67,13 @@ class OpenAIService:
             return "Não foi possível gerar insights. Por favor, tente novamente mais tarde."
     
     @staticmethod
-    async def generate_churn_insights(churn_data: Dict[str, Any]) -> str:
+    async def generate_churn_insights(churn_data: Dict[str, Any], usage: Optional[Dict[str, int]] = None) -> str:
         """
         Generate insights for churn prediction data.
         
         Args:
             churn_data: Churn prediction data
+            usage: Optional dictionary the tokens used are added to (see usage.add_usage)
             
         Returns:
             Generated insights as string
@@ -69,7 +86,7 @@ class OpenAIService:
             prompt = AI_PROMPTS["churn_prediction"].format(churn_data=churn_text)
             
             # Call OpenAI API
-            response = await openai.ChatCompletion.acreate(
+            response = await _openai().ChatCompletion.acreate(
                 model=OPENAI_MODEL,
                 messages=[
                     {"role": "system", "content": "You are a customer retention and churn prevention expert."},
@@ -79,6 +96,8 @@ class OpenAIService:
                 max_tokens=1500
             )
             
+            _record_tokens(response, usage)
+            
             # Extract and return the generated text
             return response.choices[0].message.content
         
@@ -87,12 +106,13 @@ class OpenAIService:
             return "Não foi possível gerar insights de churn. Por favor, tente novamente mais tarde."
     
     @staticmethod
-    async def generate_ltv_insights(ltv_data: Dict[str, Any]) -> str:
+    async def generate_ltv_insights(ltv_data: Dict[str, Any], usage: Optional[Dict[str, int]] = None) -> str:
         """
         Generate insights for LTV optimization.
         
         Args:
             ltv_data: Lifetime Value data
+            usage: Optional dictionary the tokens used are added to (see usage.add_usage)
             
         Returns:
             Generated insights as string
@@ -105,7 +125,7 @@ class OpenAIService:
             prompt = AI_PROMPTS["ltv_optimization"].format(ltv_data=ltv_text)
             
             # Call OpenAI API
-            response = await openai.ChatCompletion.acreate(
+            response = await _openai().ChatCompletion.acreate(
                 model=OPENAI_MODEL,
                 messages=[
                     {"role": "system", "content": "You are a customer lifetime value optimization expert."},
@@ -115,6 +135,8 @@ class OpenAIService:
                 max_tokens=1500
             )
             
+            _record_tokens(response, usage)
+            
             # Extract and return the generated text
             return response.choices[0].message.content
         
@@ -0,0 +1,212 @@
+# RFM Matrix - Parallel Aggregation Module
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import AGGREGATION_CONFIG
+
+# Marks customers with no transaction in the output buffers
+NO_DATE = np.iinfo(np.int64).min
+
+
+class SharedArrays:
+    """
+    NumPy arrays backed by named shared memory blocks.
+
+    Worker processes attach to the blocks by name, so arrays are never pickled.
+    """
+
+    def __init__(self):
+        self.blocks: List[shared_memory.SharedMemory] = []
+        self.specs: Dict[str, Tuple[str, str, int]] = {}
+        self.arrays: Dict[str, np.ndarray] = {}
+
+    def create(self, name: str, dtype: np.dtype, length: int, fill=None) -> np.ndarray:
+        """
+        Allocate a shared array.
+
+        Args:
+            name: Name of the array within this set
+            dtype: NumPy dtype of the array
+            length: Number of elements
+            fill: Optional initial value
+
+        Returns:
+            Array view of the shared block
+        """
+        dtype = np.dtype(dtype)
+        block = shared_memory.SharedMemory(create=True, size=max(1, length * dtype.itemsize))
+        array = np.ndarray(length, dtype=dtype, buffer=block.buf)
+        if fill is not None:
+            array.fill(fill)
+
+        self.blocks.append(block)
+        self.specs[name] = (block.name, dtype.str, length)
+        self.arrays[name] = array
+        return array
+
+    def close(self) -> None:
+        """
+        Release and remove every block.
+        """
+        self.arrays.clear()
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks.clear()
+
+    def __enter__(self) -> 'SharedArrays':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _attach(specs: Dict[str, Tuple[str, str, int]]) -> Tuple[List[shared_memory.SharedMemory], Dict[str, np.ndarray]]:
+    """
+    Attach to shared arrays from a worker process.
+    """
+    blocks, arrays = [], {}
+    for name, (block_name, dtype, length) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(length, dtype=np.dtype(dtype), buffer=block.buf)
+    return blocks, arrays
+
+
+def shard_of(codes: np.ndarray, n_shards: int) -> np.ndarray:
+    """
+    Assign customers to shards by hashing their codes.
+
+    Args:
+        codes: Integer customer codes
+        n_shards: Number of shards
+
+    Returns:
+        Shard number of every code
+    """
+    return (pd.util.hash_array(codes) % np.uint64(n_shards)).astype(np.uint8 if n_shards <= 256 else np.uint32)
+
+
+def _aggregate_shard(specs: Dict[str, Tuple[str, str, int]], start: int, end: int) -> int:
+    """
+    Aggregate the transactions of one shard into the shared output arrays.
+
+    Every customer belongs to exactly one shard, so workers write to disjoint
+    positions of the outputs and nothing is sent back but a row count.
+    """
+    blocks, arrays = _attach(specs)
+    try:
+        _aggregate_rows(arrays, start, end)
+        return end - start
+    finally:
+        # Views must be released before the blocks can be closed
+        arrays.clear()
+        for block in blocks:
+            block.close()
+
+
+def _aggregate_rows(arrays: Dict[str, np.ndarray], start: int, end: int) -> None:
+    shard = pd.DataFrame({
+        'code': arrays['codes'][start:end],
+        'date': arrays['dates'][start:end],
+        'valid_id': arrays['valid_ids'][start:end],
+        'amount': arrays['amounts'][start:end]
+    })
+    grouped = shard.groupby('code', sort=False).agg(
+        date=('date', 'max'),
+        count=('valid_id', 'sum'),
+        amount=('amount', 'sum')
+    )
+
+    codes = grouped.index.to_numpy()
+    arrays['last_date'][codes] = grouped['date'].to_numpy()
+    arrays['frequency'][codes] = grouped['count'].to_numpy()
+    arrays['monetary'][codes] = grouped['amount'].to_numpy()
+
+
+def parallel_calculate_rfm(data: pd.DataFrame, analysis_date: datetime = None, n_workers: int = None) -> pd.DataFrame:
+    """
+    Calculate RFM metrics for each customer across several worker processes.
+
+    Transactions are hash-partitioned by customer into one shard per worker.
+    The columns are copied once into shared memory, grouped by shard; each
+    worker aggregates its shard in place and writes the per-customer results
+    into shared output arrays indexed by customer code.
+
+    The result is the same as RFMAnalysisService.calculate_rfm.
+
+    Args:
+        data: Preprocessed transactions with customer_id, transaction_id,
+            transaction_date and transaction_amount columns
+        analysis_date: Reference date for recency calculation. If None, uses current date.
+        n_workers: Number of worker processes. Defaults to the configured value.
+
+    Returns:
+        DataFrame with recency, frequency and monetary columns indexed by customer_id
+    """
+    if analysis_date is None:
+        analysis_date = datetime.now()
+    n_workers = n_workers or AGGREGATION_CONFIG['n_workers']
+
+    # Integer customer codes in the same order as a groupby on customer_id
+    customer_ids = data['customer_id']
+    if isinstance(customer_ids.dtype, pd.CategoricalDtype):
+        codes = customer_ids.cat.codes.to_numpy().astype(np.int64)
+        n_customers = len(customer_ids.cat.categories)
+    else:
+        codes, uniques = pd.factorize(customer_ids, sort=True)
+        codes = codes.astype(np.int64)
+        n_customers = len(uniques)
+
+    # Order transactions by shard (a linear-time radix sort on small integers)
+    shards = shard_of(codes, n_workers)
+    order = np.argsort(shards, kind='stable')
+    bounds = np.searchsorted(shards[order], np.arange(n_workers + 1), side='left')
+    del shards
+
+    amounts = data['transaction_amount'].to_numpy()
+    with SharedArrays() as shared:
+        np.take(codes, order, out=shared.create('codes', np.int64, len(order)))
+        np.take(data['transaction_date'].to_numpy('datetime64[ns]').view(np.int64), order, out=shared.create('dates', np.int64, len(order)))
+        np.take(data['transaction_id'].notna().to_numpy(), order, out=shared.create('valid_ids', np.bool_, len(order)))
+        np.take(amounts, order, out=shared.create('amounts', amounts.dtype, len(order)))
+
+        last_date = shared.create('last_date', np.int64, n_customers, fill=NO_DATE)
+        frequency = shared.create('frequency', np.int64, n_customers, fill=0)
+        monetary = shared.create('monetary', np.float64, n_customers, fill=0)
+
+        shards = [(int(bounds[i]), int(bounds[i + 1])) for i in range(n_workers) if bounds[i + 1] > bounds[i]]
+        if n_workers > 1:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                list(executor.map(_aggregate_shard, [shared.specs] * len(shards), *zip(*shards)))
+        else:
+            for start, end in shards:
+                _aggregate_shard(shared.specs, start, end)
+
+        # Keep only customers that have transactions
+        present = np.flatnonzero(last_date != NO_DATE)
+        last_dates = pd.to_datetime(last_date[present])
+        rfm = pd.DataFrame({
+            'recency': (analysis_date - last_dates).days.to_numpy(),
+            'frequency': frequency[present],
+            'monetary': monetary[present].astype(amounts.dtype)
+        })
+        del last_date, frequency, monetary
+
+    if isinstance(customer_ids.dtype, pd.CategoricalDtype):
+        index = pd.CategoricalIndex(pd.Categorical.from_codes(present, dtype=customer_ids.dtype), name='customer_id')
+    else:
+        index = pd.Index(uniques[present], name='customer_id')
+    rfm.index = index
+
+    return rfm
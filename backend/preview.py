@@ -0,0 +1,152 @@
+# RFM Matrix - Analysis Preview Module
+
+import math
+import os
+import sys
+from datetime import datetime
+from statistics import NormalDist
+from typing import Dict, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import PREVIEW_CONFIG
+
+from rfm_service import RFMAnalysisService
+
+# Sampling thresholds are compared against 64-bit customer hashes
+HASH_RANGE = 2.0 ** 64
+
+
+def customer_hashes(customer_ids: pd.Series) -> np.ndarray:
+    """
+    Hash customer IDs by value, so a customer hashes the same in every file and run.
+
+    Args:
+        customer_ids: Customer ID column (categorical IDs are hashed per category)
+
+    Returns:
+        uint64 hash of every row
+    """
+    if isinstance(customer_ids.dtype, pd.CategoricalDtype):
+        category_hashes = pd.util.hash_array(customer_ids.cat.categories.to_numpy(dtype=object))
+        # Missing IDs (code -1) are dropped by preprocessing, any hash will do
+        return category_hashes[customer_ids.cat.codes.to_numpy()]
+    return pd.util.hash_pandas_object(customer_ids, index=False).to_numpy()
+
+
+def sample_transactions(data: pd.DataFrame, rate: float) -> pd.DataFrame:
+    """
+    Sample customers with every one of their transactions.
+
+    Customers are kept when their hash falls below rate, so the sample is
+    uniform over customers and each sampled customer's recency, frequency
+    and monetary values are exact.
+
+    Args:
+        data: Transaction data
+        rate: Fraction of customers to keep
+
+    Returns:
+        Transactions of the sampled customers, as a new frame
+    """
+    if rate >= 1:
+        return data.copy()
+    threshold = np.uint64(int(rate * HASH_RANGE))
+    return data[customer_hashes(data['customer_id']) < threshold]
+
+
+def wilson_interval(successes: int, n: int, confidence: float, population: float = None) -> Tuple[float, float]:
+    """
+    Wilson score interval of a proportion observed in a sample.
+
+    Args:
+        successes: Number of sampled customers with the property
+        n: Number of sampled customers
+        confidence: Confidence level, e.g. 0.95
+        population: Population size; applies the finite population correction,
+            so a sample of the whole population gives a zero-width interval
+
+    Returns:
+        Lower and upper bounds of the proportion
+    """
+    if n == 0:
+        return 0.0, 1.0
+
+    p = successes / n
+    effective_n = n
+    if population is not None and population > 1:
+        correction = (population - n) / (population - 1)
+        if correction <= 0:
+            return p, p
+        effective_n = n / correction
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    denominator = 1 + z ** 2 / effective_n
+    centre = (p + z ** 2 / (2 * effective_n)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / effective_n + z ** 2 / (4 * effective_n ** 2)) / denominator
+
+    return max(0.0, centre - half_width), min(1.0, centre + half_width)
+
+
+def preview_analysis(data: pd.DataFrame, sample_customers: int = None, confidence: float = None,
+                     analysis_date: datetime = None, n_tiles: int = None, engine: str = None,
+                     decay_half_life: float = None) -> Dict[str, Any]:
+    """
+    Approximate RFM analysis of a customer sample.
+
+    The summary has the format of RFMAnalysisService.generate_summary, with
+    totals scaled up to the estimated population. Every segment also gets
+    confidence intervals of its percentage and customer count, and a
+    'preview' entry describes the sample. Averages are those of the sample.
+
+    Args:
+        data: Transaction data (not modified)
+        sample_customers: Approximate number of customers to analyze. Defaults to the configured value.
+        confidence: Confidence level of the intervals. Defaults to the configured value.
+        analysis_date: Reference date for recency calculation
+        n_tiles: Number of score levels per metric
+        engine: Analysis engine name
+        decay_half_life: Half-life in days of time-decayed scoring
+
+    Returns:
+        Approximate analysis summary
+    """
+    sample_customers = sample_customers or PREVIEW_CONFIG['sample_customers']
+    confidence = confidence or PREVIEW_CONFIG['confidence']
+
+    total_ids = data['customer_id'].nunique()
+    rate = min(1.0, sample_customers / total_ids) if total_ids else 1.0
+
+    summary = RFMAnalysisService(
+        sample_transactions(data, rate), n_tiles=n_tiles, engine=engine, decay_half_life=decay_half_life
+    ).perform_full_analysis(analysis_date)
+
+    # Scale totals up by the sampling rate (customers with only invalid rows are not counted)
+    sampled = summary['total_customers']
+    population = sampled / rate
+    summary['total_customers'] = int(round(population))
+    summary['total_revenue'] = summary['total_revenue'] / rate
+
+    for segment in summary['segment_distribution'].values():
+        low, high = wilson_interval(segment['count'], sampled, confidence, population)
+        segment['count'] = int(round(segment['count'] / rate))
+        segment['total_revenue'] = segment['total_revenue'] / rate
+        segment['percentage_interval'] = [low * 100, high * 100]
+        segment['count_interval'] = [int(math.floor(low * population)), int(math.ceil(high * population))]
+
+    if 'cohorts' in summary:
+        summary['cohorts'] = {cohort: int(round(count / rate)) for cohort, count in summary['cohorts'].items()}
+
+    # Score cells count sampled customers only; what-if re-segmentation needs the exact result
+    del summary['score_cells']
+
+    summary['preview'] = {
+        'sampled_customers': sampled,
+        'sampling_rate': rate,
+        'confidence': confidence
+    }
+
+    return summary
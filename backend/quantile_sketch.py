@@ -0,0 +1,393 @@
+# RFM Matrix - Quantile Sketch Module
+
+import argparse
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import QUANTILE_SKETCH_CONFIG, BATCH_SCORING_CONFIG
+
+from rfm_analysis import RFMAnalysis, segment_rule_lookup
+from scoring import quantile_levels, assign_scores, rfm_group_code
+
+# Metrics tracked by an RFM sketch
+METRICS = ('recency', 'frequency', 'monetary')
+
+# Capacity decay between compactor levels (KLL)
+CAPACITY_DECAY = 2 / 3
+
+
+def capacity_for_epsilon(epsilon: float) -> int:
+    """
+    Get the top compactor capacity giving a rank error of about epsilon.
+
+    Args:
+        epsilon: Target rank error, e.g. 0.01 for 1%
+
+    Returns:
+        Capacity k of the sketch
+    """
+    if not 0 < epsilon < 1:
+        raise ValueError("epsilon must be between 0 and 1")
+    return max(8, int(math.ceil(3.0 / epsilon)))
+
+
+class QuantileSketch:
+    """
+    Mergeable KLL quantile sketch of a stream of numbers.
+
+    Items are buffered in compactors; compactor h holds items of weight 2^h.
+    When a compactor is full its items are sorted and every other one (with a
+    random offset) is promoted to the next level. Memory is O(k log(n/k)) and
+    sketches built on separate chunks or workers can be merged.
+    """
+
+    def __init__(self, epsilon: float = None, seed: int = None):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            epsilon: Target rank error. Defaults to the configured value.
+            seed: Seed of the compaction coin flips, for reproducible results
+        """
+        self.epsilon = epsilon or QUANTILE_SKETCH_CONFIG['epsilon']
+        self.k = capacity_for_epsilon(self.epsilon)
+        self.rng = np.random.default_rng(seed)
+        self.compactors = [np.empty(0)]
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * CAPACITY_DECAY ** depth)))
+
+    def _compress(self) -> None:
+        """
+        Compact full levels, from the bottom up, until every level fits.
+        """
+        level = 0
+        while level < len(self.compactors):
+            items = self.compactors[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append(np.empty(0))
+
+                items = np.sort(items)
+                kept = items[:0]
+                if len(items) % 2:
+                    # Keep one item back so the promoted weights add up exactly
+                    index = self.rng.integers(len(items))
+                    kept = items[index:index + 1]
+                    items = np.delete(items, index)
+
+                promoted = items[self.rng.integers(2)::2]
+                self.compactors[level] = kept
+                self.compactors[level + 1] = np.concatenate([self.compactors[level + 1], promoted])
+            level += 1
+
+    def update(self, values: Sequence[float]) -> 'QuantileSketch':
+        """
+        Add a batch of values to the sketch. Missing values are ignored.
+
+        Args:
+            values: Values to add
+
+        Returns:
+            The sketch itself
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+
+        self.compactors[0] = np.concatenate([self.compactors[0], values])
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._compress()
+        return self
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        """
+        Merge another sketch (e.g. built on another chunk or worker) into this one.
+
+        Args:
+            other: Sketch to merge
+
+        Returns:
+            The sketch itself
+        """
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append(np.empty(0))
+        for level, items in enumerate(other.compactors):
+            self.compactors[level] = np.concatenate([self.compactors[level], items])
+
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    @property
+    def is_exact(self) -> bool:
+        """True while no compaction happened, i.e. every value is still stored."""
+        return len(self.compactors) == 1
+
+    def quantiles(self, levels: Sequence[float]) -> np.ndarray:
+        """
+        Estimate quantiles of the values added so far.
+
+        The result is exact (same definition as np.quantile) while nothing
+        was compacted; otherwise it is interpolated from the weighted items.
+
+        Args:
+            levels: Quantile levels between 0 and 1
+
+        Returns:
+            Array of estimated quantiles
+        """
+        if self.count == 0:
+            raise ValueError("Cannot compute quantiles of an empty sketch")
+
+        levels = np.asarray(levels, dtype=np.float64)
+        if self.is_exact:
+            return np.quantile(self.compactors[0], levels)
+
+        items = np.concatenate(self.compactors)
+        weights = np.concatenate([np.full(len(c), 2.0 ** h) for h, c in enumerate(self.compactors)])
+        order = np.argsort(items, kind='stable')
+        items, weights = items[order], weights[order]
+
+        # Each item stands for the ranks it carries; place it at their centre
+        centres = np.cumsum(weights) - weights / 2
+        positions = np.concatenate([[0.0], centres, [self.count]])
+        values = np.concatenate([[self.min], items, [self.max]])
+
+        return np.interp(levels * self.count, positions, values)
+
+    def __len__(self) -> int:
+        return sum(len(c) for c in self.compactors)
+
+
+class RFMSketch:
+    """Quantile sketches of recency, frequency and monetary value."""
+
+    def __init__(self, epsilon: float = None, seed: int = None):
+        """
+        Initialize empty sketches for the three metrics.
+
+        Args:
+            epsilon: Target rank error. Defaults to the configured value.
+            seed: Base seed of the sketches
+        """
+        self.sketches = {
+            metric: QuantileSketch(epsilon, None if seed is None else seed + i)
+            for i, metric in enumerate(METRICS)
+        }
+
+    @property
+    def count(self) -> int:
+        return self.sketches['recency'].count
+
+    def update(self, recency: Sequence[float], frequency: Sequence[float], monetary: Sequence[float]) -> 'RFMSketch':
+        """
+        Add a chunk of customers to the sketches.
+
+        Args:
+            recency: Recency values of the chunk
+            frequency: Frequency values of the chunk
+            monetary: Monetary values of the chunk
+
+        Returns:
+            The sketch itself
+        """
+        for metric, values in zip(METRICS, (recency, frequency, monetary)):
+            self.sketches[metric].update(values)
+        return self
+
+    def merge(self, other: 'RFMSketch') -> 'RFMSketch':
+        """
+        Merge the sketches of another chunk or worker into these.
+
+        Args:
+            other: Sketch to merge
+
+        Returns:
+            The sketch itself
+        """
+        for metric in METRICS:
+            self.sketches[metric].merge(other.sketches[metric])
+        return self
+
+    def breakpoints(self, levels: Sequence[float]) -> Dict[str, List[float]]:
+        """
+        Estimate the breakpoints of the three metrics.
+
+        Args:
+            levels: Interior quantile levels from scoring.quantile_levels
+
+        Returns:
+            Metric name -> list of breakpoints, as scoring.compute_breakpoints
+        """
+        return {metric: self.sketches[metric].quantiles(levels).tolist() for metric in METRICS}
+
+
+def _iter_customer_chunks(input_path: str, mapping: Dict[str, str], chunk_size: int):
+    """
+    Read a per-customer CSV file in chunks and compute recency in days.
+    """
+    chunks = pd.read_csv(input_path, usecols=list(mapping.values()), chunksize=chunk_size)
+    for chunk in chunks:
+        rfm = RFMAnalysis(chunk, mapping['user_id'], mapping['recency'], mapping['frequency'], mapping['monetary'], None)
+        yield rfm.preprocess_data()
+
+
+def sketch_customer_file(input_path: str, mapping: Dict[str, str], chunk_size: int = None,
+                         epsilon: float = None, seed: int = None) -> RFMSketch:
+    """
+    Build the R, F and M sketches of a customer file, one chunk at a time.
+
+    Args:
+        input_path: Per-customer CSV file
+        mapping: Column mapping with 'user_id', 'recency', 'frequency' and 'monetary' keys
+        chunk_size: Number of rows read per chunk. Defaults to the configured size.
+        epsilon: Target rank error of the sketches
+        seed: Base seed of the sketches; each chunk is seeded with its row offset added
+
+    Returns:
+        Sketch of the whole file
+    """
+    chunk_size = chunk_size or BATCH_SCORING_CONFIG['chunk_size']
+    sketch = RFMSketch(epsilon, seed)
+
+    start = 0
+    for data in _iter_customer_chunks(input_path, mapping, chunk_size):
+        # Sketch each chunk on its own and merge, as workers would; chunks sharing
+        # a seed would make the same compaction choices and bias the merged ranks
+        chunk_sketch = RFMSketch(epsilon, None if seed is None else seed + start).update(
+            data['recency_days'], data[mapping['frequency']], data[mapping['monetary']]
+        )
+        sketch.merge(chunk_sketch)
+        start += chunk_size
+
+    return sketch
+
+
+def score_files_streaming(input_paths: List[str], output_path: str, mapping: Dict[str, str],
+                          n_tiles: int = None, epsilon: float = None, chunk_size: int = None,
+                          max_workers: int = None, seed: int = None) -> Dict[str, Any]:
+    """
+    Score customer files that do not fit in memory, in two streaming passes.
+
+    The first pass builds a sketch per file (in parallel worker processes when
+    there are several files) and merges them into breakpoints. The second pass
+    assigns R, F and M scores and segments chunk by chunk and writes them as
+    Parquet, so memory use does not depend on the number of customers.
+
+    Args:
+        input_paths: Per-customer CSV files
+        output_path: Parquet file to write
+        mapping: Column mapping with 'user_id', 'recency', 'frequency' and 'monetary' keys
+        n_tiles: Number of score levels per metric. Defaults to the configured value.
+        epsilon: Target rank error of the breakpoints
+        chunk_size: Number of rows read per chunk
+        max_workers: Maximum number of worker processes for the first pass
+        seed: Seed of the sketches, for reproducible breakpoints
+
+    Returns:
+        Dictionary with breakpoints, row count, elapsed time and throughput
+    """
+    start = time.perf_counter()
+    chunk_size = chunk_size or BATCH_SCORING_CONFIG['chunk_size']
+    levels = quantile_levels(n_tiles)
+    n_tiles = len(levels) + 1
+
+    # First pass: sketch every file and merge
+    max_workers = min(max_workers or os.cpu_count() or 1, len(input_paths))
+    # Files get seeds 2^32 apart, so no two chunks of different files share one
+    seeds = [None if seed is None else seed + (i << 32) for i in range(len(input_paths))]
+    args = ([mapping] * len(input_paths), [chunk_size] * len(input_paths), [epsilon] * len(input_paths), seeds)
+    if max_workers > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            sketches = list(executor.map(sketch_customer_file, input_paths, *args))
+    else:
+        sketches = list(map(sketch_customer_file, input_paths, *args))
+
+    sketch = sketches[0]
+    for other in sketches[1:]:
+        sketch.merge(other)
+    breakpoints = sketch.breakpoints(levels)
+
+    # Second pass: score each chunk against the merged breakpoints
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    segment_lookup = segment_rule_lookup(n_tiles)
+    rows = 0
+    writer = None
+
+    try:
+        for input_path in input_paths:
+            for data in _iter_customer_chunks(input_path, mapping, chunk_size):
+                scored = pd.DataFrame({
+                    mapping['user_id']: data[mapping['user_id']].to_numpy(),
+                    'recency_days': data['recency_days'].to_numpy(),
+                    'r_score': assign_scores(data['recency_days'], breakpoints['recency'], reverse=True),
+                    'f_score': assign_scores(data[mapping['frequency']], breakpoints['frequency']),
+                    'm_score': assign_scores(data[mapping['monetary']], breakpoints['monetary'])
+                })
+                scored['rfm_score'] = rfm_group_code(scored['r_score'], scored['f_score'], scored['m_score'], n_tiles)
+                scored['segment'] = scored['rfm_score'].map(segment_lookup)
+
+                table = pa.Table.from_pandas(scored, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)
+                rows += len(scored)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    elapsed = time.perf_counter() - start
+
+    return {
+        'rows': rows,
+        'n_tiles': n_tiles,
+        'breakpoints': breakpoints,
+        'exact': all(s.is_exact for s in sketch.sketches.values()),
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed, 1) if elapsed > 0 else None,
+        'output_file': output_path
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score customer files with approximate quantiles in two streaming passes")
+    parser.add_argument("--input", required=True, nargs="+", help="Customer CSV files to score")
+    parser.add_argument("--output", required=True, help="Parquet file to write")
+    parser.add_argument("--user-id-col", required=True)
+    parser.add_argument("--recency-col", required=True)
+    parser.add_argument("--frequency-col", required=True)
+    parser.add_argument("--monetary-col", required=True)
+    parser.add_argument("--n-tiles", type=int, default=None, help="Score levels per metric")
+    parser.add_argument("--epsilon", type=float, default=None, help="Target rank error of the quantiles")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Rows per chunk")
+    args = parser.parse_args()
+
+    column_mapping = {
+        'user_id': args.user_id_col,
+        'recency': args.recency_col,
+        'frequency': args.frequency_col,
+        'monetary': args.monetary_col
+    }
+    stats = score_files_streaming(args.input, args.output, column_mapping, args.n_tiles, args.epsilon, args.chunk_size)
+    print(f"Scored {stats['rows']} rows in {stats['elapsed_seconds']}s ({stats['rows_per_second']} rows/s) -> {stats['output_file']}")
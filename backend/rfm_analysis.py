@@ -4,21 +4,136 @@ import pandas as pd
 import numpy as np
 import json
 import datetime
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
-import xgboost as xgb
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
-from sklearn.metrics import silhouette_score
+import os
+import joblib
+
+# scikit-learn and XGBoost take seconds to import, so they are imported on first
+# use inside the PredictiveAnalytics methods instead of when the API starts
+
+from customer_store import write_customer_table
+from charts import write_chart_payloads
+from ingestion import parse_dates
+from scoring import SCORE_LEVELS, quantile_levels, compute_breakpoints, assign_scores, rescale_scores, rfm_group_code
+
+# Segmentation Rules
+def segment_rule(r, f, m):
+    """
+    Map a customer's R, F and M scores to a segment name
+    """
+    # Champions: high recency, frequency, and monetary value
+    if r >= 4 and f >= 4 and m >= 4:
+        return "Campeões"
+    
+    # Loyal Customers: high frequency and monetary value
+    elif (f >= 3 and m >= 3) and r >= 3:
+        return "Clientes Fiéis"
+    
+    # Potential Loyalists: recent customers with average frequency
+    elif r >= 4 and (f >= 2 and f < 4) and (m >= 2 and m < 4):
+        return "Fiéis em Potencial"
+    
+    # New Customers: recent customers with low frequency
+    elif r >= 4 and f <= 1:
+        return "Novos Clientes"
+    
+    # Promising: recent customers with low frequency but high monetary value
+    elif r >= 3 and f <= 2 and m >= 3:
+        return "Clientes Promissores"
+    
+    # Customers Needing Attention: average recency and frequency
+    elif (r >= 2 and r < 4) and (f >= 2 and f < 4) and (m >= 2 and m < 4):
+        return "Clientes que Precisam de Atenção"
+    
+    # About to Sleep: low recency, average frequency and monetary value
+    elif r <= 2 and (f >= 2 and f < 4) and (m >= 2 and m < 4):
+        return "Clientes Quase Dormentes"
+    
+    # Can't Lose Them: low recency but high frequency and monetary value
+    elif r <= 2 and f >= 3 and m >= 3:
+        return "Clientes que Não Posso Perder"
+    
+    # At Risk: low recency and average frequency
+    elif r <= 2 and (f >= 2 and f < 4):
+        return "Clientes em Risco"
+    
+    # Hibernating: low recency, frequency, and monetary value
+    elif r <= 1 and f <= 2 and m <= 2:
+        return "Clientes Hibernando"
+    
+    # Lost: lowest recency and frequency
+    elif r <= 1 and f <= 1:
+        return "Clientes Perdidos"
+    
+    # Default
+    else:
+        return "Outros"
+
+def segment_rule_lookup(n_tiles):
+    """
+    Resolve segment_rule once for every combination of scores, keyed by RFM score code.
+    Segment names only depend on the (r, f, m) scores.
+    """
+    scores = np.arange(1, n_tiles + 1)
+    return {
+        int(rfm_group_code(r, f, m, n_tiles)): segment_rule(
+            *[int(rescale_scores(score, n_tiles, SCORE_LEVELS)) for score in (r, f, m)]
+        )
+        for r in scores for f in scores for m in scores
+    }
+
+def summarize_distribution(values, bins=20, value_range=None):
+    """
+    Summarize a per-customer prediction as a histogram and quantiles
+    
+    The size of the summary is fixed by the number of bins, not by the
+    number of customers.
+    
+    Parameters:
+    -----------
+    values : pandas.Series
+        Per-customer values (e.g. churn probability or predicted LTV)
+    bins : int
+        Number of histogram bins
+    value_range : tuple, optional
+        Lower and upper edge of the histogram. Defaults to the data range.
+    
+    Returns:
+    --------
+    dict
+        Histogram counts and edges, quantiles, mean and count
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    
+    if len(values) == 0:
+        return {'count': 0, 'mean': None, 'quantiles': {}, 'histogram': {'bin_edges': [], 'counts': []}}
+    
+    counts, edges = np.histogram(values, bins=bins, range=value_range)
+    levels = [0.05, 0.25, 0.5, 0.75, 0.95]
+    quantiles = np.quantile(values, levels)
+    
+    return {
+        'count': int(len(values)),
+        'mean': float(values.mean()),
+        'quantiles': {f'p{int(level * 100):02d}': float(q) for level, q in zip(levels, quantiles)},
+        'histogram': {
+            'bin_edges': edges.tolist(),
+            'counts': counts.tolist()
+        }
+    }
 
 # RFM Segmentation Class
 class RFMAnalysis:
-    def __init__(self, data, user_id_col, recency_col, frequency_col, monetary_col, segment_type):
+    def __init__(self, data, user_id_col, recency_col, frequency_col, monetary_col, segment_type, n_tiles=None, cut_points=None, copy=False):
         """
         Initialize RFM Analysis with the customer data and column mappings
         
+        Preprocessing only reads `data` and builds a new frame with the four
+        columns the analysis needs; scoring and segmentation then add their
+        columns to that frame in place. If `data` is already preprocessed
+        (it has a recency_days column), the analysis takes ownership of it
+        unless `copy` is set.
+        
         Parameters:
         -----------
         data : pandas.DataFrame
@@ -33,8 +148,14 @@ class RFMAnalysis:
             Column name for monetary value (total spent)
         segment_type : str
             Type of business segment (e.g., 'ecommerce', 'subscription')
+        n_tiles : int, optional
+            Number of score levels per metric (defaults to the configured value)
+        cut_points : list of float, optional
+            Custom quantile levels separating the score levels; override n_tiles
+        copy : bool, default False
+            Copy `data` first, leaving the caller's frame untouched
         """
-        self.data = data
+        self.data = data.copy() if copy else data
         self.user_id_col = user_id_col
         self.recency_col = recency_col
         self.frequency_col = frequency_col
@@ -42,57 +163,76 @@ class RFMAnalysis:
         self.segment_type = segment_type
         self.rfm_data = None
         self.rfm_segments = None
+        self.segment_summary = None
+        self.levels = quantile_levels(n_tiles, cut_points)
+        self.n_tiles = len(self.levels) + 1
+        self.breakpoints = None
         
     def preprocess_data(self):
         """
         Preprocess the data for RFM analysis
         """
-        # Create a copy of the data
-        df = self.data.copy()
+        # Work on the needed columns only; the input frame is never copied or modified
+        columns = {col: self.data[col] for col in (self.user_id_col, self.recency_col, self.frequency_col, self.monetary_col)}
         
-        # Convert recency column to datetime if it's not already
-        if df[self.recency_col].dtype != 'datetime64[ns]':
-            df[self.recency_col] = pd.to_datetime(df[self.recency_col])
+        # Convert recency column to datetime if it was not typed at read time
+        if not pd.api.types.is_datetime64_any_dtype(columns[self.recency_col]):
+            columns[self.recency_col] = parse_dates(columns[self.recency_col])
         
-        # Convert frequency and monetary columns to numeric
-        df[self.frequency_col] = pd.to_numeric(df[self.frequency_col], errors='coerce')
-        df[self.monetary_col] = pd.to_numeric(df[self.monetary_col], errors='coerce')
+        # Convert frequency and monetary columns to numeric if needed
+        for col in (self.frequency_col, self.monetary_col):
+            if not pd.api.types.is_numeric_dtype(columns[col]):
+                columns[col] = pd.to_numeric(columns[col], errors='coerce')
         
         # Drop rows with missing values
-        df = df.dropna(subset=[self.user_id_col, self.recency_col, self.frequency_col, self.monetary_col])
-        
-        # Calculate recency in days from today
-        today = datetime.datetime.now().date()
-        df['recency_days'] = (today - df[self.recency_col].dt.date).dt.days
-        
-        # Keep only necessary columns
-        self.data = df[[self.user_id_col, 'recency_days', self.frequency_col, self.monetary_col]]
+        valid = np.logical_and.reduce([values.notna().to_numpy() for values in columns.values()])
+        if not valid.all():
+            columns = {col: values[valid] for col, values in columns.items()}
+        
+        # Calculate recency in days from today, on calendar dates in the data's own time zone.
+        # Normalizing stays vectorized where .dt.date would build a Python object per row.
+        today = pd.Timestamp(datetime.datetime.now().date())
+        dates = columns[self.recency_col]
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        recency_days = (today - dates.dt.normalize()).dt.days
+        
+        # Build the frame the rest of the pipeline owns and adds columns to
+        self.data = pd.DataFrame({
+            self.user_id_col: columns[self.user_id_col],
+            'recency_days': recency_days,
+            self.frequency_col: columns[self.frequency_col],
+            self.monetary_col: columns[self.monetary_col]
+        })
         
         return self.data
     
     def calculate_rfm_scores(self):
         """
-        Calculate RFM scores using quartiles
+        Calculate RFM scores using N-tiles (quartiles by default)
         """
         # Preprocess data if not done already
         if 'recency_days' not in self.data.columns:
             self.preprocess_data()
         
-        # Create a copy of the data
-        rfm_data = self.data.copy()
+        # Score columns are added to the owned, preprocessed frame
+        rfm_data = self.data
         
-        # Calculate quartiles for recency, frequency, and monetary value
-        r_quartiles = pd.qcut(rfm_data['recency_days'], 4, labels=False, duplicates='drop')
-        f_quartiles = pd.qcut(rfm_data[self.frequency_col], 4, labels=False, duplicates='drop')
-        m_quartiles = pd.qcut(rfm_data[self.monetary_col], 4, labels=False, duplicates='drop')
+        # Calculate breakpoints for recency, frequency, and monetary value in one pass.
+        # They are kept so new customers can be scored against them later.
+        self.breakpoints = compute_breakpoints({
+            'recency': rfm_data['recency_days'],
+            'frequency': rfm_data[self.frequency_col],
+            'monetary': rfm_data[self.monetary_col]
+        }, self.levels)
         
-        # Assign scores (1 is best for recency, 4 is best for frequency and monetary)
-        rfm_data['r_score'] = 4 - r_quartiles  # Invert recency score (lower days = higher score)
-        rfm_data['f_score'] = f_quartiles + 1
-        rfm_data['m_score'] = m_quartiles + 1
+        # Assign scores (the highest score is best for every metric)
+        rfm_data['r_score'] = assign_scores(rfm_data['recency_days'], self.breakpoints['recency'], reverse=True)  # Lower days = higher score
+        rfm_data['f_score'] = assign_scores(rfm_data[self.frequency_col], self.breakpoints['frequency'])
+        rfm_data['m_score'] = assign_scores(rfm_data[self.monetary_col], self.breakpoints['monetary'])
         
         # Calculate RFM score
-        rfm_data['rfm_score'] = rfm_data['r_score'] * 100 + rfm_data['f_score'] * 10 + rfm_data['m_score']
+        rfm_data['rfm_score'] = rfm_group_code(rfm_data['r_score'], rfm_data['f_score'], rfm_data['m_score'], self.n_tiles)
         
         self.rfm_data = rfm_data
         return self.rfm_data
@@ -105,95 +245,68 @@ class RFMAnalysis:
         if self.rfm_data is None:
             self.calculate_rfm_scores()
         
-        # Create a copy of the RFM data
-        rfm_segments = self.rfm_data.copy()
-        
-        # Define segmentation rules
-        def segment_rule(row):
-            r, f, m = row['r_score'], row['f_score'], row['m_score']
-            
-            # Champions: high recency, frequency, and monetary value
-            if r >= 4 and f >= 4 and m >= 4:
-                return "Campeões"
-            
-            # Loyal Customers: high frequency and monetary value
-            elif (f >= 3 and m >= 3) and r >= 3:
-                return "Clientes Fiéis"
-            
-            # Potential Loyalists: recent customers with average frequency
-            elif r >= 4 and (f >= 2 and f < 4) and (m >= 2 and m < 4):
-                return "Fiéis em Potencial"
-            
-            # New Customers: recent customers with low frequency
-            elif r >= 4 and f <= 1:
-                return "Novos Clientes"
-            
-            # Promising: recent customers with low frequency but high monetary value
-            elif r >= 3 and f <= 2 and m >= 3:
-                return "Clientes Promissores"
-            
-            # Customers Needing Attention: average recency and frequency
-            elif (r >= 2 and r < 4) and (f >= 2 and f < 4) and (m >= 2 and m < 4):
-                return "Clientes que Precisam de Atenção"
-            
-            # About to Sleep: low recency, average frequency and monetary value
-            elif r <= 2 and (f >= 2 and f < 4) and (m >= 2 and m < 4):
-                return "Clientes Quase Dormentes"
-            
-            # Can't Lose Them: low recency but high frequency and monetary value
-            elif r <= 2 and f >= 3 and m >= 3:
-                return "Clientes que Não Posso Perder"
-            
-            # At Risk: low recency and average frequency
-            elif r <= 2 and (f >= 2 and f < 4):
-                return "Clientes em Risco"
-            
-            # Hibernating: low recency, frequency, and monetary value
-            elif r <= 1 and f <= 2 and m <= 2:
-                return "Clientes Hibernando"
-            
-            # Lost: lowest recency and frequency
-            elif r <= 1 and f <= 1:
-                return "Clientes Perdidos"
-            
-            # Default
-            else:
-                return "Outros"
-        
-        # Apply segmentation rule
-        rfm_segments['segment'] = rfm_segments.apply(segment_rule, axis=1)
+        # The segment column is added to the scored frame
+        rfm_segments = self.rfm_data
+        
+        # Apply segmentation rule once per score combination instead of building
+        # a Series per customer with a row-wise apply
+        rfm_segments['segment'] = rfm_segments['rfm_score'].map(segment_rule_lookup(self.n_tiles))
         
         self.rfm_segments = rfm_segments
+        self.segment_summary = None
         return self.rfm_segments
     
-    def get_segment_counts(self):
+    def get_segment_summary(self):
         """
-        Get counts of customers in each segment
+        Get per-segment aggregates in one groupby over the customers
+        
+        Segment counts, statistics and chart data are all derived from this
+        small frame, computed once per segmentation.
+        
+        Returns:
+        --------
+        pandas.DataFrame
+            One row per segment, in order of first appearance, with customer
+            counts, mean recency, frequency and monetary values and total
+            monetary value
         """
         if self.rfm_segments is None:
             self.segment_customers()
         
-        segment_counts = self.rfm_segments['segment'].value_counts().to_dict()
-        return segment_counts
+        if self.segment_summary is None:
+            self.segment_summary = self.rfm_segments.groupby('segment', sort=False).agg(
+                count=('recency_days', 'size'),
+                customer_count=(self.user_id_col, 'count'),
+                avg_recency=('recency_days', 'mean'),
+                avg_frequency=(self.frequency_col, 'mean'),
+                avg_monetary=(self.monetary_col, 'mean'),
+                total_monetary=(self.monetary_col, 'sum')
+            )
+        
+        return self.segment_summary
+    
+    def get_segment_counts(self):
+        """
+        Get counts of customers in each segment
+        """
+        counts = self.get_segment_summary()['count'].sort_values(ascending=False, kind='stable')
+        return {segment: int(count) for segment, count in counts.items()}
     
     def get_segment_stats(self):
         """
         Get statistics for each segment
         """
-        if self.rfm_segments is None:
-            self.segment_customers()
+        summary = self.get_segment_summary()
         
         segment_stats = {}
-        for segment in self.rfm_segments['segment'].unique():
-            segment_data = self.rfm_segments[self.rfm_segments['segment'] == segment]
-            stats = {
-                'count': len(segment_data),
-                'avg_recency': segment_data['recency_days'].mean(),
-                'avg_frequency': segment_data[self.frequency_col].mean(),
-                'avg_monetary': segment_data[self.monetary_col].mean(),
-                'total_monetary': segment_data[self.monetary_col].sum()
+        for segment, row in zip(summary.index, summary.itertuples(index=False)):
+            segment_stats[segment] = {
+                'count': int(row.count),
+                'avg_recency': row.avg_recency,
+                'avg_frequency': row.avg_frequency,
+                'avg_monetary': row.avg_monetary,
+                'total_monetary': row.total_monetary
             }
-            segment_stats[segment] = stats
         
         return segment_stats
     
@@ -201,17 +314,13 @@ class RFMAnalysis:
         """
         Get data for RFM treemap visualization
         """
-        if self.rfm_segments is None:
-            self.segment_customers()
-        
-        # Group by segment and calculate metrics
-        treemap_data = self.rfm_segments.groupby('segment').agg({
-            self.user_id_col: 'count',
-            self.monetary_col: 'sum'
-        }).reset_index()
+        summary = self.get_segment_summary().sort_index()
         
-        # Rename columns
-        treemap_data.columns = ['segment', 'customer_count', 'total_value']
+        treemap_data = pd.DataFrame({
+            'segment': summary.index,
+            'customer_count': summary['customer_count'].to_numpy(),
+            'total_value': summary['total_monetary'].to_numpy()
+        })
         
         # Calculate percentage of total
         total_customers = treemap_data['customer_count'].sum()
@@ -226,12 +335,9 @@ class RFMAnalysis:
         """
         Get data for polar area chart visualization
         """
-        if self.rfm_segments is None:
-            self.segment_customers()
+        counts = self.get_segment_summary()['count'].sort_values(ascending=False, kind='stable')
         
-        # Count customers in each segment
-        segment_counts = self.rfm_segments['segment'].value_counts().reset_index()
-        segment_counts.columns = ['segment', 'count']
+        segment_counts = pd.DataFrame({'segment': counts.index, 'count': counts.to_numpy()})
         
         # Calculate percentage
         total = segment_counts['count'].sum()
@@ -241,7 +347,7 @@ class RFMAnalysis:
 
 # Predictive Analytics Class
 class PredictiveAnalytics:
-    def __init__(self, rfm_data):
+    def __init__(self, rfm_data, monetary_col=None):
         """
         Initialize Predictive Analytics with RFM data
         
@@ -249,8 +355,12 @@ class PredictiveAnalytics:
         -----------
         rfm_data : pandas.DataFrame
             RFM data with customer segments
+        monetary_col : str, optional
+            Column name for monetary value, used as the LTV target.
+            If omitted, the first non-derived column is used.
         """
         self.rfm_data = rfm_data
+        self.monetary_col = monetary_col
         self.churn_model = None
         self.upsell_model = None
         self.ltv_model = None
@@ -260,8 +370,7 @@ class PredictiveAnalytics:
         """
         Prepare features for predictive models
         """
-        # Create a copy of the RFM data
-        df = self.rfm_data.copy()
+        df = self.rfm_data
         
         # Create features from RFM scores and other metrics
         features = df[['r_score', 'f_score', 'm_score', 'rfm_score', 'recency_days']]
@@ -277,6 +386,10 @@ class PredictiveAnalytics:
         """
         Predict customer churn using Random Forest
         """
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+        
         # Prepare features if not done already
         if self.features is None:
             self.prepare_features()
@@ -319,13 +432,17 @@ class PredictiveAnalytics:
         return {
             'metrics': metrics,
             'feature_importance': feature_importance,
-            'predictions': self.rfm_data[['churn_probability']].to_dict('records')
+            'distribution': summarize_distribution(self.rfm_data['churn_probability'], value_range=(0.0, 1.0))
         }
     
     def predict_upsell_crosssell(self):
         """
         Identify upsell/cross-sell opportunities using K-Means clustering
         """
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.cluster import KMeans
+        from sklearn.metrics import silhouette_score
+        
         # Prepare features if not done already
         if self.features is None:
             self.prepare_features()
@@ -389,6 +506,9 @@ class PredictiveAnalytics:
         """
         Predict customer lifetime value (LTV) using XGBoost
         """
+        import xgboost as xgb
+        from sklearn.model_selection import train_test_split
+        
         # Prepare features if not done already
         if self.features is None:
             self.prepare_features()
@@ -396,7 +516,9 @@ class PredictiveAnalytics:
         # Create target variable (LTV)
         # For simplicity, we'll use monetary value as a proxy for LTV
         # In a real-world scenario, you would use historical data to calculate actual LTV
-        monetary_col = [col for col in self.rfm_data.columns if col not in ['r_score', 'f_score', 'm_score', 'rfm_score', 'recency_days', 'segment', 'cluster', 'churn_probability', 'upsell_potential', 'crosssell_potential']][0]
+        monetary_col = self.monetary_col
+        if monetary_col is None:
+            monetary_col = [col for col in self.rfm_data.columns if col not in ['r_score', 'f_score', 'm_score', 'rfm_score', 'recency_days', 'segment', 'cluster', 'churn_probability', 'upsell_potential', 'crosssell_potential']][0]
         ltv = self.rfm_data[monetary_col]
         
         # Split data into training and testing sets
@@ -440,8 +562,43 @@ class PredictiveAnalytics:
         return {
             'metrics': metrics,
             'feature_importance': feature_importance,
-            'ltv_segments': self.rfm_data['ltv_segment'].value_counts().to_dict()
+            'ltv_segments': self.rfm_data['ltv_segment'].value_counts().to_dict(),
+            'distribution': summarize_distribution(self.rfm_data['predicted_ltv'])
+        }
+    
+    def save_models(self, path, rfm):
+        """
+        Save the trained churn and LTV models so new customers can be scored
+        without retraining
+        
+        Parameters:
+        -----------
+        path : str
+            Destination file for the model bundle
+        rfm : RFMAnalysis
+            Analysis the models were trained on (provides column mapping and score breakpoints)
+        """
+        if self.churn_model is None or self.ltv_model is None:
+            raise ValueError("Churn and LTV models must be trained before saving")
+        
+        bundle = {
+            'churn_model': self.churn_model,
+            'ltv_model': self.ltv_model,
+            'feature_columns': list(self.features.columns),
+            'n_tiles': rfm.n_tiles,
+            'breakpoints': rfm.breakpoints,
+            'column_mapping': {
+                'user_id': rfm.user_id_col,
+                'recency': rfm.recency_col,
+                'frequency': rfm.frequency_col,
+                'monetary': rfm.monetary_col
+            },
+            'segment_type': rfm.segment_type,
+            'created_at': datetime.datetime.now().isoformat()
         }
+        
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        joblib.dump(bundle, path)
     
     def get_predictive_insights(self):
         """
@@ -504,8 +661,50 @@ class PredictiveAnalytics:
         
         return insights
 
+def load_models(path):
+    """
+    Load a model bundle written by PredictiveAnalytics.save_models
+    
+    Parameters:
+    -----------
+    path : str
+        Path of the saved model bundle
+    
+    Returns:
+    --------
+    dict
+        Churn and LTV models plus the metadata needed to build features
+    """
+    return joblib.load(path)
+
+def build_chart_payloads(rfm, churn_results, ltv_results):
+    """
+    Build the chart-ready payloads of an analysis, to be stored with it
+    
+    Parameters:
+    -----------
+    rfm : RFMAnalysis
+        Segmented analysis
+    churn_results : dict
+        Output of PredictiveAnalytics.predict_churn
+    ltv_results : dict
+        Output of PredictiveAnalytics.predict_ltv
+    
+    Returns:
+    --------
+    dict
+        Payload of every chart in charts.CHART_NAMES, by name
+    """
+    return {
+        'treemap': rfm.get_treemap_data(),
+        'polar_area': rfm.get_polar_area_data(),
+        'segment_stats': rfm.get_segment_stats(),
+        'churn_histogram': churn_results['distribution'],
+        'ltv_histogram': ltv_results['distribution']
+    }
+
 # API Functions for Frontend Integration
-def analyze_rfm_data(data, user_id_col, recency_col, frequency_col, monetary_col, segment_type):
+def analyze_rfm_data(data, user_id_col, recency_col, frequency_col, monetary_col, segment_type, model_path=None, customers_path=None, n_tiles=None, charts_path=None):
     """
     Analyze RFM data and return results for frontend visualization
     
@@ -523,6 +722,15 @@ def analyze_rfm_data(data, user_id_col, recency_col, frequency_col, monetary_col
         Column name for monetary value (total spent)
     segment_type : str
         Type of business segment (e.g., 'ecommerce', 'subscription')
+    model_path : str, optional
+        If given, the trained churn and LTV models are saved here for batch scoring
+    customers_path : str, optional
+        If given, per-customer scores and predictions are saved here as Parquet
+        instead of being returned inline
+    n_tiles : int, optional
+        Number of score levels per metric (defaults to the configured value)
+    charts_path : str, optional
+        If given, the chart payloads are saved here, to be served by the charts endpoint
     
     Returns:
     --------
@@ -530,7 +738,7 @@ def analyze_rfm_data(data, user_id_col, recency_col, frequency_col, monetary_col
         Results of RFM analysis and predictive analytics
     """
     # Initialize RFM Analysis
-    rfm = RFMAnalysis(data, user_id_col, recency_col, frequency_col, monetary_col, segment_type)
+    rfm = RFMAnalysis(data, user_id_col, recency_col, frequency_col, monetary_col, segment_type, n_tiles=n_tiles)
     
     # Perform RFM Analysis
     rfm_segments = rfm.segment_customers()
@@ -540,7 +748,7 @@ def analyze_rfm_data(data, user_id_col, recency_col, frequency_col, monetary_col
     polar_area_data = rfm.get_polar_area_data()
     
     # Initialize Predictive Analytics
-    predictive = PredictiveAnalytics(rfm_segments)
+    predictive = PredictiveAnalytics(rfm_segments, monetary_col=monetary_col)
     
     # Perform Predictive Analytics
     churn_results = predictive.predict_churn()
@@ -548,13 +756,29 @@ def analyze_rfm_data(data, user_id_col, recency_col, frequency_col, monetary_col
     ltv_results = predictive.predict_ltv()
     insights = predictive.get_predictive_insights()
     
+    # Persist models for batch scoring of new customers
+    if model_path is not None:
+        predictive.save_models(model_path, rfm)
+    
+    # Persist per-customer predictions for paged download
+    if customers_path is not None:
+        write_customer_table(predictive.rfm_data, customers_path)
+    
+    # Persist chart payloads for later dashboard visits
+    if charts_path is not None:
+        write_chart_payloads(build_chart_payloads(rfm, churn_results, ltv_results), charts_path)
+    
     # Combine results
     results = {
         'rfm_analysis': {
             'segment_counts': segment_counts,
             'segment_stats': segment_stats,
             'treemap_data': treemap_data,
-            'polar_area_data': polar_area_data
+            'polar_area_data': polar_area_data,
+            'scoring': {
+                'n_tiles': rfm.n_tiles,
+                'breakpoints': rfm.breakpoints
+            }
         },
         'predictive_analytics': {
             'churn': churn_results,
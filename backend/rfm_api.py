@@ -1,24 +1,55 @@
 # RFM Matrix - API Module
 
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Request, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import pandas as pd
-import io
-import json
 import datetime
 import os
+import sys
+import tempfile
+import uuid
 from typing import Optional, List, Dict, Any
+from sqlalchemy.orm import Session
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import HISTORY_CONFIG
 
 # Import RFM Analysis module
 from rfm_analysis import analyze_rfm_data
+from batch_scoring import BatchScorer
+from customer_store import read_customer_page, export_customer_table, prediction_filter, EXPORT_FORMATS
+from charts import CHART_NAMES, load_chart_payload
+from ingestion import is_supported, spool_upload, read_files, customer_schema, MissingColumnsError
+from serialization import FastJSONResponse
+from database import get_db
+from history import record_analysis, list_analyses, get_analysis
+from http_cache import file_response, static_cache_control
+import serialization
 
 # Create router
-router = APIRouter()
+router = APIRouter(default_response_class=FastJSONResponse)
 
 # Directory to store analysis history
 HISTORY_DIR = "analysis_history"
 os.makedirs(HISTORY_DIR, exist_ok=True)
 
+# Directories to store trained models and batch scoring output
+MODELS_DIR = "models"
+SCORES_DIR = "scores"
+os.makedirs(MODELS_DIR, exist_ok=True)
+os.makedirs(SCORES_DIR, exist_ok=True)
+
+def new_analysis_key() -> str:
+    """
+    Unique key of a new analysis, naming its model, customer and chart files.
+    
+    Keys start with the creation time, so they sort by date; the random
+    suffix keeps analyses started at the same moment apart.
+    """
+    return f"{datetime.datetime.now():%Y%m%d_%H%M%S_%f}_{uuid.uuid4().hex[:8]}"
+
 @router.post("/analyze-rfm")
 async def analyze_rfm(
     file: UploadFile = File(...),
@@ -26,45 +57,60 @@ async def analyze_rfm(
     user_id_col: str = Form(...),
     recency_col: str = Form(...),
     frequency_col: str = Form(...),
-    monetary_col: str = Form(...)
+    monetary_col: str = Form(...),
+    additional_files: List[UploadFile] = File(default=[]),
+    n_tiles: Optional[int] = Form(None),
+    db: Session = Depends(get_db)
 ):
     """
-    Analyze RFM data from uploaded CSV file
+    Analyze RFM data from uploaded CSV, Excel, gzip or zip files.
+    n_tiles sets the number of score levels per metric (quartiles by default).
     """
+    uploads = [file] + list(additional_files or [])
+    unsupported = [upload.filename for upload in uploads if not is_supported(upload.filename)]
+    if unsupported:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"Unsupported file format: {', '.join(unsupported)}"}
+        )
+    if n_tiles is not None and not 2 <= n_tiles <= 99:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "n_tiles must be between 2 and 99"}
+        )
+    
     try:
-        # Read CSV file
-        contents = await file.read()
-        data = pd.read_csv(io.StringIO(contents.decode('utf-8')))
+        # Spool uploads to disk and parse them in parallel
+        with tempfile.TemporaryDirectory() as temp_dir:
+            files = [(await run_in_threadpool(spool_upload, upload.file, temp_dir), upload.filename) for upload in uploads]
+            # Only the mapped columns are loaded, already typed
+            schema = customer_schema(user_id_col, recency_col, frequency_col, monetary_col)
+            data, ingestion_report = await run_in_threadpool(read_files, files, None, schema)
         
-        # Validate required columns
-        required_cols = [user_id_col, recency_col, frequency_col, monetary_col]
-        missing_cols = [col for col in required_cols if col not in data.columns]
-        
-        if missing_cols:
-            return JSONResponse(
-                status_code=400,
-                content={"error": f"Missing required columns: {', '.join(missing_cols)}"}
-            )
-        
-        # Perform RFM analysis
+        # Perform RFM analysis and keep the trained models for batch scoring
+        analysis_key = new_analysis_key()
         results = analyze_rfm_data(
             data=data,
             user_id_col=user_id_col,
             recency_col=recency_col,
             frequency_col=frequency_col,
             monetary_col=monetary_col,
-            segment_type=segment_type
+            segment_type=segment_type,
+            n_tiles=n_tiles,
+            model_path=os.path.join(MODELS_DIR, f"{analysis_key}.joblib"),
+            customers_path=os.path.join(HISTORY_DIR, f"{analysis_key}_customers.parquet"),
+            charts_path=os.path.join(HISTORY_DIR, f"{analysis_key}_charts.json")
         )
         
         # Save analysis to history
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{file.filename}"
-        
         history_entry = {
             "filename": file.filename,
+            "analysis_key": analysis_key,
+            "model_id": analysis_key,
             "timestamp": datetime.datetime.now().isoformat(),
             "segment_type": segment_type,
             "record_count": len(data),
+            "scoring": results["rfm_analysis"]["scoring"],
             "column_mapping": {
                 "user_id": user_id_col,
                 "recency": recency_col,
@@ -77,47 +123,243 @@ async def analyze_rfm(
             }
         }
         
-        # Save history entry
-        with open(os.path.join(HISTORY_DIR, f"{timestamp}_meta.json"), "w") as f:
-            json.dump(history_entry, f)
+        # Save history entry in the metadata table
+        record_analysis(db, history_entry)
         
-        # Add history entry to results
+        # Add history entry and parse throughput to results
         results["history_entry"] = history_entry
+        results["ingestion"] = ingestion_report
         
-        return results
+        return FastJSONResponse(results)
     
+    except MissingColumnsError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"Missing required columns: {', '.join(e.missing)}"}
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500,
             content={"error": f"Error processing file: {str(e)}"}
         )
 
-@router.get("/analysis-history")
-async def get_analysis_history(limit: int = 5):
+@router.post("/score-customers")
+async def score_customers(
+    file: UploadFile = File(...),
+    model_id: str = Form(...),
+    chunk_size: Optional[int] = Form(None)
+):
     """
-    Get analysis history (limited to the most recent entries)
+    Score a new customer file with the churn and LTV models saved by a previous analysis
     """
+    model_path = os.path.join(MODELS_DIR, f"{os.path.basename(model_id)}.joblib")
+    if not os.path.exists(model_path):
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"Model not found: {model_id}"}
+        )
+    
+    temp_path = None
     try:
-        history_files = [f for f in os.listdir(HISTORY_DIR) if f.endswith("_meta.json")]
-        history_files.sort(reverse=True)  # Sort by timestamp (newest first)
+        # Spool the upload to disk so it can be read back in chunks
+        temp_path = await run_in_threadpool(spool_upload, file.file, tempfile.gettempdir())
         
-        history = []
-        for i, file in enumerate(history_files):
-            if i >= limit:
-                break
-                
-            with open(os.path.join(HISTORY_DIR, file), "r") as f:
-                history_entry = json.load(f)
-                history.append(history_entry)
+        scorer = BatchScorer.from_path(model_path, chunk_size)
         
-        return {"history": history}
+        # Validate required columns against the file header
+        header = pd.read_csv(temp_path, nrows=0).columns
+        missing_cols = [col for col in scorer.mapping.values() if col not in header]
+        if missing_cols:
+            return JSONResponse(
+                status_code=400,
+                content={"error": f"Missing required columns: {', '.join(missing_cols)}"}
+            )
+        
+        output_name = f"{os.path.basename(model_id)}_{new_analysis_key()}.parquet"
+        stats = await run_in_threadpool(scorer.score_file, temp_path, os.path.join(SCORES_DIR, output_name))
+        stats["output_file"] = output_name
+        
+        return stats
+    
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Error scoring file: {str(e)}"}
+        )
+    finally:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+@router.get("/scores/{output_file}")
+async def download_scores(output_file: str, request: Request):
+    """
+    Download a Parquet file produced by /score-customers
     
+    Score files are never rewritten, so clients may cache them indefinitely;
+    Range requests resume or split large downloads.
+    """
+    path = os.path.join(SCORES_DIR, os.path.basename(output_file))
+    if not os.path.exists(path):
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"Scores not found: {output_file}"}
+        )
+    
+    return file_response(request, path, "application/vnd.apache.parquet", static_cache_control(path),
+                         filename=os.path.basename(path))
+
+@router.get("/analysis-history")
+async def get_analysis_history(
+    limit: int = Query(5, ge=1, le=HISTORY_CONFIG['max_page_size']),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get one page of the analysis history, newest first.
+    
+    Pass the next_cursor of a page as cursor to get the following one.
+    """
+    try:
+        return list_analyses(db, cursor=cursor, limit=limit)
+    
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": str(e)}
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500,
             content={"error": f"Error retrieving analysis history: {str(e)}"}
         )
 
+@router.get("/analysis-history/{analysis_key}")
+async def get_analysis_history_entry(analysis_key: str, db: Session = Depends(get_db)):
+    """
+    Get the full history entry of a stored analysis
+    """
+    history_entry = get_analysis(db, analysis_key)
+    
+    if history_entry is None:
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"Analysis not found: {analysis_key}"}
+        )
+    
+    return history_entry
+
+@router.get("/analysis-history/{analysis_key}/customers")
+async def get_analysis_customers(analysis_key: str, offset: int = 0, limit: int = 1000):
+    """
+    Get one page of per-customer scores and predictions for a stored analysis
+    """
+    path = os.path.join(HISTORY_DIR, f"{os.path.basename(analysis_key)}_customers.parquet")
+    
+    try:
+        return FastJSONResponse(read_customer_page(path, offset=offset, limit=limit))
+    
+    except FileNotFoundError:
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"Analysis not found: {analysis_key}"}
+        )
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Error retrieving customers: {str(e)}"}
+        )
+
+@router.get("/analysis-history/{analysis_key}/export")
+async def export_analysis_customers(
+    analysis_key: str,
+    format: str = "csv",
+    columns: Optional[str] = None,
+    segment: Optional[List[str]] = Query(None),
+    churn_above: Optional[float] = None,
+    churn_below: Optional[float] = None,
+    ltv_segment: Optional[List[str]] = Query(None),
+    upsell: Optional[bool] = None,
+    crosssell: Optional[bool] = None
+):
+    """
+    Export the customers of a stored analysis matching segment and prediction filters
+    
+    E.g. segment=Clientes em Risco&churn_above=0.5 lists the customers at risk
+    of churning for a campaign. Repeated segment and ltv_segment parameters
+    accept any of the values; churn bounds are strict; upsell and crosssell
+    keep customers with (true) or without (false) that potential. format is
+    'csv', 'parquet' or 'arrow'; columns is a comma-separated list of
+    columns (all by default).
+    
+    Filters are evaluated in the Parquet scan of the stored customer table
+    and the file is written to the response batch by batch, so memory use
+    does not depend on the number of customers exported.
+    """
+    path = os.path.join(HISTORY_DIR, f"{os.path.basename(analysis_key)}_customers.parquet")
+    selected = [column.strip() for column in columns.split(",") if column.strip()] if columns else None
+    
+    try:
+        chunks = export_customer_table(path, format, selected, prediction_filter(
+            segments=segment,
+            churn_above=churn_above,
+            churn_below=churn_below,
+            ltv_segments=ltv_segment,
+            upsell=upsell,
+            crosssell=crosssell
+        ))
+    
+    except FileNotFoundError:
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"Analysis not found: {analysis_key}"}
+        )
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": str(e)}
+        )
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Error exporting customers: {str(e)}"}
+        )
+    
+    return StreamingResponse(chunks, media_type=EXPORT_FORMATS[format], headers={
+        "Content-Disposition": f'attachment; filename="{os.path.basename(analysis_key)}_customers.{format}"'
+    })
+
+@router.get("/analysis-history/{analysis_key}/charts")
+async def get_analysis_charts(analysis_key: str, chart: Optional[str] = None):
+    """
+    Get the chart payloads stored for an analysis
+    
+    chart selects one of treemap, polar_area, segment_stats, churn_histogram
+    or ltv_histogram; all of them are returned by default. Payloads are
+    computed once when the analysis completes and served from an in-process
+    cache.
+    """
+    if chart is not None and chart not in CHART_NAMES:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"chart must be one of: {', '.join(CHART_NAMES)}"}
+        )
+    
+    path = os.path.join(HISTORY_DIR, f"{os.path.basename(analysis_key)}_charts.json")
+    
+    try:
+        return Response(load_chart_payload(path, chart), media_type="application/json")
+    
+    except (FileNotFoundError, KeyError):
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"Charts not found: {analysis_key}"}
+        )
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Error retrieving charts: {str(e)}"}
+        )
+
 @router.get("/segment-descriptions")
 async def get_segment_descriptions():
     """
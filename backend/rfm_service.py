@@ -1,6 +1,5 @@
 import pandas as pd
 import numpy as np
-import json
 import os
 import sys
 from datetime import datetime
@@ -8,22 +7,266 @@ from typing import Dict, Any, List, Tuple
 
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.config import RFM_SEGMENTS, RFM_SCORING
+from config.config import RFM_SEGMENTS, RFM_SCORING, RFM_SCORING_ENGINE, BATCH_SCORING_CONFIG, AGGREGATION_CONFIG
+
+import serialization
+from ingestion import parse_dates
+from scoring import (
+    SCORE_LEVELS, quantile_levels, compute_breakpoints, assign_scores, rescale_scores, decay_weights, rfm_group_code
+)
+from quantile_sketch import RFMSketch
+from parallel_aggregation import parallel_calculate_rfm
+from engines import get_engine
+
+# Segment assigned to customers that match no rule
+UNKNOWN_SEGMENT = 'Unknown'
+
+def format_rfm_group(code: int, levels: int = SCORE_LEVELS) -> str:
+    """
+    Render an integer RFM group code as the string shown to users (e.g. 434 -> "434", or "10-3-7" for deciles).
+    """
+    code = int(code)
+    if levels < 10:
+        return str(code)
+    return f"{code // 10000}-{code // 100 % 100}-{code % 100}"
+
+def _matches_rule(cells: pd.DataFrame, rule: Dict[str, Any]) -> pd.Series:
+    """
+    Evaluate one segment rule against a frame of score cells.
+    """
+    condition = pd.Series(True, index=cells.index)
+    
+    # Apply each condition in the rule
+    for metric, values in rule.items():
+        if metric in ('rfm_score', 'rfm_group'):
+            # Groups may be written as strings ("434"); match them on the integer code
+            codes = [int(v) for v in values] if isinstance(values, list) else [int(values)]
+            condition &= cells['rfm_group'].isin(codes)
+        elif isinstance(values, dict):
+            # For r_quartile, f_quartile, m_quartile
+            if 'min' in values:
+                condition &= (cells[metric] >= values['min'])
+            if 'max' in values:
+                condition &= (cells[metric] <= values['max'])
+        else:
+            condition &= (cells[metric] == values)
+    
+    return condition
+
+def build_segment_lookup(rules: Dict[str, List[Dict[str, Any]]], levels: int = SCORE_LEVELS) -> Tuple[np.ndarray, List[str]]:
+    """
+    Resolve segment rules once for every possible combination of scores.
+    
+    Segments only depend on the (r, f, m) scores, so rules are evaluated on the
+    levels^3 score cells instead of on every customer. Rules are written for
+    SCORE_LEVELS levels; cells of other scales are rescaled before matching.
+    
+    Args:
+        rules: Segment rules in the RFM_SEGMENTS format
+        levels: Number of score levels per metric
+        
+    Returns:
+        Tuple of a lookup array mapping RFM group codes to segment indexes,
+        and the list of segment names
+    """
+    scores = np.arange(1, levels + 1)
+    r, f, m = [axis.ravel() for axis in np.meshgrid(scores, scores, scores, indexing='ij')]
+    codes = rfm_group_code(r, f, m, levels)
+    
+    # Express the cells on the scale the rules are written for
+    r, f, m = [rescale_scores(axis, levels, SCORE_LEVELS) for axis in (r, f, m)]
+    cells = pd.DataFrame({'r_quartile': r, 'f_quartile': f, 'm_quartile': m})
+    cells['rfm_group'] = rfm_group_code(r, f, m)
+    cells['rfm_score'] = cells['rfm_group']
+    
+    segment_names = [UNKNOWN_SEGMENT] + [name for name in rules if name != UNKNOWN_SEGMENT]
+    cell_segments = np.zeros(len(cells), dtype=np.int8)
+    
+    # Later segments override earlier ones, as rules are applied in order
+    for segment_name, segment_rules in rules.items():
+        segment_mask = pd.Series(False, index=cells.index)
+        for rule in segment_rules:
+            # Combined conditions with OR between rules
+            segment_mask |= _matches_rule(cells, rule)
+        cell_segments[segment_mask.to_numpy()] = segment_names.index(segment_name)
+    
+    lookup = np.zeros(int(codes.max()) + 1, dtype=np.int8)
+    lookup[codes] = cell_segments
+    
+    return lookup, segment_names
+
+# Metrics segment rules can be written on
+RULE_METRICS = ('r_quartile', 'f_quartile', 'm_quartile', 'rfm_score', 'rfm_group')
+
+def validate_segment_rules(rules: Any) -> None:
+    """
+    Check that segment rules submitted by a user are in the RFM_SEGMENTS format.
+    
+    Raises:
+        ValueError: If the rules are malformed
+    """
+    if not isinstance(rules, dict) or not rules:
+        raise ValueError("Segment rules must map segment names to lists of rules")
+    
+    for segment_name, segment_rules in rules.items():
+        if not isinstance(segment_rules, list):
+            raise ValueError(f"Rules of segment '{segment_name}' must be a list")
+        for rule in segment_rules:
+            if not isinstance(rule, dict):
+                raise ValueError(f"Rules of segment '{segment_name}' must be objects")
+            for metric, values in rule.items():
+                if metric not in RULE_METRICS:
+                    raise ValueError(f"Unknown metric '{metric}' in segment '{segment_name}'. Allowed: {', '.join(RULE_METRICS)}")
+                if isinstance(values, dict):
+                    if set(values) - {'min', 'max'}:
+                        raise ValueError(f"Invalid condition on '{metric}' in segment '{segment_name}'")
+                    values = list(values.values())
+                elif not (metric in ('rfm_score', 'rfm_group') and isinstance(values, list)):
+                    values = [values]
+                if not values:
+                    raise ValueError(f"Invalid condition on '{metric}' in segment '{segment_name}'")
+                for value in values:
+                    try:
+                        int(value)
+                    except (TypeError, ValueError):
+                        raise ValueError(f"Invalid value {value!r} for '{metric}' in segment '{segment_name}'")
+
+def score_cell_histogram(codes: Any, recency: Any, frequency: Any, monetary: Any) -> Dict[str, List]:
+    """
+    Count customers and sum their metrics per score cell (RFM group code).
+    
+    Segments only depend on the score cell, so this histogram is enough to
+    summarize any segmentation of the customers without revisiting them.
+    Only cells with customers are listed.
+    
+    Args:
+        codes: RFM group code of every customer
+        recency: Recency of every customer
+        frequency: Frequency of every customer
+        monetary: Monetary value of every customer
+        
+    Returns:
+        Dictionary of parallel lists: codes, count and the recency, frequency
+        and monetary sums of every cell
+    """
+    cell_codes, cells = np.unique(np.asarray(codes), return_inverse=True)
+    
+    return {
+        'codes': cell_codes.tolist(),
+        'count': np.bincount(cells).tolist(),
+        'recency': np.bincount(cells, weights=np.asarray(recency, dtype=np.float64)).tolist(),
+        'frequency': np.bincount(cells, weights=np.asarray(frequency, dtype=np.float64)).tolist(),
+        'monetary': np.bincount(cells, weights=np.asarray(monetary, dtype=np.float64)).tolist()
+    }
+
+def summarize_cells(cells: Dict[str, List], lookup: np.ndarray, segment_names: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Build the segment distribution of a score cell histogram.
+    
+    The cost depends on the number of cells, not on the number of customers.
+    
+    Args:
+        cells: Histogram from score_cell_histogram
+        lookup: Lookup array from build_segment_lookup
+        segment_names: Segment names from build_segment_lookup
+        
+    Returns:
+        Segment name -> count, percentage, averages and revenue, ordered by
+        decreasing count, as in the segment_distribution of a summary
+    """
+    segments = lookup[np.asarray(cells['codes'], dtype=np.int64)]
+    n_segments = len(segment_names)
+    count = np.bincount(segments, weights=cells['count'], minlength=n_segments)
+    sums = {
+        metric: np.bincount(segments, weights=cells[metric], minlength=n_segments)
+        for metric in ('recency', 'frequency', 'monetary')
+    }
+    total_customers = count.sum()
+    total_revenue = sums['monetary'].sum()
+    
+    distribution = {}
+    for segment in np.argsort(-count, kind='stable'):
+        if count[segment] == 0:
+            break
+        distribution[segment_names[segment]] = {
+            'count': int(count[segment]),
+            'percentage': float(count[segment] / total_customers * 100),
+            'avg_recency': float(sums['recency'][segment] / count[segment]),
+            'avg_frequency': float(sums['frequency'][segment] / count[segment]),
+            'avg_monetary': float(sums['monetary'][segment] / count[segment]),
+            'total_revenue': float(sums['monetary'][segment]),
+            'revenue_percentage': float(sums['monetary'][segment] / total_revenue * 100)
+        }
+    
+    return distribution
+
+def cohort_counts(cohorts: Any) -> Dict[str, int]:
+    """
+    Count customers per first-purchase cohort.
+    
+    Args:
+        cohorts: First-purchase month of every customer (datetime64 array-like)
+        
+    Returns:
+        Cohort month ("2024-01") -> number of customers, oldest first
+    """
+    months, counts = np.unique(np.asarray(cohorts, dtype='datetime64[M]'), return_counts=True)
+    
+    return dict(zip(np.datetime_as_string(months, unit='M').tolist(), counts.tolist()))
 
 class RFMAnalysisService:
     """Service for performing RFM (Recency, Frequency, Monetary) analysis on customer data."""
     
-    def __init__(self, data: pd.DataFrame):
+    def __init__(self, data: pd.DataFrame, n_tiles: int = None, cut_points: List[float] = None,
+                 breakpoints: Dict[str, List[float]] = None, sketch_epsilon: float = None,
+                 n_workers: int = None, engine: str = None, copy: bool = False,
+                 decay_half_life: float = None):
         """
         Initialize the RFM analysis service with customer transaction data.
         
+        The service takes ownership of data: preprocessing converts columns in
+        place and every later stage adds its columns to the frame it owns
+        instead of copying it.
+        
         Args:
             data: DataFrame containing customer transaction data
+            n_tiles: Number of score levels per metric. Defaults to the configured value.
+            cut_points: Custom quantile levels separating the score levels; override n_tiles
+            breakpoints: Breakpoints stored by a previous analysis. When given, customers
+                are scored against them instead of computing new ones.
+            sketch_epsilon: When given, breakpoints are estimated with mergeable
+                quantile sketches (built chunk by chunk) within this rank error
+                instead of exact quantiles.
+            n_workers: Number of worker processes aggregating transactions per
+                customer. Defaults to the configured value; 1 aggregates in-process.
+            engine: Engine running perform_full_analysis ('pandas' or 'polars').
+                Defaults to the configured engine.
+            copy: Copy data first, leaving the caller's frame untouched
+            decay_half_life: Half-life in days of time-decayed scoring. When positive,
+                customers are scored on decayed_frequency and decayed_monetary and
+                assigned a first-purchase cohort; 0 scores plain counts and sums.
+                Defaults to the configured value.
         """
-        self.data = data
+        self.data = data.copy() if copy else data
         self.rfm_df = None
         self.segmented_df = None
         self.summary = {}
+        
+        if breakpoints is not None:
+            self.levels = None
+            self.n_tiles = len(breakpoints['recency']) + 1
+        else:
+            self.levels = quantile_levels(n_tiles, cut_points)
+            self.n_tiles = len(self.levels) + 1
+        self.breakpoints = breakpoints
+        self.sketch_epsilon = sketch_epsilon
+        self.n_workers = n_workers or AGGREGATION_CONFIG['n_workers']
+        self.engine = engine or AGGREGATION_CONFIG['engine']
+        if decay_half_life is None:
+            decay_half_life = RFM_SCORING_ENGINE['decay_half_life_days']
+        if decay_half_life < 0:
+            raise ValueError("decay_half_life must not be negative")
+        self.decay_half_life = decay_half_life or None
     
     def preprocess_data(self) -> None:
         """
@@ -31,28 +274,34 @@ class RFMAnalysisService:
         
         This method ensures data is in the correct format and handles missing values.
         """
-        # Convert date columns to datetime if not already
-        for col in self.data.columns:
-            if 'date' in col.lower() or 'time' in col.lower():
-                try:
-                    self.data[col] = pd.to_datetime(self.data[col])
-                except:
-                    # If conversion fails, leave as is
-                    pass
-        
-        # Handle missing values
-        self.data = self.data.dropna(subset=['customer_id', 'transaction_date', 'transaction_amount'])
+        # Convert the transaction date to datetime if it was not typed at read time
+        if not pd.api.types.is_datetime64_any_dtype(self.data['transaction_date']):
+            self.data['transaction_date'] = parse_dates(self.data['transaction_date'])
         
         # Ensure numeric types for amount
-        self.data['transaction_amount'] = pd.to_numeric(self.data['transaction_amount'], errors='coerce')
-        
-        # Drop rows with zero or negative amounts
-        self.data = self.data[self.data['transaction_amount'] > 0]
+        if not pd.api.types.is_numeric_dtype(self.data['transaction_amount']):
+            self.data['transaction_amount'] = pd.to_numeric(self.data['transaction_amount'], errors='coerce')
+        
+        # Drop rows with missing values or zero/negative amounts in a single filter,
+        # keeping the frame as is when every row is valid
+        valid = (
+            self.data['customer_id'].notna()
+            & self.data['transaction_date'].notna()
+            & (self.data['transaction_amount'] > 0)
+        )
+        if not valid.all():
+            self.data = self.data[valid]
     
     def calculate_rfm(self, analysis_date: datetime = None) -> pd.DataFrame:
         """
         Calculate RFM metrics for each customer.
         
+        With time-decayed scoring, every transaction is weighted by its age
+        (see scoring.decay_weights); the weights and weighted amounts are summed
+        per customer (decayed_frequency, decayed_monetary) on the group numbers
+        of the same groupby, which also finds each customer's first purchase,
+        whose month is its cohort. Decayed metrics are always aggregated in-process.
+        
         Args:
             analysis_date: Reference date for recency calculation. If None, uses current date.
             
@@ -63,15 +312,44 @@ class RFMAnalysisService:
         if analysis_date is None:
             analysis_date = datetime.now()
         
-        # Group by customer and calculate RFM metrics
-        rfm = self.data.groupby('customer_id').agg({
-            'transaction_date': lambda x: (analysis_date - x.max()).days,  # Recency
-            'transaction_id': 'count',  # Frequency
-            'transaction_amount': 'sum'  # Monetary
-        })
+        if self.n_workers > 1 and not self.decay_half_life:
+            # Hash-partitioned aggregation across worker processes
+            self.rfm_df = parallel_calculate_rfm(self.data, analysis_date, self.n_workers)
+            return self.rfm_df
         
-        # Rename columns
-        rfm.columns = ['recency', 'frequency', 'monetary']
+        data = self.data
+        aggregations = {
+            'recency': ('transaction_date', 'max'),
+            'frequency': ('transaction_id', 'count'),
+            'monetary': ('transaction_amount', 'sum')
+        }
+        if self.decay_half_life:
+            aggregations['cohort'] = ('transaction_date', 'min')
+        
+        # Group by customer and calculate RFM metrics with built-in aggregations
+        grouped = data.groupby('customer_id', observed=True)
+        rfm = grouped.agg(**aggregations)
+        
+        # Recency in whole days, computed for all customers at once
+        rfm['recency'] = (analysis_date - rfm['recency']).dt.days
+        
+        if self.decay_half_life:
+            # Decayed sums are weighted bincounts over the group numbers of the same
+            # groupby, much cheaper than more float sum aggregations
+            groups = grouped.ngroup().to_numpy()
+            weights = decay_weights(data['transaction_date'], analysis_date, self.decay_half_life)
+            # Transactions without an ID are not counted, as in frequency; the ID
+            # column is only scanned again when some customer has such transactions
+            frequency_weights = weights
+            if (rfm['frequency'].to_numpy() != np.bincount(groups, minlength=len(rfm))).any():
+                frequency_weights = weights * data['transaction_id'].notna().to_numpy()
+            rfm['decayed_frequency'] = np.bincount(groups, weights=frequency_weights, minlength=len(rfm))
+            del frequency_weights
+            # Weighted amounts overwrite the weights, which are no longer needed
+            np.multiply(weights, data['transaction_amount'].to_numpy(), out=weights)
+            rfm['decayed_monetary'] = np.bincount(groups, weights=weights, minlength=len(rfm))
+            # Cohort of the first purchase month
+            rfm['cohort'] = rfm['cohort'].to_numpy().astype('datetime64[M]').astype('datetime64[ns]')
         
         # Store RFM DataFrame
         self.rfm_df = rfm
@@ -80,7 +358,13 @@ class RFMAnalysisService:
     
     def assign_rfm_scores(self) -> pd.DataFrame:
         """
-        Assign RFM scores based on quartiles for each metric.
+        Assign RFM scores based on N-tiles (quartiles by default) for each metric.
+        
+        Breakpoints of the three metrics are computed in a single pass, unless
+        stored breakpoints were given, and kept in self.breakpoints.
+        
+        Score columns are added to rfm_df in place, so rfm_df and segmented_df
+        are the same frame.
         
         Returns:
             DataFrame with RFM scores for each customer
@@ -88,110 +372,130 @@ class RFMAnalysisService:
         if self.rfm_df is None:
             raise ValueError("Must calculate RFM metrics first using calculate_rfm()")
         
-        # Create a copy of RFM DataFrame
-        rfm_scores = self.rfm_df.copy()
+        rfm_scores = self.rfm_df
+        
+        frequency, monetary = self.scored_metrics()
+        for column, values in self.score_metrics(rfm_scores['recency'], rfm_scores[frequency], rfm_scores[monetary]).items():
+            rfm_scores[column] = values
+        
+        # RFM groups are kept as the same compact integer code and only
+        # rendered as strings at the API boundary (see format_rfm_group)
+        rfm_scores['rfm_group'] = rfm_scores['rfm_score']
+        
+        # Store segmented DataFrame
+        self.segmented_df = rfm_scores
+        
+        return rfm_scores
+    
+    def scored_metrics(self) -> Tuple[str, str]:
+        """
+        Get the names of the frequency and monetary columns customers are scored on.
+        
+        Returns:
+            ('decayed_frequency', 'decayed_monetary') with time-decayed scoring,
+            ('frequency', 'monetary') otherwise
+        """
+        if self.decay_half_life:
+            return 'decayed_frequency', 'decayed_monetary'
+        return 'frequency', 'monetary'
+    
+    def score_metrics(self, recency: Any, frequency: Any, monetary: Any) -> Dict[str, np.ndarray]:
+        """
+        Score recency, frequency and monetary values.
         
+        Breakpoints of the three metrics are computed at once (exactly, or with
+        quantile sketches when sketch_epsilon is set) unless already known.
+        Shared by every analysis engine so all of them score identically.
+        
+        Args:
+            recency: Recency values (array-like)
+            frequency: Frequency values (array-like)
+            monetary: Monetary values (array-like)
+            
+        Returns:
+            Dictionary with the r_quartile, f_quartile and m_quartile int8 scores
+            and the rfm_score integer code
+        """
         # Get scoring configuration
         recency_config = RFM_SCORING['recency']
         frequency_config = RFM_SCORING['frequency']
         monetary_config = RFM_SCORING['monetary']
         
-        # Calculate quartiles for each metric
-        r_quartiles = pd.qcut(
-            rfm_scores['recency'], 
-            q=4, 
-            labels=[4, 3, 2, 1] if recency_config['invert'] else [1, 2, 3, 4]
-        )
+        # Compute the breakpoints of all three metrics at once
+        if self.breakpoints is None and self.sketch_epsilon is not None:
+            self.breakpoints = self._sketch_breakpoints(recency, frequency, monetary)
+        elif self.breakpoints is None:
+            self.breakpoints = compute_breakpoints({
+                'recency': recency,
+                'frequency': frequency,
+                'monetary': monetary
+            }, self.levels)
+        
+        # Score each metric as int8 (the columns keep their historical quartile names)
+        scores = {
+            'r_quartile': assign_scores(recency, self.breakpoints['recency'], reverse=recency_config['invert']),
+            'f_quartile': assign_scores(frequency, self.breakpoints['frequency'], reverse=not frequency_config['invert']),
+            'm_quartile': assign_scores(monetary, self.breakpoints['monetary'], reverse=not monetary_config['invert'])
+        }
         
-        f_quartiles = pd.qcut(
-            rfm_scores['frequency'],
-            q=4,
-            labels=[1, 2, 3, 4] if frequency_config['invert'] else [4, 3, 2, 1]
-        )
+        # Calculate RFM score - first digit is R, second is F, third is M
+        scores['rfm_score'] = rfm_group_code(scores['r_quartile'], scores['f_quartile'], scores['m_quartile'], self.n_tiles)
         
-        m_quartiles = pd.qcut(
-            rfm_scores['monetary'],
-            q=4,
-            labels=[1, 2, 3, 4] if monetary_config['invert'] else [4, 3, 2, 1]
-        )
-        
-        # Add quartile values to dataframe
-        rfm_scores['r_quartile'] = r_quartiles
-        rfm_scores['f_quartile'] = f_quartiles
-        rfm_scores['m_quartile'] = m_quartiles
+        return scores
+    
+    def _sketch_breakpoints(self, recency: Any, frequency: Any, monetary: Any) -> Dict[str, List[float]]:
+        """
+        Estimate breakpoints from per-chunk quantile sketches merged together.
         
-        # Calculate RFM score
-        rfm_scores['rfm_score'] = (
-            rfm_scores['r_quartile'].astype(int) * 100 + 
-            rfm_scores['f_quartile'].astype(int) * 10 + 
-            rfm_scores['m_quartile'].astype(int)
-        )
+        Args:
+            recency: Recency values (array-like)
+            frequency: Frequency values (array-like)
+            monetary: Monetary values (array-like)
+            
+        Returns:
+            Metric name -> list of breakpoints
+        """
+        recency, frequency, monetary = [np.asarray(values) for values in (recency, frequency, monetary)]
+        sketch = RFMSketch(self.sketch_epsilon, seed=0)
+        chunk_size = BATCH_SCORING_CONFIG['chunk_size']
         
-        # Calculate RFM groups - first digit is R, second is F, third is M
-        rfm_scores['rfm_group'] = (
-            rfm_scores['r_quartile'].astype(str) + 
-            rfm_scores['f_quartile'].astype(str) + 
-            rfm_scores['m_quartile'].astype(str)
-        )
+        for start in range(0, len(recency), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            sketch.merge(RFMSketch(self.sketch_epsilon, seed=start).update(
+                recency[chunk], frequency[chunk], monetary[chunk]
+            ))
         
-        # Store segmented DataFrame
-        self.segmented_df = rfm_scores
+        return sketch.breakpoints(self.levels)
+    
+    def segment_lookup(self) -> Tuple[np.ndarray, List[str]]:
+        """
+        Get the segment lookup for this analysis' number of score levels.
         
-        return rfm_scores
+        Returns:
+            Tuple of the lookup array and segment names (see build_segment_lookup)
+        """
+        return build_segment_lookup(RFM_SEGMENTS, self.n_tiles)
     
     def assign_segments(self) -> pd.DataFrame:
         """
         Assign customer segments based on RFM scores.
         
+        The segment column is added to segmented_df in place.
+        
         Returns:
             DataFrame with customer segments
         """
         if self.segmented_df is None:
             raise ValueError("Must assign RFM scores first using assign_rfm_scores()")
         
-        # Create a copy of the segmented DataFrame
-        segmented = self.segmented_df.copy()
-        
-        # Initialize segment column
-        segmented['segment'] = 'Unknown'
+        segmented = self.segmented_df
         
-        # Apply segment rules from config
-        for segment_name, rules in RFM_SEGMENTS.items():
-            # Multiple conditions can define a segment
-            segment_mask = pd.Series(False, index=segmented.index)
-            
-            for rule in rules:
-                condition = pd.Series(True, index=segmented.index)
-                
-                # Apply each condition in the rule
-                for metric, values in rule.items():
-                    if metric == 'rfm_score':
-                        if isinstance(values, list):
-                            # If values is a list, check if score is in the list
-                            condition &= segmented['rfm_score'].isin(values)
-                        else:
-                            # If values is a single value, check if score equals it
-                            condition &= (segmented['rfm_score'] == values)
-                    elif metric == 'rfm_group':
-                        if isinstance(values, list):
-                            condition &= segmented['rfm_group'].isin(values)
-                        else:
-                            condition &= (segmented['rfm_group'] == values)
-                    else:
-                        # For r_quartile, f_quartile, m_quartile
-                        if isinstance(values, dict):
-                            if 'min' in values:
-                                condition &= (segmented[metric] >= values['min'])
-                            if 'max' in values:
-                                condition &= (segmented[metric] <= values['max'])
-                        else:
-                            condition &= (segmented[metric] == values)
-                
-                # Combined conditions with OR between rules
-                segment_mask |= condition
-            
-            # Assign segment name where conditions are met
-            segmented.loc[segment_mask, 'segment'] = segment_name
+        # Resolve rules once per score cell, then map every customer through the lookup
+        lookup, segment_names = self.segment_lookup()
+        segmented['segment'] = pd.Categorical.from_codes(
+            lookup[segmented['rfm_group'].to_numpy()],
+            categories=segment_names
+        )
         
         # Store segmented DataFrame
         self.segmented_df = segmented
@@ -215,24 +519,25 @@ class RFMAnalysisService:
             'average_recency': float(self.segmented_df['recency'].mean()),
             'average_frequency': float(self.segmented_df['frequency'].mean()),
             'average_monetary': float(self.segmented_df['monetary'].mean()),
-            'segment_distribution': {}
+            'scoring': {
+                'n_tiles': self.n_tiles,
+                'breakpoints': self.breakpoints,
+                'decay_half_life': self.decay_half_life
+            },
+            # Kept so the analysis can be re-segmented with other rules (see summarize_cells)
+            'score_cells': score_cell_histogram(
+                self.segmented_df['rfm_group'],
+                self.segmented_df['recency'],
+                self.segmented_df['frequency'],
+                self.segmented_df['monetary']
+            )
         }
         
-        # Calculate segment distribution
-        segment_counts = self.segmented_df['segment'].value_counts()
-        for segment, count in segment_counts.items():
-            summary['segment_distribution'][segment] = {
-                'count': int(count),
-                'percentage': float(count / summary['total_customers'] * 100),
-                'avg_recency': float(self.segmented_df[self.segmented_df['segment'] == segment]['recency'].mean()),
-                'avg_frequency': float(self.segmented_df[self.segmented_df['segment'] == segment]['frequency'].mean()),
-                'avg_monetary': float(self.segmented_df[self.segmented_df['segment'] == segment]['monetary'].mean()),
-                'total_revenue': float(self.segmented_df[self.segmented_df['segment'] == segment]['monetary'].sum()),
-                'revenue_percentage': float(
-                    self.segmented_df[self.segmented_df['segment'] == segment]['monetary'].sum() / 
-                    summary['total_revenue'] * 100
-                )
-            }
+        # Calculate segment distribution from the score cells
+        summary['segment_distribution'] = summarize_cells(summary['score_cells'], *self.segment_lookup())
+        
+        if self.decay_half_life:
+            summary['cohorts'] = cohort_counts(self.segmented_df['cohort'])
         
         # Store summary
         self.summary = summary
@@ -253,8 +558,7 @@ class RFMAnalysisService:
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
         
         # Save to JSON file
-        with open(file_path, 'w') as f:
-            json.dump(self.summary, f, indent=2)
+        serialization.dump(self.summary, file_path)
     
     def get_customer_data(self, customer_id: str) -> Dict[str, Any]:
         """
@@ -272,21 +576,15 @@ class RFMAnalysisService:
         if customer_id not in self.segmented_df.index:
             return {"error": "Customer not found"}
         
-        # Get customer data
-        customer_data = self.segmented_df.loc[customer_id].to_dict()
-        
-        # Convert numpy types to Python types for JSON serialization
-        for key, value in customer_data.items():
-            if isinstance(value, (np.int64, np.int32, np.int16, np.int8)):
-                customer_data[key] = int(value)
-            elif isinstance(value, (np.float64, np.float32, np.float16)):
-                customer_data[key] = float(value)
+        # Get customer data as plain Python types for JSON serialization
+        customer_data = serialization.to_builtin(self.segmented_df.loc[customer_id].to_dict())
+        customer_data['rfm_group'] = format_rfm_group(customer_data['rfm_group'], self.n_tiles)
         
         return customer_data
     
     def perform_full_analysis(self, analysis_date: datetime = None) -> Dict[str, Any]:
         """
-        Perform the complete RFM analysis workflow.
+        Perform the complete RFM analysis workflow with the selected engine.
         
         Args:
             analysis_date: Reference date for recency calculation
@@ -294,8 +592,4 @@ class RFMAnalysisService:
         Returns:
             Dictionary containing analysis summary
         """
-        self.preprocess_data()
-        self.calculate_rfm(analysis_date)
-        self.assign_rfm_scores()
-        self.assign_segments()
-        return self.generate_summary() 
\ No newline at end of file
+        return get_engine(self.engine).run(self, analysis_date) 
\ No newline at end of file
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status, BackgroundTasks, Body
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status, BackgroundTasks, Body, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from typing import Dict, List, Any, Optional
 import os
 import sys
-import json
+import tempfile
 import pandas as pd
 import uuid
 from datetime import datetime
@@ -11,61 +13,113 @@ from sqlalchemy.orm import Session
 
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from config.config import JWT_SECRET, JWT_ALGORITHM
+from config.config import JWT_SECRET, JWT_ALGORITHM, PREVIEW_CONFIG
 
 # Import local modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from rfm_service import RFMAnalysisService
+from rfm_service import RFMAnalysisService, build_segment_lookup, summarize_cells, validate_segment_rules
+from engines import ENGINES
+from preview import preview_analysis
+from migration import migration_matrix
+from snapshots import rolling_segment_counts, weekly_snapshot_dates
+from customer_store import write_scored_customers, export_customer_table, segment_filter, EXPORT_FORMATS
+from history import keyset_page
+from usage import add_usage
+from http_cache import file_response, static_cache_control
 from openai_service import OpenAIService
 from database import get_db, Analysis, CustomerSegment
 from auth import get_current_user
+from serialization import FastJSONResponse
+from ingestion import is_supported, spool_upload, read_files, TRANSACTION_SCHEMA, MissingColumnsError
+import serialization
 
 # Analysis router
-router = APIRouter(prefix="/api/analysis", tags=["analysis"])
+router = APIRouter(prefix="/api/analysis", tags=["analysis"], default_response_class=FastJSONResponse)
 
 # Create storage directory if it doesn't exist
 os.makedirs("storage/analysis_history", exist_ok=True)
 
+# Scored customers are kept outside storage/, which is served without authentication,
+# and are only downloaded through the export endpoint
+SCORED_CUSTOMERS_DIR = "scored_customers"
+os.makedirs(SCORED_CUSTOMERS_DIR, exist_ok=True)
+
+def scored_customers_path(user_id: Any, analysis_id: str) -> str:
+    """
+    Get the path of the scored customers stored for an analysis.
+    """
+    return os.path.join(SCORED_CUSTOMERS_DIR, f"{user_id}_{analysis_id}_customers.parquet")
+
+def move_legacy_scored_customers() -> int:
+    """
+    Move scored customers stored under storage/ by earlier versions out of the served directory.
+    
+    Returns:
+        Number of files moved
+    """
+    moved = 0
+    for name in os.listdir("storage/analysis_history"):
+        if name.endswith("_customers.parquet"):
+            os.replace(os.path.join("storage/analysis_history", name), os.path.join(SCORED_CUSTOMERS_DIR, name))
+            moved += 1
+    return moved
+
+move_legacy_scored_customers()
+
 @router.post("/upload")
 async def upload_data(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    additional_files: List[UploadFile] = File(default=[]),
+    n_tiles: Optional[int] = Form(None),
+    engine: Optional[str] = Form(None),
+    preview: Optional[bool] = Form(None),
+    snapshot_weeks: Optional[int] = Form(None),
+    decay_half_life: Optional[float] = Form(None),
     user: Dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Upload customer transaction data for RFM analysis.
+    
+    Several files can be uploaded for one analysis. CSV (optionally gzip
+    compressed), Excel workbooks (all sheets) and zip archives of CSV files
+    are accepted. n_tiles sets the number of score levels per metric
+    (defaults to the configured value, quartiles). engine selects the
+    dataframe engine running the analysis ('pandas' or 'polars').
+    
+    Unless preview is false, an approximate analysis of a customer sample,
+    with confidence intervals, is returned right away and stored as the
+    analysis result with status 'preview'. The exact analysis replaces it
+    in place (status 'completed') when the background processing finishes.
+    
+    snapshot_weeks adds a trend to the result: customer counts per segment
+    at that many weekly snapshot dates, ending at the analysis date.
+    
+    decay_half_life (days) scores customers on time-decayed frequency and
+    monetary values, so recent purchases weigh more, and adds first-purchase
+    cohorts to the summary; 0 scores plain counts and sums.
     """
-    if not file.filename.endswith(('.csv', '.xlsx', '.xls')):
-        raise HTTPException(status_code=400, detail="File must be CSV or Excel format")
+    uploads = [file] + list(additional_files or [])
+    for upload in uploads:
+        if not is_supported(upload.filename):
+            raise HTTPException(status_code=400, detail="File must be CSV, Excel, gzip or zip format")
+    if n_tiles is not None and not 2 <= n_tiles <= 99:
+        raise HTTPException(status_code=400, detail="n_tiles must be between 2 and 99")
+    if engine is not None and engine not in ENGINES:
+        raise HTTPException(status_code=400, detail=f"engine must be one of: {', '.join(ENGINES)}")
+    if snapshot_weeks is not None and not 1 <= snapshot_weeks <= 260:
+        raise HTTPException(status_code=400, detail="snapshot_weeks must be between 1 and 260")
+    if decay_half_life is not None and decay_half_life < 0:
+        raise HTTPException(status_code=400, detail="decay_half_life must not be negative")
     
     try:
-        # Read file content
-        contents = await file.read()
-        
-        # Save file temporarily
-        temp_file_path = f"storage/temp_{file.filename}"
-        with open(temp_file_path, "wb") as f:
-            f.write(contents)
-        
-        # Read data into DataFrame
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(temp_file_path)
-        else:
-            df = pd.read_excel(temp_file_path)
-        
-        # Delete temporary file
-        os.remove(temp_file_path)
-        
-        # Validate data contains required columns
-        required_columns = ['customer_id', 'transaction_id', 'transaction_date', 'transaction_amount']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Data is missing required columns: {', '.join(missing_columns)}"
-            )
+        # Spool uploads to disk and parse them in parallel
+        with tempfile.TemporaryDirectory(dir="storage") as temp_dir:
+            files = [(await run_in_threadpool(spool_upload, upload.file, temp_dir), upload.filename) for upload in uploads]
+            file_size = sum(os.path.getsize(path) for path, _ in files)
+            # Only the declared transaction columns are loaded, already typed
+            df, ingestion_report = await run_in_threadpool(read_files, files, None, TRANSACTION_SCHEMA)
         
         # Create analysis ID
         analysis_id = str(uuid.uuid4())
@@ -75,31 +129,60 @@ async def upload_data(
             analysis_id=analysis_id,
             user_id=user["user_id"],
             file_name=file.filename,
-            file_size=len(contents),
+            file_size=file_size,
             total_customers=len(df['customer_id'].unique())
         )
         
         db.add(db_analysis)
+        add_usage(db, user["user_id"], analysis_count=1, storage_bytes=file_size, customers_analyzed=db_analysis.total_customers)
         db.commit()
         
+        # Approximate analysis of a customer sample, available until the exact result replaces it
+        # The analysis is already recorded, so a failed preview only leaves the client waiting for the exact result
+        preview_summary = None
+        if PREVIEW_CONFIG['enabled'] if preview is None else preview:
+            try:
+                preview_summary = await run_in_threadpool(preview_analysis, df, n_tiles=n_tiles, engine=engine,
+                                                     decay_half_life=decay_half_life)
+                serialization.dump({
+                    "analysis_id": analysis_id,
+                    "date_created": datetime.now().isoformat(),
+                    "status": "preview",
+                    "summary": preview_summary
+                }, f"storage/analysis_history/{user['user_id']}_{analysis_id}.json")
+            except Exception as e:
+                print(f"Error in preview analysis: {e}")
+                preview_summary = None
+        
         # Schedule background task for RFM analysis
         background_tasks.add_task(
             process_rfm_analysis,
             df=df,
             analysis_id=analysis_id,
             user_id=user["user_id"],
-            db_session=db
+            db_session=db,
+            n_tiles=n_tiles,
+            engine=engine,
+            snapshot_weeks=snapshot_weeks,
+            decay_half_life=decay_half_life
         )
         
         return {
             "message": "Data uploaded successfully. Analysis is being processed.",
-            "analysis_id": analysis_id
+            "analysis_id": analysis_id,
+            "ingestion": ingestion_report,
+            "preview": preview_summary
         }
         
+    except HTTPException:
+        raise
+    except MissingColumnsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
-async def process_rfm_analysis(df: pd.DataFrame, analysis_id: str, user_id: int, db_session: Session):
+async def process_rfm_analysis(df: pd.DataFrame, analysis_id: str, user_id: int, db_session: Session, n_tiles: int = None, engine: str = None,
+                               snapshot_weeks: int = None, decay_half_life: float = None):
     """
     Process RFM analysis as a background task.
     """
@@ -108,14 +191,16 @@ async def process_rfm_analysis(df: pd.DataFrame, analysis_id: str, user_id: int,
         db = db_session
         
         # Create RFM analysis service
-        rfm_service = RFMAnalysisService(df)
+        rfm_service = RFMAnalysisService(df, n_tiles=n_tiles, engine=engine, decay_half_life=decay_half_life)
         
         # Perform RFM analysis
-        summary = rfm_service.perform_full_analysis()
+        analysis_date = datetime.now()
+        summary = rfm_service.perform_full_analysis(analysis_date)
         
         # Update analysis record
         db_analysis = db.query(Analysis).filter(Analysis.analysis_id == analysis_id).first()
         if db_analysis:
+            add_usage(db, user_id, customers_analyzed=summary['total_customers'] - (db_analysis.total_customers or 0))
             db_analysis.total_customers = summary['total_customers']
             db.commit()
         
@@ -136,21 +221,38 @@ async def process_rfm_analysis(df: pd.DataFrame, analysis_id: str, user_id: int,
         
         db.commit()
         
+        # Keep the scored customers so later analyses can be compared with this one
+        await run_in_threadpool(write_scored_customers, rfm_service.segmented_df, scored_customers_path(user_id, analysis_id))
+        
         # Generate insights using OpenAI
-        insights = await OpenAIService.generate_rfm_insights(summary)
+        llm_usage = {}
+        insights = await OpenAIService.generate_rfm_insights(summary, usage=llm_usage)
+        add_usage(db, user_id, **llm_usage)
+        db.commit()
         
         # Create result object
         result = {
             "analysis_id": analysis_id,
             "date_created": datetime.now().isoformat(),
+            "status": "completed",
             "summary": summary,
             "insights": insights
         }
         
-        # Save analysis results to file
+        # Segment counts over weekly snapshots, in one pass over the transactions
+        if snapshot_weeks:
+            counts = await run_in_threadpool(
+                rolling_segment_counts, rfm_service.data, weekly_snapshot_dates(analysis_date, snapshot_weeks),
+                n_tiles=n_tiles, decay_half_life=decay_half_life
+            )
+            result["trend"] = {
+                "snapshot_dates": [snapshot.isoformat() for snapshot in counts.index],
+                "segment_counts": {segment: counts[segment].tolist() for segment in counts.columns if counts[segment].any()}
+            }
+        
+        # Save analysis results to file, replacing the preview
         save_path = f"storage/analysis_history/{user_id}_{analysis_id}.json"
-        with open(save_path, "w") as f:
-            json.dump(result, f, indent=2)
+        serialization.dump(result, save_path)
             
     except Exception as e:
         print(f"Error in background processing: {e}")
@@ -166,25 +268,75 @@ async def process_rfm_analysis(df: pd.DataFrame, analysis_id: str, user_id: int,
         error_result = {
             "analysis_id": analysis_id,
             "date_created": datetime.now().isoformat(),
+            "status": "error",
             "error": str(e)
         }
         
         save_path = f"storage/analysis_history/{user_id}_{analysis_id}.json"
-        with open(save_path, "w") as f:
-            json.dump(error_result, f, indent=2)
+        serialization.dump(error_result, save_path)
+
+# Declared before /{analysis_id}, which would otherwise match /history
+@router.get("/history")
+async def get_analysis_history(
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    user: Dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get one page of the RFM analyses of the current user, newest first.
+    
+    Pages are read with keyset pagination on the (user_id, date_created)
+    index, so every page costs the same however many analyses the user has.
+    Pass the next_cursor of a page as cursor to get the following one.
+    """
+    try:
+        # Only the listed columns are read
+        query = db.query(
+            Analysis.id,
+            Analysis.analysis_id,
+            Analysis.date_created,
+            Analysis.file_name,
+            Analysis.total_customers,
+            Analysis.has_error
+        ).filter(Analysis.user_id == user["user_id"])
+        rows, next_cursor = keyset_page(query, Analysis.date_created, Analysis.id, cursor, limit)
+        
+        history = [
+            {
+                "analysis_id": row.analysis_id,
+                "date_created": row.date_created.isoformat(),
+                "file_name": row.file_name,
+                "total_customers": row.total_customers,
+                "has_error": row.has_error
+            }
+            for row in rows
+        ]
+        
+        return {"history": history, "next_cursor": next_cursor}
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving analysis history: {str(e)}")
 
 @router.get("/{analysis_id}")
 async def get_analysis_results(
     analysis_id: str,
+    request: Request,
     user: Dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Get results of a specific RFM analysis.
+    
+    The stored result file is sent as is, with a strong ETag of its version.
+    Clients polling with If-None-Match get an empty 304 response until the
+    result changes; Range requests get part of the file.
     """
     try:
         # Check if analysis exists and belongs to user
-        db_analysis = db.query(Analysis).filter(
+        db_analysis = db.query(Analysis.id).filter(
             Analysis.analysis_id == analysis_id,
             Analysis.user_id == user['user_id']
         ).first()
@@ -195,50 +347,18 @@ async def get_analysis_results(
         # Check if analysis file exists
         file_path = f"storage/analysis_history/{user['user_id']}_{analysis_id}.json"
         
-        if not os.path.exists(file_path):
+        try:
+            stat_result = os.stat(file_path)
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail="Analysis results not found")
         
-        # Read analysis results
-        with open(file_path, "r") as f:
-            result = json.load(f)
-        
-        return result
+        return file_response(request, file_path, "application/json", static_cache_control(file_path), stat_result)
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving analysis: {str(e)}")
 
-@router.get("/history")
-async def get_analysis_history(
-    user: Dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """
-    Get history of all RFM analyses for the current user.
-    """
-    try:
-        # Get analyses from database
-        db_analyses = db.query(Analysis).filter(
-            Analysis.user_id == user["user_id"]
-        ).order_by(Analysis.date_created.desc()).all()
-        
-        history = []
-        
-        for analysis in db_analyses:
-            history.append({
-                "analysis_id": analysis.analysis_id,
-                "date_created": analysis.date_created.isoformat(),
-                "file_name": analysis.file_name,
-                "total_customers": analysis.total_customers,
-                "has_error": analysis.has_error
-            })
-        
-        return {"history": history}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error retrieving analysis history: {str(e)}")
-
 @router.post("/{analysis_id}/regenerate-insights")
 async def regenerate_insights(
     analysis_id: str,
@@ -265,21 +385,25 @@ async def regenerate_insights(
             raise HTTPException(status_code=404, detail="Analysis results not found")
         
         # Read existing analysis
-        with open(file_path, "r") as f:
-            analysis = json.load(f)
+        analysis = serialization.load(file_path)
         
         if "summary" not in analysis:
             raise HTTPException(status_code=400, detail="Analysis does not contain summary data")
         
+        if analysis.get("status") == "preview":
+            raise HTTPException(status_code=409, detail="Analysis is still being processed")
+        
         # Generate new insights
-        insights = await OpenAIService.generate_rfm_insights(analysis["summary"])
+        llm_usage = {}
+        insights = await OpenAIService.generate_rfm_insights(analysis["summary"], usage=llm_usage)
+        add_usage(db, user['user_id'], **llm_usage)
+        db.commit()
         
         # Update insights
         analysis["insights"] = insights
         
         # Save updated analysis
-        with open(file_path, "w") as f:
-            json.dump(analysis, f, indent=2)
+        serialization.dump(analysis, file_path)
         
         return {"message": "Insights regenerated successfully", "insights": insights}
         
@@ -288,17 +412,160 @@ async def regenerate_insights(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error regenerating insights: {str(e)}")
 
+@router.post("/{analysis_id}/resegment")
+async def resegment_analysis(
+    analysis_id: str,
+    rules: Dict = Body(...),
+    user: Dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Re-label an existing analysis with an alternative set of segment rules.
+    
+    The rules are given in the RFM_SEGMENTS format and applied to the stored
+    score cell histogram, so the cost does not depend on the number of
+    customers. The stored analysis is left unchanged.
+    """
+    try:
+        validate_segment_rules(rules)
+        
+        # Check if analysis exists and belongs to user
+        db_analysis = db.query(Analysis).filter(
+            Analysis.analysis_id == analysis_id,
+            Analysis.user_id == user['user_id']
+        ).first()
+        
+        if not db_analysis:
+            raise HTTPException(status_code=404, detail="Analysis not found")
+        
+        # Check if analysis file exists
+        file_path = f"storage/analysis_history/{user['user_id']}_{analysis_id}.json"
+        
+        if not os.path.exists(file_path):
+            raise HTTPException(status_code=404, detail="Analysis results not found")
+        
+        analysis = serialization.load(file_path)
+        
+        if analysis.get("status") == "preview":
+            raise HTTPException(status_code=409, detail="Analysis is still being processed")
+        
+        if "score_cells" not in analysis.get("summary", {}):
+            raise HTTPException(status_code=400, detail="Analysis does not contain score cells; run it again to re-segment it")
+        
+        summary = analysis["summary"]
+        lookup, segment_names = build_segment_lookup(rules, summary["scoring"]["n_tiles"])
+        
+        return {
+            "analysis_id": analysis_id,
+            "segment_distribution": summarize_cells(summary["score_cells"], lookup, segment_names)
+        }
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error re-segmenting analysis: {str(e)}")
+
+@router.get("/{analysis_id}/migration")
+async def get_segment_migration(
+    analysis_id: str,
+    compare_to: str,
+    user: Dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get how customers moved between segments from an earlier analysis to this one.
+    
+    compare_to is the ID of the earlier analysis. The response holds the
+    segment-by-segment transition matrix of customers and the revenue flow,
+    with an 'Absent' state for new and lost customers.
+    """
+    try:
+        # Check if both analyses exist and belong to user
+        found = db.query(Analysis.analysis_id).filter(
+            Analysis.analysis_id.in_([analysis_id, compare_to]),
+            Analysis.user_id == user['user_id']
+        ).count()
+        
+        if found < len({analysis_id, compare_to}):
+            raise HTTPException(status_code=404, detail="Analysis not found")
+        
+        before_path = scored_customers_path(user['user_id'], compare_to)
+        after_path = scored_customers_path(user['user_id'], analysis_id)
+        
+        if not os.path.exists(before_path) or not os.path.exists(after_path):
+            raise HTTPException(status_code=404, detail="Scored customers not found; the analyses may still be processing")
+        
+        migration = await run_in_threadpool(migration_matrix, before_path, after_path)
+        
+        return {"analysis_id": analysis_id, "compare_to": compare_to, **migration}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing segment migration: {str(e)}")
+
+@router.get("/{analysis_id}/customers/export")
+async def export_scored_customers(
+    analysis_id: str,
+    format: str = "arrow",
+    columns: Optional[str] = None,
+    segment: Optional[List[str]] = Query(None),
+    user: Dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Download the scored customers of an analysis, e.g. for a CRM import.
+    
+    format is 'arrow' (Arrow IPC stream), 'parquet' or 'csv'. columns is a
+    comma-separated list of columns to export (all by default), and every
+    segment parameter adds a segment to export (all by default). The table
+    is streamed batch by batch from the stored result, with the columns and
+    segments pushed down into the read.
+    """
+    try:
+        # Check if analysis exists and belongs to user
+        db_analysis = db.query(Analysis.id).filter(
+            Analysis.analysis_id == analysis_id,
+            Analysis.user_id == user['user_id']
+        ).first()
+        
+        if not db_analysis:
+            raise HTTPException(status_code=404, detail="Analysis not found")
+        
+        selected = [column.strip() for column in columns.split(",") if column.strip()] if columns else None
+        chunks = export_customer_table(scored_customers_path(user['user_id'], analysis_id), format, selected,
+                                       segment_filter(segment))
+        
+        return StreamingResponse(chunks, media_type=EXPORT_FORMATS[format], headers={
+            "Content-Disposition": f'attachment; filename="{analysis_id}_customers.{format}"'
+        })
+        
+    except HTTPException:
+        raise
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Scored customers not found; the analysis may still be processing")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error exporting customers: {str(e)}")
+
 @router.post("/churn-prediction")
 async def predict_churn(
     churn_data: Dict = Body(...),
-    user: Dict = Depends(get_current_user)
+    user: Dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """
     Generate churn prediction insights based on provided data.
     """
     try:
         # Generate churn insights using OpenAI
-        insights = await OpenAIService.generate_churn_insights(churn_data)
+        llm_usage = {}
+        insights = await OpenAIService.generate_churn_insights(churn_data, usage=llm_usage)
+        add_usage(db, user['user_id'], **llm_usage)
+        db.commit()
         
         return {"insights": insights}
         
@@ -308,14 +575,18 @@ async def predict_churn(
 @router.post("/ltv-optimization")
 async def optimize_ltv(
     ltv_data: Dict = Body(...),
-    user: Dict = Depends(get_current_user)
+    user: Dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """
     Generate LTV optimization insights based on provided data.
     """
     try:
         # Generate LTV insights using OpenAI
-        insights = await OpenAIService.generate_ltv_insights(ltv_data)
+        llm_usage = {}
+        insights = await OpenAIService.generate_ltv_insights(ltv_data, usage=llm_usage)
+        add_usage(db, user['user_id'], **llm_usage)
+        db.commit()
         
         return {"insights": insights}
         
@@ -346,14 +617,17 @@ async def delete_analysis(
             CustomerSegment.analysis_id == analysis_id
         ).delete()
         
-        # Delete analysis from database
+        # Delete analysis from database, with its share of the usage counters
+        add_usage(db, user['user_id'], analysis_count=-1, storage_bytes=-(db_analysis.file_size or 0),
+                  customers_analyzed=-(db_analysis.total_customers or 0))
         db.delete(db_analysis)
         db.commit()
         
-        # Delete analysis file if it exists
-        file_path = f"storage/analysis_history/{user['user_id']}_{analysis_id}.json"
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        # Delete analysis files if they exist
+        for file_path in (f"storage/analysis_history/{user['user_id']}_{analysis_id}.json",
+                          scored_customers_path(user['user_id'], analysis_id)):
+            if os.path.exists(file_path):
+                os.remove(file_path)
         
         return {"message": "Analysis deleted successfully"}
         
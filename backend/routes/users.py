@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import Dict, List, Any, Optional
 import sys
 import os
@@ -11,8 +10,9 @@ from config.config import JWT_SECRET, JWT_ALGORITHM
 
 # Import local modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from database import get_db, User, Analysis
+from database import get_db, User
 from auth import get_current_user
+from usage import get_usage
 
 # User router
 router = APIRouter(prefix="/api/users", tags=["users"])
@@ -95,19 +95,17 @@ async def get_usage_statistics(
     Get usage statistics for the current user.
     """
     try:
-        # Get total number of analyses
-        analysis_count = db.query(User).join(User.analyses).filter(User.id == user["user_id"]).count()
-        
-        # Get total storage usage
-        storage_usage = db.query(func.sum(Analysis.file_size)).filter(
-            Analysis.user_id == user["user_id"]
-        ).scalar() or 0
+        # Counters are maintained with the analyses (see usage.py): one primary key read
+        usage = get_usage(db, user["user_id"])
+        storage_usage = usage['storage_bytes']
         
         # Get statistics
         return {
-            "total_analyses": analysis_count,
+            "total_analyses": usage['analysis_count'],
             "storage_usage_bytes": storage_usage,
-            "storage_usage_mb": round(storage_usage / (1024 * 1024), 2)
+            "storage_usage_mb": round(storage_usage / (1024 * 1024), 2),
+            "customers_analyzed": usage['customers_analyzed'],
+            "llm_tokens_used": usage['llm_tokens']
         }
         
     except Exception as e:
@@ -0,0 +1,203 @@
+# RFM Matrix - N-tile Scoring Engine
+
+import os
+import sys
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import RFM_SCORING_ENGINE
+
+NANOSECONDS_PER_DAY = 86_400_000_000_000
+
+# Number of score levels the segment rules are written for
+SCORE_LEVELS = 4
+
+
+def quantile_levels(n_tiles: int = None, cut_points: Optional[Sequence[float]] = None) -> np.ndarray:
+    """
+    Get the interior quantile levels separating the score tiles.
+
+    Args:
+        n_tiles: Number of equal-frequency tiles (4 = quartiles, 5 = quintiles, 10 = deciles)
+        cut_points: Custom quantile levels in (0, 1); overrides n_tiles
+
+    Returns:
+        Sorted array of n_tiles - 1 quantile levels
+    """
+    if cut_points is None and n_tiles is None:
+        cut_points = RFM_SCORING_ENGINE['cut_points'] or None
+        n_tiles = RFM_SCORING_ENGINE['n_tiles']
+
+    if cut_points:
+        levels = np.sort(np.asarray(cut_points, dtype=np.float64))
+        if levels[0] <= 0 or levels[-1] >= 1:
+            raise ValueError("Cut points must be quantile levels strictly between 0 and 1")
+        return levels
+
+    if n_tiles is None or n_tiles < 2:
+        raise ValueError("n_tiles must be at least 2")
+    return np.arange(1, n_tiles) / n_tiles
+
+
+def _interpolated_quantiles(partitioned: np.ndarray, levels: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """
+    Linearly interpolate quantiles from order statistics (same definition as numpy/pandas).
+    """
+    n = partitioned.shape[-1]
+    weight = levels * (n - 1) - lower
+    return partitioned[:, lower] + (partitioned[:, upper] - partitioned[:, lower]) * weight
+
+
+def compute_breakpoints(columns: Dict[str, Sequence[float]], levels: np.ndarray) -> Dict[str, List[float]]:
+    """
+    Compute the breakpoints of several metrics in one partition-based pass.
+
+    All metrics are stacked into one array (one contiguous row per metric) and
+    a single np.partition call places every needed order statistic, so no full
+    sort is performed.
+
+    Args:
+        columns: Metric name -> values (all of the same length)
+        levels: Interior quantile levels from quantile_levels
+
+    Returns:
+        Metric name -> list of n_tiles - 1 breakpoints
+    """
+    names = list(columns)
+    stacked = np.vstack([np.asarray(columns[name], dtype=np.float64) for name in names])
+
+    if np.isnan(stacked).any():
+        # Metrics with missing values have different valid lengths: partition them separately
+        return {
+            name: compute_breakpoints({name: values[~np.isnan(values)]}, levels)[name]
+            for name, values in zip(names, stacked)
+        }
+
+    n = stacked.shape[1]
+    if n == 0:
+        raise ValueError("Cannot compute breakpoints of an empty dataset")
+
+    positions = levels * (n - 1)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.ceil(positions).astype(np.int64)
+    kth = np.unique(np.concatenate([lower, upper]))
+
+    # The stacked array is ours, so partition it in place rather than into a copy
+    stacked.partition(kth, axis=1)
+    quantiles = _interpolated_quantiles(stacked, levels, lower, upper)
+
+    return {name: quantiles[i].tolist() for i, name in enumerate(names)}
+
+
+def assign_scores(values: Sequence[float], breakpoints: Sequence[float], reverse: bool = False) -> np.ndarray:
+    """
+    Assign 1-based tile scores to values using stored breakpoints.
+
+    Tiles are right-inclusive like pd.qcut: a value equal to a breakpoint falls
+    in the lower tile. Equal values therefore always get the same score, and
+    when heavy ties make breakpoints coincide the affected tiles are left
+    empty instead of being merged, so the score scale keeps all n_tiles levels.
+
+    Args:
+        values: Metric values to score
+        breakpoints: Interior breakpoints from compute_breakpoints
+        reverse: If True, the lowest tile gets the highest score (e.g. recency)
+
+    Returns:
+        Array of int8 scores between 1 and len(breakpoints) + 1
+    """
+    breakpoints = np.asarray(breakpoints, dtype=np.float64)
+    tiles = np.searchsorted(breakpoints, np.asarray(values, dtype=np.float64), side='left').astype(np.int8)
+
+    if reverse:
+        return (len(breakpoints) + 1 - tiles).astype(np.int8)
+    return (tiles + 1).astype(np.int8)
+
+
+def group_code_base(levels: int = SCORE_LEVELS) -> int:
+    """
+    Get the positional base of RFM group codes: one digit per score below 10 levels, two digits otherwise.
+    """
+    return 10 if levels < 10 else 100
+
+
+def group_code_dtype(levels: int = SCORE_LEVELS) -> type:
+    """
+    Get the smallest integer type holding every RFM group code for a number of levels.
+    """
+    return np.int16 if levels < 10 else np.int32
+
+
+def rfm_group_code(r: Any, f: Any, m: Any, levels: int = SCORE_LEVELS) -> Any:
+    """
+    Combine R, F and M scores into the integer code of their RFM group (e.g. 4, 3, 4 -> 434).
+
+    Works on scalars and arrays of scores; scores are widened to
+    group_code_dtype(levels), so int8 scores do not overflow.
+
+    Args:
+        r, f, m: Recency, frequency and monetary scores
+        levels: Number of score levels per metric
+
+    Returns:
+        Array of group codes
+    """
+    base = group_code_base(levels)
+    dtype = group_code_dtype(levels)
+    r, f, m = (np.asarray(scores).astype(dtype) for scores in (r, f, m))
+    return r * base * base + f * base + m
+
+
+def rescale_scores(scores: Any, n_tiles: int, levels: int) -> Any:
+    """
+    Map scores on an n_tiles scale onto a coarser or finer scale of levels.
+
+    Segmentation rules are written for a fixed number of levels; rescaling lets
+    the same rules apply whatever number of tiles the scores were computed with.
+    Works on scalars and on NumPy arrays/pandas Series.
+
+    Args:
+        scores: Scores between 1 and n_tiles
+        n_tiles: Number of tiles the scores were computed with
+        levels: Number of levels of the target scale
+
+    Returns:
+        Scores between 1 and levels
+    """
+    if n_tiles == levels:
+        return scores
+    return np.ceil(np.asarray(scores) * levels / n_tiles).astype(np.int8)
+
+
+def decay_weights(dates: Any, analysis_date: Any, half_life_days: float) -> np.ndarray:
+    """
+    Exponential time-decay weight of every transaction.
+
+    A transaction half_life_days old weighs 0.5, one on (or after) the
+    analysis date weighs 1, so decayed frequency and monetary values are the
+    sums of these weights and of weighted amounts.
+
+    Args:
+        dates: Transaction dates (datetime64 array-like)
+        analysis_date: Reference date the ages are measured from
+        half_life_days: Age in days at which a transaction counts half
+
+    Returns:
+        float64 array of weights in (0, 1]
+    """
+    if half_life_days is None or half_life_days <= 0:
+        raise ValueError("half_life_days must be positive")
+
+    # Ages in nanoseconds, turned into weights in the same buffer
+    weights = np.subtract(
+        np.datetime64(analysis_date, 'ns').astype(np.int64),
+        np.asarray(dates, dtype='datetime64[ns]').view(np.int64),
+        dtype=np.float64
+    )
+    np.maximum(weights, 0, out=weights)
+    # 2^(-age / half-life) as a single exp over the whole column
+    weights *= -np.log(2) / (half_life_days * NANOSECONDS_PER_DAY)
+    return np.exp(weights, out=weights)
@@ -0,0 +1,178 @@
+# RFM Matrix - Serialization Module
+
+import datetime
+import decimal
+import json
+import math
+import os
+import tempfile
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    orjson = None
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """
+    Convert objects the JSON encoders do not handle natively.
+
+    Args:
+        obj: Object that could not be serialized
+
+    Returns:
+        JSON-compatible equivalent of the object
+    """
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_dict('records')
+    if isinstance(obj, pd.Series):
+        return obj.to_dict()
+    if isinstance(obj, (pd.Index, pd.Categorical)):
+        return obj.tolist()
+    if isinstance(obj, pd.Timestamp):
+        return None if pd.isna(obj) else obj.isoformat()
+    if isinstance(obj, pd.Timedelta):
+        return None if pd.isna(obj) else obj.total_seconds()
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _normalize_key(key: Any) -> Any:
+    """
+    Convert a mapping key to a type every encoder accepts.
+    """
+    if isinstance(key, np.generic):
+        key = key.item()
+    if isinstance(key, (str, int, float, bool)) or key is None:
+        return key
+    if isinstance(key, (datetime.datetime, datetime.date)):
+        return key.isoformat()
+    return str(key)
+
+
+def to_builtin(obj: Any) -> Any:
+    """
+    Recursively convert an object to plain Python types.
+
+    NaN values become None so the output is valid JSON.
+
+    Args:
+        obj: Object to convert
+
+    Returns:
+        Equivalent object made only of dicts, lists, strings, numbers, booleans and None
+    """
+    if isinstance(obj, dict):
+        return {_normalize_key(key): to_builtin(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_builtin(value) for value in obj]
+    if isinstance(obj, float):
+        return None if math.isnan(obj) else obj
+    if isinstance(obj, (str, int, bool)) or obj is None:
+        return obj
+
+    return to_builtin(_default(obj))
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serialize an object to JSON bytes.
+
+    NumPy scalars and arrays, datetimes and pandas objects are handled
+    natively. orjson is used when available, with the standard library as a
+    fallback.
+
+    Args:
+        obj: Object to serialize
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+        except TypeError:
+            # NumPy or other non-native mapping keys; normalize and retry
+            return orjson.dumps(to_builtin(obj), default=_default, option=ORJSON_OPTIONS)
+
+    return json.dumps(to_builtin(obj), ensure_ascii=False).encode('utf-8')
+
+
+def loads(data: Any) -> Any:
+    """
+    Deserialize JSON bytes or text.
+
+    Args:
+        data: JSON document
+
+    Returns:
+        Deserialized object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump(obj: Any, file_path: str) -> None:
+    """
+    Serialize an object to a JSON file.
+
+    The file is written to a temporary name and moved into place, so readers
+    never see a partially written result.
+
+    Args:
+        obj: Object to serialize
+        file_path: Destination path
+    """
+    directory = os.path.dirname(file_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dumps(obj))
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def load(file_path: str) -> Any:
+    """
+    Deserialize a JSON file.
+
+    Args:
+        file_path: Path of the JSON file
+
+    Returns:
+        Deserialized object
+    """
+    with open(file_path, 'rb') as f:
+        return loads(f.read())
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with the shared serialization layer."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
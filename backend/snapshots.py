@@ -0,0 +1,123 @@
+# RFM Matrix - Rolling Snapshots Module
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from rfm_service import RFMAnalysisService
+from scoring import decay_weights
+
+NANOSECONDS_PER_DAY = 86_400_000_000_000
+
+
+def weekly_snapshot_dates(end: datetime, weeks: int = 52) -> List[datetime]:
+    """
+    Get weekly reference dates ending at end, oldest first.
+
+    Args:
+        end: Last snapshot date
+        weeks: Number of snapshots
+
+    Returns:
+        List of snapshot dates
+    """
+    return [end - timedelta(weeks=weeks - 1 - i) for i in range(weeks)]
+
+
+def rolling_segment_counts(data: pd.DataFrame, snapshot_dates: Sequence[datetime], n_tiles: int = None,
+                           cut_points: List[float] = None, breakpoints: Dict[str, List[float]] = None,
+                           decay_half_life: float = None) -> pd.DataFrame:
+    """
+    Count customers per segment at many reference dates in one pass over the transactions.
+
+    Transactions are sorted by date once and swept from snapshot to snapshot,
+    keeping each customer's running transaction count, amount sum and
+    last-seen date. At every snapshot, customers with a transaction up to
+    that date are scored and segmented as perform_full_analysis would do
+    with that date on the transactions up to it.
+
+    Time-decayed frequency and monetary values are carried over too: the
+    running sums decay by the weight of the time between two snapshots
+    before the new transactions are added with their own weights.
+
+    Args:
+        data: Transaction data (the frame is taken over, as by RFMAnalysisService)
+        snapshot_dates: Reference dates; each includes the transactions up to it
+        n_tiles: Number of score levels per metric
+        cut_points: Custom quantile levels separating the score levels
+        breakpoints: Fixed breakpoints used at every snapshot, so scores are
+            comparable over time. By default each snapshot computes its own.
+        decay_half_life: Half-life in days of time-decayed scoring. Defaults to
+            the configured value, as in RFMAnalysisService.
+
+    Returns:
+        DataFrame indexed by snapshot date (sorted) with one column of
+        customer counts per segment
+    """
+    service = RFMAnalysisService(data, n_tiles=n_tiles, cut_points=cut_points, breakpoints=breakpoints,
+                                 decay_half_life=decay_half_life)
+    half_life = service.decay_half_life
+    service.preprocess_data()
+    lookup, segment_names = service.segment_lookup()
+
+    # Sort once by date; customers are numbered in order of appearance
+    transactions = service.data
+    dates = transactions['transaction_date'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    order = np.argsort(dates, kind='stable')
+    dates = dates[order]
+    customers = pd.factorize(transactions['customer_id'])[0][order]
+    amounts = transactions['transaction_amount'].to_numpy(dtype=np.float64)[order]
+    # Frequency counts transactions with an ID, as calculate_rfm does
+    has_id = transactions['transaction_id'].notna().to_numpy()[order]
+
+    n_customers = int(customers.max()) + 1 if len(customers) else 0
+    frequency = np.zeros(n_customers, dtype=np.int64)
+    monetary = np.zeros(n_customers, dtype=np.float64)
+    last_seen = np.full(n_customers, np.iinfo(np.int64).min, dtype=np.int64)
+    seen = np.zeros(n_customers, dtype=bool)
+    if half_life:
+        decayed_frequency = np.zeros(n_customers, dtype=np.float64)
+        decayed_monetary = np.zeros(n_customers, dtype=np.float64)
+
+    snapshots = pd.DatetimeIndex(sorted(snapshot_dates))
+    bounds = np.searchsorted(dates, snapshots.to_numpy(dtype='datetime64[ns]').view(np.int64), side='right')
+
+    counts = np.zeros((len(snapshots), len(segment_names)), dtype=np.int64)
+    start = 0
+    for i, (snapshot, end) in enumerate(zip(snapshots, bounds)):
+        # Fold the transactions since the previous snapshot into the running state
+        window = slice(start, end)
+        frequency += np.bincount(customers[window], weights=has_id[window], minlength=n_customers).astype(np.int64)
+        monetary += np.bincount(customers[window], weights=amounts[window], minlength=n_customers)
+        # Dates are sorted, so a customer's last transaction in the window is its latest
+        reversed_customers = customers[window][::-1]
+        window_customers, last_index = np.unique(reversed_customers, return_index=True)
+        last_seen[window_customers] = dates[window][::-1][last_index]
+        seen[window_customers] = True
+        if half_life:
+            # Age the running sums to this snapshot, then add the window at its own weights
+            if i > 0:
+                elapsed = decay_weights(snapshots[i - 1:i], snapshot, half_life)[0]
+                decayed_frequency *= elapsed
+                decayed_monetary *= elapsed
+            weights = decay_weights(dates[window].view('datetime64[ns]'), snapshot, half_life)
+            decayed_frequency += np.bincount(customers[window], weights=weights * has_id[window], minlength=n_customers)
+            decayed_monetary += np.bincount(customers[window], weights=weights * amounts[window], minlength=n_customers)
+        start = end
+
+        active = np.flatnonzero(seen)
+        if len(active) == 0:
+            continue
+
+        recency = (snapshot.value - last_seen[active]) // NANOSECONDS_PER_DAY
+        if breakpoints is None:
+            service.breakpoints = None
+        if half_life:
+            scores = service.score_metrics(recency, decayed_frequency[active], decayed_monetary[active])
+        else:
+            scores = service.score_metrics(recency, frequency[active], monetary[active])
+        counts[i] = np.bincount(lookup[scores['rfm_score']], minlength=len(segment_names))
+
+    return pd.DataFrame(counts, index=snapshots.rename('snapshot_date'), columns=segment_names)
@@ -0,0 +1,105 @@
+import pytest
+import pandas as pd
+import numpy as np
+import io
+import sys
+import os
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import analysis routes
+from routes import analysis
+from auth import get_current_user
+from database import get_db, Analysis, User
+
+@pytest.fixture
+def api(db_session, tmp_path, monkeypatch):
+    """Serve the analysis routes from a scratch storage directory, as a signed-in user"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("storage/analysis_history")
+    os.makedirs(analysis.SCORED_CUSTOMERS_DIR)
+
+    user = User(name="Routes User", email="routes@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.commit()
+
+    app = FastAPI()
+    app.include_router(analysis.router)
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": user.id}
+    return TestClient(app)
+
+@pytest.fixture
+def transactions_csv():
+    """CSV upload of 50 customers"""
+    rng = np.random.default_rng(3)
+    n = 500
+    return pd.DataFrame({
+        "customer_id": [f"cust_{i}" for i in rng.integers(0, 50, n)],
+        "transaction_id": [f"tx_{i}" for i in range(n)],
+        "transaction_date": (pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 300, n), unit="D")).strftime("%Y-%m-%d"),
+        "transaction_amount": rng.gamma(2.0, 50.0, n).round(2)
+    }).to_csv(index=False).encode()
+
+def test_upload_survives_preview_failure(api, db_session, transactions_csv, monkeypatch):
+    """Test that a failed preview still returns the recorded analysis"""
+    def fail(*args, **kwargs):
+        raise RuntimeError("preview failed")
+
+    scheduled = []
+    monkeypatch.setattr(analysis, "preview_analysis", fail)
+    monkeypatch.setattr(analysis, "process_rfm_analysis", lambda **kwargs: scheduled.append(kwargs["analysis_id"]))
+
+    response = api.post("/api/analysis/upload", files={"file": ("data.csv", transactions_csv, "text/csv")},
+                        data={"preview": "true"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["preview"] is None
+    assert scheduled == [body["analysis_id"]]
+    assert db_session.query(Analysis).filter(Analysis.analysis_id == body["analysis_id"]).count() == 1
+
+def test_scored_customers_are_not_stored_under_storage(api, transactions_csv, monkeypatch):
+    """Test that scored customers are only downloadable through the authenticated export"""
+    async def insights(summary, usage=None):
+        return "insights"
+
+    monkeypatch.setattr(analysis.OpenAIService, "generate_rfm_insights", insights)
+
+    response = api.post("/api/analysis/upload", files={"file": ("data.csv", transactions_csv, "text/csv")},
+                        data={"preview": "false"})
+    analysis_id = response.json()["analysis_id"]
+
+    assert not any(name.endswith(".parquet") for name in os.listdir("storage/analysis_history"))
+    assert os.listdir(analysis.SCORED_CUSTOMERS_DIR) == [os.path.basename(analysis.scored_customers_path(1, analysis_id))]
+
+    export = api.get(f"/api/analysis/{analysis_id}/customers/export", params={"format": "csv"})
+    assert export.status_code == 200
+    assert len(pd.read_csv(io.BytesIO(export.content))) == 50
+
+def test_legacy_scored_customers_are_moved(api):
+    """Test that scored customers stored under storage/ by earlier versions are moved out of it"""
+    with open("storage/analysis_history/1_old_customers.parquet", "wb") as f:
+        f.write(b"PAR1")
+
+    assert analysis.move_legacy_scored_customers() == 1
+    assert os.listdir("storage/analysis_history") == []
+    assert os.path.exists(analysis.scored_customers_path(1, "old"))
+
+def test_upload_with_trend(api, transactions_csv, monkeypatch):
+    """Test that the stored result has segment counts at every weekly snapshot"""
+    async def insights(summary, usage=None):
+        return "insights"
+
+    monkeypatch.setattr(analysis.OpenAIService, "generate_rfm_insights", insights)
+
+    response = api.post("/api/analysis/upload", files={"file": ("data.csv", transactions_csv, "text/csv")},
+                        data={"preview": "false", "snapshot_weeks": "4"})
+    result = api.get(f"/api/analysis/{response.json()['analysis_id']}").json()
+
+    assert result["status"] == "completed"
+    assert len(result["trend"]["snapshot_dates"]) == 4
+    assert all(len(counts) == 4 for counts in result["trend"]["segment_counts"].values())
@@ -0,0 +1,60 @@
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+import pyarrow.parquet as pq
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import batch scoring
+from batch_scoring import BatchScorer
+from rfm_analysis import analyze_rfm_data
+
+def customers(seed, n):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "customer": [f"cust_{seed}_{i}" for i in range(n)],
+        "last_purchase": (pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 300, n), unit="D")).strftime("%Y-%m-%d"),
+        "orders": rng.integers(1, 20, n),
+        "spent": rng.gamma(2.0, 50.0, n).round(2),
+        "region": "south"
+    })
+
+@pytest.fixture
+def model_path(tmp_path):
+    """Train and save the churn and LTV models of 400 customers"""
+    path = str(tmp_path / "model.joblib")
+    analyze_rfm_data(customers(0, 400), "customer", "last_purchase", "orders", "spent", "ecommerce", model_path=path)
+    return path
+
+def test_chunked_scores_match_one_pass(model_path, tmp_path):
+    """Test that scoring in chunks gives the scores of the whole file at once"""
+    data = customers(1, 1000)
+    input_path = str(tmp_path / "new.csv")
+    data.to_csv(input_path, index=False)
+
+    stats = BatchScorer.from_path(model_path, chunk_size=128).score_file(input_path, str(tmp_path / "out" / "scores.parquet"))
+    scored = pq.read_table(stats["output_file"]).to_pandas()
+    expected = BatchScorer.from_path(model_path).score_chunk(pd.read_csv(input_path, usecols=["customer", "last_purchase", "orders", "spent"]))
+
+    assert stats["rows"] == 1000 and stats["chunk_size"] == 128
+    assert scored["customer"].tolist() == data["customer"].tolist()
+    assert scored["churn_probability"].between(0, 1).all()
+    assert scored["predicted_ltv"].dtype == np.float64
+    np.testing.assert_allclose(scored["churn_probability"], expected["churn_probability"], atol=1e-6)
+    np.testing.assert_allclose(scored["predicted_ltv"], expected["predicted_ltv"], rtol=1e-6)
+
+def test_empty_file_writes_empty_scores(model_path, tmp_path):
+    """Test that a file without customers still produces the output file the caller is told about"""
+    input_path = str(tmp_path / "empty.csv")
+    customers(2, 0).to_csv(input_path, index=False)
+
+    scorer = BatchScorer.from_path(model_path)
+    stats = scorer.score_file(input_path, str(tmp_path / "scores.parquet"))
+
+    table = pq.read_table(stats["output_file"])
+    assert stats["rows"] == 0
+    assert table.num_rows == 0
+    assert table.schema.equals(scorer.output_schema())
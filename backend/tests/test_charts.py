@@ -0,0 +1,83 @@
+import pytest
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import chart payloads
+from charts import CHART_NAMES, load_chart_payload, write_chart_payloads, _load_chart_payloads
+from rfm_analysis import RFMAnalysis, build_chart_payloads, summarize_distribution
+import serialization
+
+@pytest.fixture
+def rfm():
+    """Segmented analysis of 2,000 customers"""
+    rng = np.random.default_rng(7)
+    n = 2000
+    data = pd.DataFrame({
+        "customer_id": [f"c{i}" for i in range(n)],
+        "last_purchase": pd.Timestamp("2024-01-01") - pd.to_timedelta(rng.integers(0, 400, n), unit="D"),
+        "orders": rng.integers(1, 30, n),
+        "spent": rng.gamma(2, 100, n)
+    })
+    analysis = RFMAnalysis(data, "customer_id", "last_purchase", "orders", "spent", "ecommerce")
+    analysis.segment_customers()
+    return analysis
+
+def test_chart_data_from_segment_summary(rfm):
+    """Test that segment counts, statistics and chart data agree with the customers"""
+    segments = rfm.rfm_segments
+    counts = segments["segment"].value_counts()
+
+    assert rfm.get_segment_counts() == counts.to_dict()
+    assert [row["segment"] for row in rfm.get_polar_area_data()] == list(rfm.get_segment_counts())
+
+    treemap = rfm.get_treemap_data()
+    assert [row["segment"] for row in treemap] == sorted(counts.index)
+    for row in treemap:
+        members = segments[segments["segment"] == row["segment"]]
+        assert row["customer_count"] == len(members)
+        assert row["total_value"] == pytest.approx(members["spent"].sum())
+    assert sum(row["customer_count"] for row in treemap) == len(segments)
+
+    stats = rfm.get_segment_stats()
+    members = segments[segments["segment"] == "Campeões"]
+    assert stats["Campeões"]["count"] == len(members)
+    assert stats["Campeões"]["avg_recency"] == pytest.approx(members["recency_days"].mean())
+
+def test_chart_payloads_are_cached(rfm, tmp_path):
+    """Test storing chart payloads and serving them from the cache"""
+    distribution = summarize_distribution(np.linspace(0, 1, 100), value_range=(0.0, 1.0))
+    payloads = build_chart_payloads(rfm, {"distribution": distribution}, {"distribution": distribution})
+    assert set(payloads) == set(CHART_NAMES)
+
+    path = str(tmp_path / "charts.json")
+    write_chart_payloads(payloads, path)
+
+    _load_chart_payloads.cache_clear()
+    assert serialization.loads(load_chart_payload(path)) == serialization.loads(serialization.dumps(payloads))
+    assert serialization.loads(load_chart_payload(path, "polar_area")) == rfm.get_polar_area_data()
+    assert _load_chart_payloads.cache_info().hits == 1
+
+    with pytest.raises(KeyError):
+        load_chart_payload(path, "unknown")
+    with pytest.raises(FileNotFoundError):
+        load_chart_payload(str(tmp_path / "missing.json"))
+
+def test_summarize_distribution():
+    """Test the histogram and quantiles of a prediction, ignoring missing values"""
+    values = pd.Series(np.concatenate([np.linspace(0, 1, 101), [np.nan, np.nan]]))
+
+    summary = summarize_distribution(values, bins=10, value_range=(0.0, 1.0))
+
+    assert summary["count"] == 101
+    assert summary["mean"] == pytest.approx(0.5)
+    assert summary["quantiles"] == pytest.approx({"p05": 0.05, "p25": 0.25, "p50": 0.5, "p75": 0.75, "p95": 0.95})
+    assert summary["histogram"]["bin_edges"] == pytest.approx(np.linspace(0, 1, 11).tolist())
+    assert sum(summary["histogram"]["counts"]) == 101
+
+    empty = summarize_distribution(pd.Series([np.nan]))
+    assert empty == {"count": 0, "mean": None, "quantiles": {}, "histogram": {"bin_edges": [], "counts": []}}
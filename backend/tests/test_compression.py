@@ -0,0 +1,110 @@
+import pytest
+import sys
+import os
+import zstandard
+import anyio
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import compression
+from compression import CompressionMiddleware, negotiate_encoding
+import serialization
+
+PAYLOAD = {"treemap": [{"segment": f"Segmento {i % 11}", "count": i, "percentage": i / 7} for i in range(5000)]}
+
+@pytest.fixture
+def client():
+    """App with large, small, streamed and binary responses"""
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, threadpool_min_size=64 * 1024)
+
+    @app.get("/large")
+    async def large():
+        return Response(serialization.dumps(PAYLOAD), media_type="application/json", headers={"ETag": '"v1"'})
+
+    @app.get("/small")
+    async def small():
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse((f"{i},{i * 2}\n".encode() for i in range(100000)), media_type="text/csv")
+
+    @app.get("/parquet-stream")
+    async def parquet_stream():
+        return StreamingResponse((b"PAR1" * 1000 for _ in range(3)), media_type="application/vnd.apache.parquet")
+
+    @app.get("/parquet")
+    async def parquet():
+        return Response(b"PAR1" * 1000, media_type="application/vnd.apache.parquet")
+
+    return TestClient(app)
+
+def test_negotiate_encoding():
+    """Test Accept-Encoding negotiation"""
+    encodings = ["zstd", "br", "gzip"]
+    assert negotiate_encoding("gzip, deflate, br", encodings) == "br"
+    assert negotiate_encoding("gzip;q=1.0, br;q=0.5", encodings) == "gzip"
+    assert negotiate_encoding("br;q=0, *", encodings) == "zstd"
+    assert negotiate_encoding("identity", encodings) is None
+    assert negotiate_encoding(None, encodings) is None
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_large_responses_are_compressed(client, encoding):
+    """Test that large responses are compressed with the negotiated encoding"""
+    response = client.get("/large", headers={"Accept-Encoding": encoding})
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["etag"] == 'W/"v1"'
+    assert "accept-encoding" in response.headers["vary"].lower()
+
+    body = response.content
+    if encoding == "zstd":
+        # httpx does not decode zstd
+        body = zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    assert serialization.loads(body) == PAYLOAD
+    assert int(response.headers["content-length"]) < len(serialization.dumps(PAYLOAD)) / 5
+
+def test_streamed_responses_are_compressed(client):
+    """Test that streamed bodies are compressed as they are sent"""
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text.splitlines()[-1] == "99999,199998"
+
+def test_responses_left_uncompressed(client):
+    """Test that small, binary and non-negotiated responses are sent as they are"""
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/parquet", headers={"Accept-Encoding": "gzip"}).headers
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == '"v1"'
+
+def test_streamed_passthrough_starts_once(client):
+    """Test that a streamed response left uncompressed is started once, with every chunk"""
+    messages = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # No disconnect; the response ends the wait
+        await anyio.sleep_forever()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "method": "GET", "path": "/parquet-stream", "raw_path": b"/parquet-stream",
+        "query_string": b"", "root_path": "", "scheme": "http", "server": ("testserver", 80),
+        "headers": [(b"accept-encoding", b"gzip")], "http_version": "1.1", "client": ("testclient", 50000)
+    }
+    anyio.run(client.app, scope, receive, send)
+
+    assert [message["type"] for message in messages].count("http.response.start") == 1
+    assert b"".join(message.get("body", b"") for message in messages) == b"PAR1" * 3000
+    response = client.get("/parquet-stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
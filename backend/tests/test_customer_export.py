@@ -0,0 +1,133 @@
+import pytest
+import pandas as pd
+import numpy as np
+import io
+import sys
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import customer export
+import customer_store
+from customer_store import export_customer_table, segment_filter, write_scored_customers
+from rfm_service import RFMAnalysisService
+
+@pytest.fixture
+def scored(tmp_path, monkeypatch):
+    """Store the scored customers of 5,000 customers in small row groups and export batches"""
+    monkeypatch.setitem(customer_store.CUSTOMER_STORE_CONFIG, "row_group_size", 1000)
+    monkeypatch.setitem(customer_store.CUSTOMER_STORE_CONFIG, "export_batch_size", 700)
+    rng = np.random.default_rng(5)
+    n = 40000
+    service = RFMAnalysisService(pd.DataFrame({
+        "customer_id": [f"cust_{i}" for i in rng.integers(0, 5000, n)],
+        "transaction_id": np.arange(n).astype(str),
+        "transaction_date": pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 365 * 86400, n), unit="s"),
+        "transaction_amount": rng.gamma(2.0, 50.0, n)
+    }))
+    service.perform_full_analysis(pd.Timestamp("2024-01-01"))
+    path = str(tmp_path / "customers.parquet")
+    write_scored_customers(service.segmented_df, path)
+    return path, pq.read_table(path).to_pandas(ignore_metadata=True)
+
+@pytest.mark.parametrize("export_format", ["arrow", "parquet", "csv"])
+def test_export_formats(scored, export_format):
+    """Test that every format streams the selected columns of the selected segments"""
+    path, customers = scored
+    segments = ["Campeões", "Clientes em Risco"]
+    chunks = list(export_customer_table(path, export_format, ["customer_id", "segment", "monetary"], segment_filter(segments)))
+    assert len(chunks) > 2
+    data = b"".join(chunks)
+
+    if export_format == "arrow":
+        exported = pa.ipc.open_stream(data).read_pandas()
+    elif export_format == "parquet":
+        parquet_file = pq.ParquetFile(io.BytesIO(data))
+        # Filtered batches are combined into full row groups
+        assert parquet_file.metadata.row_group(0).num_rows >= 700
+        exported = parquet_file.read().to_pandas()
+    else:
+        exported = pd.read_csv(io.BytesIO(data))
+
+    expected = customers[customers["segment"].isin(segments)][["customer_id", "segment", "monetary"]]
+    assert list(exported.columns) == ["customer_id", "segment", "monetary"]
+    assert exported["customer_id"].tolist() == expected["customer_id"].tolist()
+    assert exported["segment"].astype(str).tolist() == expected["segment"].astype(str).tolist()
+    np.testing.assert_allclose(exported["monetary"], expected["monetary"])
+
+def test_export_all_and_errors(scored, tmp_path):
+    """Test exporting the whole table and rejecting bad requests before streaming"""
+    path, customers = scored
+    exported = pa.ipc.open_stream(b"".join(export_customer_table(path, "arrow"))).read_all()
+    assert exported.num_rows == len(customers)
+    assert exported.schema.names == list(customers.columns)
+
+    with pytest.raises(ValueError):
+        export_customer_table(path, "xlsx")
+    with pytest.raises(ValueError):
+        export_customer_table(path, "csv", ["customer_id", "email"])
+    with pytest.raises(FileNotFoundError):
+        export_customer_table(str(tmp_path / "missing.parquet"), "csv")
+
+@pytest.fixture
+def predictions(tmp_path):
+    """Store a per-customer prediction table of 20,000 customers"""
+    rng = np.random.default_rng(9)
+    n = 20000
+    customers = pd.DataFrame({
+        "customer_id": [f"cust_{i}" for i in range(n)],
+        "segment": rng.choice(["Campeões", "Clientes em Risco", "Clientes Perdidos"], n),
+        "churn_probability": rng.random(n),
+        "ltv_segment": pd.Categorical(rng.choice(["Low", "Medium", "High", "Very High"], n)),
+        "upsell_potential": rng.random(n) < 0.3
+    })
+    path = str(tmp_path / "predictions.parquet")
+    customer_store.write_customer_table(customers, path)
+    return path, customers
+
+def test_prediction_filter_export(predictions):
+    """Test exporting a campaign list filtered on segment and predictions"""
+    path, customers = predictions
+    row_filter = customer_store.prediction_filter(segments=["Clientes em Risco"], churn_above=0.5,
+                                                  ltv_segments=["High", "Very High"], upsell=False)
+    exported = pd.read_csv(io.BytesIO(b"".join(export_customer_table(path, "csv", ["customer_id", "churn_probability"], row_filter))))
+
+    expected = customers[
+        (customers["segment"] == "Clientes em Risco") & (customers["churn_probability"] > 0.5)
+        & customers["ltv_segment"].isin(["High", "Very High"]) & ~customers["upsell_potential"]
+    ]
+    assert exported["customer_id"].tolist() == expected["customer_id"].tolist()
+    assert customer_store.prediction_filter() is None
+
+    # Tables without predictions are rejected before streaming
+    with pytest.raises(ValueError):
+        export_customer_table(path, "csv", row_filter=customer_store.prediction_filter(crosssell=True))
+
+@pytest.mark.parametrize("offset,limit", [(0, 500), (950, 100), (19900, 500), (25000, 10)])
+def test_read_customer_page(predictions, monkeypatch, offset, limit):
+    """Test that pages across row group boundaries return the requested customers in order"""
+    path, customers = predictions
+    monkeypatch.setitem(customer_store.CUSTOMER_STORE_CONFIG, "row_group_size", 1000)
+    customer_store.write_customer_table(customers, path)
+
+    page = customer_store.read_customer_page(path, offset, limit)
+
+    expected = customers["customer_id"].iloc[offset:offset + limit].tolist()
+    assert page["total"] == len(customers)
+    assert [row["customer_id"] for row in page["customers"]] == expected
+    assert page["next_offset"] == (offset + limit if offset + limit < len(customers) else None)
+
+def test_read_customer_page_limits(predictions, monkeypatch, tmp_path):
+    """Test that page sizes are capped and missing tables rejected"""
+    path, _ = predictions
+    monkeypatch.setitem(customer_store.CUSTOMER_STORE_CONFIG, "max_page_size", 50)
+
+    page = customer_store.read_customer_page(path, -5, 1000)
+    assert page["offset"] == 0 and page["limit"] == 50 and len(page["customers"]) == 50
+    assert customer_store.read_customer_page(path, 0, -1)["customers"] == []
+
+    with pytest.raises(FileNotFoundError):
+        customer_store.read_customer_page(str(tmp_path / "missing.parquet"))
@@ -0,0 +1,89 @@
+import pytest
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import distributed analysis
+from distributed import run_local_analysis, aggregate_states, merge_states, owner_of, serve_worker
+import distributed
+from ingestion import read_files, TRANSACTION_SCHEMA
+from rfm_service import RFMAnalysisService
+
+ANALYSIS_DATE = datetime(2024, 6, 1, 12, 0)
+
+@pytest.fixture
+def transaction_files(tmp_path):
+    """Write 5 transaction files whose customers overlap across files"""
+    rng = np.random.default_rng(21)
+    paths = []
+    for i in range(5):
+        n = 600
+        df = pd.DataFrame({
+            "customer_id": [f"cust_{c}" for c in rng.integers(0, 200, n)],
+            "transaction_id": [f"tx_{i}_{j}" for j in range(n)],
+            "transaction_date": (pd.Timestamp("2023-06-01") + pd.to_timedelta(rng.integers(0, 360, n), unit="D")).strftime("%Y-%m-%d"),
+            "transaction_amount": rng.gamma(2.0, 50.0, n).round(2)
+        })
+        path = tmp_path / f"transactions_{i}.csv"
+        df.to_csv(path, index=False)
+        paths.append(str(path))
+    return paths
+
+def test_states_merge_like_a_single_groupby():
+    """Test that merging partial states equals aggregating everything at once"""
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        "customer_id": rng.integers(0, 50, 1000).astype(str),
+        "transaction_id": np.arange(1000).astype(str),
+        "transaction_date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 100, 1000), unit="D"),
+        "transaction_amount": rng.random(1000)
+    })
+    merged = merge_states([aggregate_states(part) for part in np.array_split(data, 4)])
+
+    pd.testing.assert_frame_equal(merged, aggregate_states(data))
+
+def test_owner_is_stable():
+    """Test that a customer is routed to the same owner from any worker"""
+    ids = pd.Series([f"cust_{i}" for i in range(100)])
+    np.testing.assert_array_equal(owner_of(ids, 3), owner_of(ids.iloc[::-1], 3)[::-1])
+    assert set(owner_of(ids, 3)) == {0, 1, 2}
+
+def test_distributed_matches_single_process(transaction_files):
+    """Test the coordinator/worker path against the single-process analysis"""
+    summary = run_local_analysis(transaction_files, n_workers=3, analysis_date=ANALYSIS_DATE)
+
+    data, _ = read_files([(path, os.path.basename(path)) for path in transaction_files], 1, TRANSACTION_SCHEMA)
+    expected = RFMAnalysisService(data).perform_full_analysis(ANALYSIS_DATE)
+
+    assert summary["total_customers"] == expected["total_customers"]
+    assert summary["total_revenue"] == pytest.approx(expected["total_revenue"], rel=1e-5)
+    assert summary["average_recency"] == pytest.approx(expected["average_recency"])
+    # 200 customers fit in the sketches uncompacted, so breakpoints are exact
+    for metric, breakpoints in expected["scoring"]["breakpoints"].items():
+        np.testing.assert_allclose(summary["scoring"]["breakpoints"][metric], breakpoints, rtol=1e-5)
+
+    assert summary["score_cells"]["codes"] == expected["score_cells"]["codes"]
+    assert summary["score_cells"]["count"] == expected["score_cells"]["count"]
+    assert set(summary["segment_distribution"]) == set(expected["segment_distribution"])
+    for segment, values in expected["segment_distribution"].items():
+        assert summary["segment_distribution"][segment]["count"] == values["count"]
+        assert summary["segment_distribution"][segment]["avg_monetary"] == pytest.approx(values["avg_monetary"], rel=1e-5)
+
+def test_more_workers_than_files(transaction_files):
+    """Test that idle workers do not change the result"""
+    summary = run_local_analysis(transaction_files[:1], n_workers=3, analysis_date=ANALYSIS_DATE)
+
+    assert summary["total_customers"] > 0
+    assert sum(s["count"] for s in summary["segment_distribution"].values()) == summary["total_customers"]
+
+def test_worker_requires_authkey(monkeypatch):
+    """Test that a worker refuses to listen without an explicit authkey"""
+    monkeypatch.setitem(distributed.DISTRIBUTED_CONFIG, "authkey", None)
+
+    with pytest.raises(ValueError, match="authkey"):
+        serve_worker(("127.0.0.1", 0))
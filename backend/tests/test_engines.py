@@ -0,0 +1,90 @@
+import pytest
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import engines
+from engines import get_engine, PandasEngine
+from rfm_service import RFMAnalysisService
+
+pytest.importorskip("polars")
+
+ANALYSIS_DATE = datetime(2024, 6, 1, 12, 0)
+
+@pytest.fixture
+def raw_transactions():
+    """Create untyped transactions with missing values and refunds, as read from a CSV"""
+    rng = np.random.default_rng(5)
+    n = 30000
+    customer_ids = np.array([f"cust_{i}" for i in rng.integers(0, 3000, n)], dtype=object)
+    customer_ids[rng.random(n) < 0.001] = None
+    transaction_ids = np.arange(n).astype(str).astype(object)
+    transaction_ids[rng.random(n) < 0.01] = None
+    dates = (pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 500 * 86400, n), unit="s")).strftime("%Y-%m-%d %H:%M:%S")
+    return pd.DataFrame({
+        "customer_id": customer_ids,
+        "transaction_id": transaction_ids,
+        "transaction_date": dates,
+        "transaction_amount": (rng.gamma(2.0, 50.0, n) - 5).round(2).astype(str)
+    })
+
+def test_unknown_engine():
+    """Test that unknown engines are rejected"""
+    assert isinstance(get_engine("pandas"), PandasEngine)
+    with pytest.raises(ValueError):
+        get_engine("spark")
+
+@pytest.mark.parametrize("categorical_ids", [False, True])
+@pytest.mark.parametrize("n_tiles", [4, 10])
+def test_engines_produce_identical_results(raw_transactions, categorical_ids, n_tiles):
+    """Test that the polars engine gives the same summary and customers as pandas"""
+    if categorical_ids:
+        raw_transactions["customer_id"] = raw_transactions["customer_id"].astype("category")
+
+    pandas_service = RFMAnalysisService(raw_transactions.copy(), n_tiles=n_tiles, engine="pandas")
+    polars_service = RFMAnalysisService(raw_transactions.copy(), n_tiles=n_tiles, engine="polars")
+    expected = pandas_service.perform_full_analysis(ANALYSIS_DATE)
+    summary = polars_service.perform_full_analysis(ANALYSIS_DATE)
+
+    assert summary["total_customers"] == expected["total_customers"]
+    assert summary["scoring"]["n_tiles"] == expected["scoring"]["n_tiles"]
+    for metric, breakpoints in expected["scoring"]["breakpoints"].items():
+        np.testing.assert_allclose(summary["scoring"]["breakpoints"][metric], breakpoints)
+    for key in ["total_revenue", "average_recency", "average_frequency", "average_monetary"]:
+        assert summary[key] == pytest.approx(expected[key])
+
+    assert list(summary["segment_distribution"]) == list(expected["segment_distribution"])
+    for segment, values in expected["segment_distribution"].items():
+        assert summary["segment_distribution"][segment] == pytest.approx(values)
+
+    # Per-customer results match too, and the rest of the service API keeps working
+    expected_customers = pandas_service.segmented_df.set_axis(pandas_service.segmented_df.index.astype(str)).sort_index()
+    customers = polars_service.segmented_df.sort_index()
+    pd.testing.assert_frame_equal(customers[expected_customers.columns], expected_customers, check_index_type=False)
+
+    customer_id = customers.index[0]
+    assert polars_service.get_customer_data(customer_id)["segment"] == customers.loc[customer_id, "segment"]
+
+def test_engines_match_with_time_decay(raw_transactions):
+    """Test that both engines compute the same time-decayed metrics, cohorts and scores"""
+    pandas_service = RFMAnalysisService(raw_transactions.copy(), engine="pandas", decay_half_life=60)
+    polars_service = RFMAnalysisService(raw_transactions.copy(), engine="polars", decay_half_life=60)
+    expected = pandas_service.perform_full_analysis(ANALYSIS_DATE)
+    summary = polars_service.perform_full_analysis(ANALYSIS_DATE)
+
+    for metric, breakpoints in expected["scoring"]["breakpoints"].items():
+        np.testing.assert_allclose(summary["scoring"]["breakpoints"][metric], breakpoints)
+    assert summary["cohorts"] == expected["cohorts"]
+
+    expected_customers = pandas_service.segmented_df.sort_index()
+    customers = polars_service.segmented_df.sort_index()
+    for column in ["decayed_frequency", "decayed_monetary"]:
+        np.testing.assert_allclose(customers[column], expected_customers[column])
+    assert (customers["cohort"].to_numpy() == expected_customers["cohort"].to_numpy()).all()
+    assert (customers["rfm_score"].to_numpy() == expected_customers["rfm_score"].to_numpy()).all()
+
@@ -0,0 +1,106 @@
+import pytest
+from datetime import datetime, timedelta
+import sys
+import os
+from sqlalchemy import text
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import history
+from history import keyset_page, record_analysis, list_analyses, get_analysis, import_history_files
+from database import Analysis, User
+import serialization
+
+@pytest.fixture
+def analyses(db_session):
+    """Create 1,000 analyses of one user, many sharing a date, and some of another user"""
+    users = [User(name=f"User {i}", email=f"user{i}@example.com", password_hash="x") for i in range(2)]
+    db_session.add_all(users)
+    db_session.commit()
+
+    start = datetime(2024, 1, 1)
+    db_session.add_all(
+        Analysis(analysis_id=f"a{i}", user_id=users[0].id, date_created=start + timedelta(hours=i // 3))
+        for i in range(1000)
+    )
+    db_session.add_all(
+        Analysis(analysis_id=f"b{i}", user_id=users[1].id, date_created=start + timedelta(hours=i))
+        for i in range(50)
+    )
+    db_session.commit()
+    return users[0].id
+
+def history_query(db_session, user_id):
+    return db_session.query(Analysis.id, Analysis.analysis_id, Analysis.date_created).filter(Analysis.user_id == user_id)
+
+def test_keyset_pages_cover_history_in_order(db_session, analyses):
+    """Test that following cursors lists every analysis of the user once, newest first"""
+    rows, cursor = keyset_page(history_query(db_session, analyses), Analysis.date_created, Analysis.id, limit=64)
+    pages = [rows]
+    while cursor is not None:
+        rows, cursor = keyset_page(history_query(db_session, analyses), Analysis.date_created, Analysis.id, cursor, limit=64)
+        pages.append(rows)
+
+    listed = [row for page in pages for row in page]
+    assert len(pages) == 16
+    assert [row.analysis_id for row in listed] == [
+        row.analysis_id for row in history_query(db_session, analyses).order_by(Analysis.date_created.desc(), Analysis.id.desc())
+    ]
+    assert len({row.analysis_id for row in listed}) == 1000
+
+def test_history_page_uses_composite_index(db_session, analyses):
+    """Test that a page is read from the (user_id, date_created) index without sorting"""
+    query = history_query(db_session, analyses).order_by(Analysis.date_created.desc(), Analysis.id.desc()).limit(10)
+    statement = query.statement.compile(db_session.get_bind(), compile_kwargs={"literal_binds": True})
+
+    plan = " ".join(row[-1] for row in db_session.execute(text(f"EXPLAIN QUERY PLAN {statement}")))
+    assert "idx_analyses_user_date" in plan
+    assert "TEMP B-TREE" not in plan
+
+def test_invalid_cursor(db_session, analyses):
+    """Test that malformed cursors are rejected"""
+    with pytest.raises(ValueError):
+        keyset_page(history_query(db_session, analyses), Analysis.date_created, Analysis.id, "not-a-cursor")
+
+def test_analysis_metadata_table(db_session, tmp_path):
+    """Test storing, listing and importing analysis history entries"""
+    for i in range(3):
+        record_analysis(db_session, {
+            "filename": f"file{i}.csv",
+            "analysis_key": f"2024010{i}_120000",
+            "timestamp": datetime(2024, 1, 1 + i, 12).isoformat(),
+            "segment_type": "ecommerce",
+            "record_count": 10 * i,
+            "summary": {"segment_counts": {"Campeões": i}, "total_customers": i}
+        })
+
+    page = list_analyses(db_session, limit=2)
+    assert [entry["analysis_key"] for entry in page["history"]] == ["20240102_120000", "20240101_120000"]
+    assert "summary" not in page["history"][0]
+    page = list_analyses(db_session, cursor=page["next_cursor"], limit=2)
+    assert [entry["filename"] for entry in page["history"]] == ["file0.csv"]
+    assert page["next_cursor"] is None
+
+    assert get_analysis(db_session, "20240101_120000")["summary"]["total_customers"] == 1
+    assert get_analysis(db_session, "unknown") is None
+
+    # Entries written as files by earlier versions are imported once
+    serialization.dump({
+        "filename": "old.csv",
+        "analysis_key": "20230101_000000",
+        "timestamp": datetime(2023, 1, 1).isoformat(),
+        "record_count": 5
+    }, str(tmp_path / "20230101_000000_meta.json"))
+    # Entries of the first version have no key; it is taken from the file name
+    serialization.dump({
+        "filename": "oldest.csv",
+        "timestamp": datetime(2022, 1, 1).isoformat(),
+        "segment_type": "rfm",
+        "record_count": 3,
+        "summary": {"segment_counts": {"Campeões": 3}, "total_customers": 3}
+    }, str(tmp_path / "20220101_000000_meta.json"))
+    assert import_history_files(db_session, str(tmp_path)) == 2
+    assert import_history_files(db_session, str(tmp_path)) == 0
+    assert [entry["filename"] for entry in list_analyses(db_session)["history"][-2:]] == ["old.csv", "oldest.csv"]
+    assert get_analysis(db_session, "20220101_000000")["summary"]["total_customers"] == 3
@@ -0,0 +1,94 @@
+import pytest
+import sys
+import os
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import HTTP caching
+from http_cache import CachedStaticFiles, RangeNotSatisfiable, etag_matches, file_response, parse_range, static_cache_control
+import serialization
+
+@pytest.fixture
+def client(tmp_path):
+    """App serving tmp_path as storage and one file through file_response"""
+    (tmp_path / "scores.parquet").write_bytes(bytes(range(256)) * 1000)
+    serialization.dump({"status": "preview"}, str(tmp_path / "result.json"))
+
+    app = FastAPI()
+
+    @app.get("/result")
+    async def result(request: Request):
+        path = str(tmp_path / "result.json")
+        stat_result = os.stat(path)
+        return file_response(request, path, "application/json", static_cache_control(path), stat_result)
+
+    app.mount("/storage", CachedStaticFiles(directory=str(tmp_path)), name="storage")
+    return TestClient(app)
+
+def test_parse_range():
+    """Test byte range parsing"""
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("bytes=a-b", 100) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=100-", 100)
+
+def test_etag_matches():
+    """Test If-None-Match comparison"""
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches('*', '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
+
+def test_conditional_get_of_changing_result(client, tmp_path):
+    """Test that polling a result costs a 304 until it changes, and that completed results are cached"""
+    response = client.get("/result")
+    assert response.status_code == 200
+    assert response.json() == {"status": "preview"}
+    assert response.headers["cache-control"] == "private, no-cache"
+    etag = response.headers["etag"]
+
+    response = client.get("/result", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    serialization.dump({"status": "completed", "summary": {}}, str(tmp_path / "result.json"))
+    response = client.get("/result", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["status"] == "completed"
+    # Completed results may still be rewritten by regenerated insights
+    assert response.headers["cache-control"] == "private, no-cache"
+
+def test_static_files_ranges(client, tmp_path):
+    """Test static storage cache policy and byte ranges"""
+    content = (tmp_path / "scores.parquet").read_bytes()
+
+    response = client.get("/storage/scores.parquet")
+    assert response.status_code == 200
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["accept-ranges"] == "bytes"
+    etag = response.headers["etag"]
+    assert client.get("/storage/scores.parquet", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/storage/result.json").headers["cache-control"] == "private, no-cache"
+
+    response = client.get("/storage/scores.parquet", headers={"Range": "bytes=1000-70999"})
+    assert response.status_code == 206
+    assert response.content == content[1000:71000]
+    assert response.headers["content-range"] == f"bytes 1000-70999/{len(content)}"
+
+    # A range of an older version gets the whole current file
+    response = client.get("/storage/scores.parquet", headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+    assert response.status_code == 200
+    assert response.content == content
+
+    response = client.get("/storage/scores.parquet", headers={"Range": f"bytes={len(content)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(content)}"
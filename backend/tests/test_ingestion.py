@@ -0,0 +1,147 @@
+import pytest
+import pandas as pd
+import numpy as np
+import gzip
+import zipfile
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import ingestion
+import ingestion
+from ingestion import plan_parts, parse_part, read_files, customer_schema, TRANSACTION_SCHEMA, MissingColumnsError
+
+def transactions(seed, n=200):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "customer_id": [f"cust_{seed}_{i}" for i in rng.integers(0, 40, n)],
+        "transaction_id": [f"tx_{seed}_{i}" for i in range(n)],
+        "transaction_date": (pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 300, n), unit="D")).strftime("%Y-%m-%d"),
+        "transaction_amount": rng.gamma(2.0, 50.0, n).round(2),
+        "store": "online"
+    })
+
+@pytest.fixture
+def upload_files(tmp_path):
+    """A CSV, a gzip CSV, a two-sheet workbook and a zip of two CSVs, with different customers each"""
+    frames = [transactions(seed) for seed in range(7)]
+
+    csv_path = tmp_path / "a.csv"
+    frames[0].to_csv(csv_path, index=False)
+
+    gz_path = tmp_path / "b.csv.gz"
+    with gzip.open(gz_path, "wt") as f:
+        frames[1].to_csv(f, index=False)
+
+    excel_path = tmp_path / "c.xlsx"
+    with pd.ExcelWriter(excel_path) as writer:
+        frames[2].to_excel(writer, sheet_name="jan", index=False)
+        frames[3].to_excel(writer, sheet_name="feb", index=False)
+
+    zip_path = tmp_path / "d.zip"
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        archive.writestr("d1.csv", frames[4].to_csv(index=False))
+        archive.writestr("nested/d2.csv", frames[5].to_csv(index=False))
+        archive.writestr("readme.txt", "not data")
+
+    files = [(str(path), path.name) for path in (csv_path, gz_path, excel_path, zip_path)]
+    return files, pd.concat(frames[:6], ignore_index=True)
+
+def test_plan_parts(upload_files):
+    """Test that workbooks are split by sheet and archives by CSV member"""
+    files, _ = upload_files
+    kinds = [[(part["kind"], part.get("sheet") or part.get("member")) for part in plan_parts(path, name)] for path, name in files]
+
+    assert kinds == [
+        [("csv", None)],
+        [("csv", None)],
+        [("excel", "jan"), ("excel", "feb")],
+        [("zip", "d1.csv"), ("zip", "nested/d2.csv")]
+    ]
+    with pytest.raises(ValueError):
+        plan_parts(files[0][0], "data.json")
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_read_files_with_schema(upload_files, max_workers):
+    """Test that every part is read, typed and concatenated with shared categories"""
+    files, expected = upload_files
+    df, report = read_files(files, max_workers, TRANSACTION_SCHEMA)
+
+    assert list(df.columns) == list(TRANSACTION_SCHEMA)
+    assert report["parts"] == 6 and report["rows"] == len(expected)
+    assert df["customer_id"].dtype == "category"
+    assert set(df["customer_id"].cat.categories) == set(expected["customer_id"])
+    assert df["customer_id"].astype(str).tolist() == expected["customer_id"].tolist()
+    assert df["transaction_date"].dtype == "datetime64[ns]"
+    assert df["transaction_amount"].dtype == "float64"
+    np.testing.assert_array_equal(df["transaction_amount"], expected["transaction_amount"])
+
+def test_process_pool_is_shared(upload_files):
+    """Test that reads reuse one pool of worker processes"""
+    files, _ = upload_files
+    read_files(files, 3, TRANSACTION_SCHEMA)
+    pool = ingestion._process_pool()
+    read_files(files, 3, TRANSACTION_SCHEMA)
+
+    assert ingestion._process_pool() is pool
+
+def test_money_keeps_cents(tmp_path):
+    """Test that large amounts are not rounded by the schema"""
+    path = tmp_path / "customers.csv"
+    pd.DataFrame({
+        "id": ["a", "b"], "last": ["2024-01-01", "2024-01-02"], "orders": [1, 2], "spent": [123456.78, 9876543.21]
+    }).to_csv(path, index=False)
+
+    df, _ = read_files([(str(path), "customers.csv")], 1, customer_schema("id", "last", "orders", "spent"))
+
+    assert df["spent"].tolist() == [123456.78, 9876543.21]
+
+def test_non_numeric_amounts_are_coerced(tmp_path):
+    """Test that text in a numeric column becomes NaN instead of failing the read"""
+    path = tmp_path / "dirty.csv"
+    data = transactions(0, 5)
+    data["transaction_amount"] = ["1.5", "n/a", "3", "", "4.25"]
+    data.to_csv(path, index=False)
+
+    df = parse_part(plan_parts(str(path), "dirty.csv")[0], TRANSACTION_SCHEMA)
+
+    np.testing.assert_array_equal(df["transaction_amount"], [1.5, np.nan, 3.0, np.nan, 4.25])
+
+def test_missing_columns(tmp_path):
+    """Test that files without the schema columns are rejected with the missing names"""
+    path = tmp_path / "partial.csv"
+    transactions(0, 5).drop(columns=["transaction_amount"]).to_csv(path, index=False)
+
+    with pytest.raises(MissingColumnsError) as error:
+        read_files([(str(path), "partial.csv")], 1, TRANSACTION_SCHEMA)
+    assert error.value.missing == ["transaction_amount"]
+
+def test_dates_not_matching_the_inferred_format(tmp_path):
+    """Test that dates in another format than the sample are parsed, and unparseable ones reported"""
+    path = tmp_path / "dates.csv"
+    data = transactions(0, 1500)
+    dates = data["transaction_date"].tolist()
+    # The sample only holds plain dates; later rows carry times, a blank and garbage
+    dates[1200] = "2024-03-05 10:30:00"
+    dates[1300] = "2024-03-06T08:00:00"
+    dates[1400] = ""
+    dates[1499] = "not a date"
+    data["transaction_date"] = dates
+    data.to_csv(path, index=False)
+
+    df, report = read_files([(str(path), "dates.csv")], 1, TRANSACTION_SCHEMA)
+
+    assert df["transaction_date"][1200] == pd.Timestamp("2024-03-05 10:30:00")
+    assert df["transaction_date"][1300] == pd.Timestamp("2024-03-06 08:00:00")
+    assert df["transaction_date"][[1400, 1499]].isna().all()
+    assert report["missing_dates"] == {"transaction_date": 2}
+
+def test_day_first_fallback():
+    """Test that dates re-parsed in a day-first file stay day first"""
+    values = pd.Series(["31/01/2024"] * 10 + ["05/02/2024 14:00"])
+
+    dates = ingestion.parse_dates(values, "%d/%m/%Y")
+
+    assert dates.iloc[-1] == pd.Timestamp("2024-02-05 14:00")
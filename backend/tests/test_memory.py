@@ -0,0 +1,84 @@
+import pytest
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import json
+import subprocess
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Peak RSS is reset and read through /proc, so the measurement is Linux only
+pytestmark = pytest.mark.skipif(not os.path.exists("/proc/self/clear_refs"), reason="needs /proc/self/clear_refs")
+
+N_TRANSACTIONS = 2_000_000
+N_CUSTOMERS = 20_000
+
+# Largest allowed peak memory above the loaded input, as a multiple of the input size.
+# Measured at about 1.2 (service) and 2.1 (analysis); copying every stage used 2.4 and 15.
+MAX_PEAK_MULTIPLE = {
+    "service": 1.6,
+    "analysis": 2.6
+}
+
+def build_transactions():
+    """Create typed transactions, as produced by ingestion"""
+    rng = np.random.default_rng(3)
+    return pd.DataFrame({
+        "customer_id": pd.Categorical.from_codes(
+            rng.integers(0, N_CUSTOMERS, N_TRANSACTIONS),
+            categories=[f"cust_{i}" for i in range(N_CUSTOMERS)]
+        ),
+        "transaction_id": np.arange(N_TRANSACTIONS),
+        "transaction_date": pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 500 * 86400, N_TRANSACTIONS), unit="s"),
+        "transaction_amount": rng.gamma(2.0, 50.0, N_TRANSACTIONS)
+    })
+
+def read_status(field):
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) * 1024
+
+def run_service(data):
+    from rfm_service import RFMAnalysisService
+    RFMAnalysisService(data, n_workers=1, engine="pandas").perform_full_analysis(datetime(2024, 6, 1))
+
+def run_analysis(data):
+    from rfm_analysis import RFMAnalysis
+    RFMAnalysis(data, "customer_id", "transaction_date", "transaction_id", "transaction_amount", None).segment_customers()
+
+def measure(pipeline):
+    """Run a pipeline in this process and return its peak RSS above the input, in input sizes"""
+    import gc
+    data = build_transactions()
+    input_bytes = data.memory_usage(deep=True).sum()
+    # Import the pipeline before measuring, so module memory is not counted
+    import rfm_service, rfm_analysis
+    gc.collect()
+
+    # Reset the RSS high-water mark to the current RSS
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+    baseline = read_status("VmRSS")
+
+    {"service": run_service, "analysis": run_analysis}[pipeline](data)
+
+    return (read_status("VmHWM") - baseline) / input_bytes
+
+@pytest.mark.parametrize("pipeline", ["service", "analysis"])
+def test_peak_memory_stays_within_multiple_of_input(pipeline):
+    """Test that the pipeline does not copy the input frame stage after stage"""
+    # A fresh process, so earlier tests do not affect the peak
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), pipeline],
+        capture_output=True, text=True, check=True
+    ).stdout
+    peak_multiple = json.loads(output.strip().splitlines()[-1])
+
+    assert peak_multiple <= MAX_PEAK_MULTIPLE[pipeline]
+
+if __name__ == "__main__":
+    print(json.dumps(measure(sys.argv[1])))
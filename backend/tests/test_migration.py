@@ -0,0 +1,69 @@
+import pytest
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import migration
+from migration import migration_matrix, ABSENT
+from customer_store import customer_keys, write_scored_customers
+from rfm_service import RFMAnalysisService
+
+@pytest.fixture
+def transactions():
+    """Create a year of transactions of 3,000 customers"""
+    rng = np.random.default_rng(21)
+    n = 30000
+    return pd.DataFrame({
+        "customer_id": [f"cust_{i}" for i in rng.integers(0, 3000, n)],
+        "transaction_id": np.arange(n).astype(str),
+        "transaction_date": pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 365 * 86400, n), unit="s"),
+        "transaction_amount": rng.gamma(2.0, 50.0, n)
+    })
+
+def analyze(transactions, end):
+    """Analyze the transactions before a date, as a monthly run would"""
+    service = RFMAnalysisService(transactions[transactions["transaction_date"] < end].copy())
+    service.perform_full_analysis(end)
+    return service.segmented_df
+
+def test_customer_keys_match_across_id_types():
+    """Test that a customer gets the same key whatever the ID dtype"""
+    ids = pd.Index(["1", "2", "30"])
+    keys = customer_keys(ids)
+
+    np.testing.assert_array_equal(customer_keys(pd.CategoricalIndex(ids[::-1]))[::-1], keys)
+    np.testing.assert_array_equal(customer_keys(pd.Index([1, 2, 30])), keys)
+    assert len(set(keys)) == 3
+
+def test_migration_matrix_matches_join(transactions, tmp_path):
+    """Test the transition matrix and revenue flow against a pandas outer join"""
+    before = analyze(transactions, pd.Timestamp("2023-09-01"))
+    after = analyze(transactions[transactions["customer_id"] != "cust_7"], pd.Timestamp("2024-01-01"))
+    write_scored_customers(before, str(tmp_path / "before.parquet"))
+    write_scored_customers(after, str(tmp_path / "after.parquet"))
+
+    result = migration_matrix(str(tmp_path / "before.parquet"), str(tmp_path / "after.parquet"))
+
+    joined = before[["segment", "monetary"]].astype({"segment": object}).join(
+        after[["segment", "monetary"]].astype({"segment": object}), how="outer", lsuffix="_before", rsuffix="_after"
+    )
+    joined[["segment_before", "segment_after"]] = joined[["segment_before", "segment_after"]].fillna(ABSENT)
+    joined = joined.fillna(0.0)
+
+    states = result["states"]
+    assert states[-1] == ABSENT
+    expected = pd.crosstab(joined["segment_before"], joined["segment_after"]).reindex(index=states, columns=states, fill_value=0)
+    np.testing.assert_array_equal(np.array(result["customers"]), expected.to_numpy())
+
+    revenue = joined.pivot_table(index="segment_before", columns="segment_after", values="monetary_after", aggfunc="sum")
+    revenue = revenue.reindex(index=states, columns=states).fillna(0.0)
+    np.testing.assert_allclose(np.array(result["revenue_after"]), revenue.to_numpy())
+
+    assert result["lost_customers"] == 1
+    assert result["retained_customers"] + result["lost_customers"] == len(before)
+    assert result["retained_customers"] + result["new_customers"] == len(after)
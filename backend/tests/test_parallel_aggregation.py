@@ -0,0 +1,72 @@
+import pytest
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import parallel aggregation
+from parallel_aggregation import parallel_calculate_rfm, shard_of
+from rfm_service import RFMAnalysisService
+
+ANALYSIS_DATE = datetime(2024, 6, 1, 12, 30)
+
+@pytest.fixture
+def transactions():
+    """Create 20,000 transactions of 2,000 customers, some without transaction ID"""
+    rng = np.random.default_rng(11)
+    n = 20000
+    transaction_ids = np.arange(n).astype(str).astype(object)
+    transaction_ids[rng.random(n) < 0.02] = None
+    return pd.DataFrame({
+        "customer_id": [f"cust_{i}" for i in rng.integers(0, 2000, n)],
+        "transaction_id": transaction_ids,
+        "transaction_date": pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 500 * 86400, n), unit="s"),
+        "transaction_amount": rng.gamma(2.0, 50.0, n)
+    })
+
+def serial_rfm(transactions):
+    service = RFMAnalysisService(transactions.copy(), n_workers=1)
+    service.preprocess_data()
+    return service.calculate_rfm(ANALYSIS_DATE)
+
+def test_shards_partition_customers():
+    """Test that every customer code maps to one shard within range"""
+    codes = np.arange(10000)
+    shards = shard_of(codes, 8)
+
+    assert shards.max() < 8
+    np.testing.assert_array_equal(shard_of(codes, 8), shards)
+    # Hashing spreads customers evenly
+    assert np.bincount(shards).min() > 1000
+
+@pytest.mark.parametrize("n_workers", [1, 2, 4])
+def test_parallel_matches_serial(transactions, n_workers):
+    """Test that parallel aggregation gives the same metrics as the groupby"""
+    expected = serial_rfm(transactions)
+    result = parallel_calculate_rfm(transactions, ANALYSIS_DATE, n_workers)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+def test_parallel_matches_serial_with_categorical_ids(transactions):
+    """Test parity when customer IDs are categorical, as typed at read time"""
+    transactions["customer_id"] = transactions["customer_id"].astype("category")
+    # Unused categories must not produce customers
+    transactions["customer_id"] = transactions["customer_id"].cat.add_categories(["unused"])
+    transactions["transaction_amount"] = transactions["transaction_amount"].astype(np.float32)
+
+    expected = serial_rfm(transactions)
+    result = parallel_calculate_rfm(transactions, ANALYSIS_DATE, 3)
+
+    pd.testing.assert_frame_equal(result.sort_index(), expected.sort_index())
+
+def test_service_uses_workers(transactions):
+    """Test the full analysis with parallel aggregation"""
+    service = RFMAnalysisService(transactions.copy(), n_workers=2)
+    summary = service.perform_full_analysis(ANALYSIS_DATE)
+
+    assert summary["total_customers"] == transactions["customer_id"].nunique()
+    assert summary["total_revenue"] == pytest.approx(transactions["transaction_amount"].sum())
@@ -0,0 +1,72 @@
+import pytest
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import preview
+from preview import preview_analysis, sample_transactions, wilson_interval
+from rfm_service import RFMAnalysisService
+
+ANALYSIS_DATE = datetime(2024, 6, 1)
+
+@pytest.fixture
+def transactions():
+    """Create 200,000 transactions of 20,000 customers"""
+    rng = np.random.default_rng(8)
+    n = 200000
+    return pd.DataFrame({
+        "customer_id": [f"cust_{i}" for i in rng.integers(0, 20000, n)],
+        "transaction_id": np.arange(n).astype(str),
+        "transaction_date": pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 500 * 86400, n), unit="s"),
+        "transaction_amount": rng.gamma(2.0, 50.0, n)
+    })
+
+def test_sample_keeps_whole_customers(transactions):
+    """Test that sampled customers keep all of their transactions"""
+    sample = sample_transactions(transactions, 0.1)
+    sampled_ids = sample["customer_id"].unique()
+
+    assert 1600 < len(sampled_ids) < 2400
+    assert len(sample) == transactions["customer_id"].isin(sampled_ids).sum()
+
+    # The same customers are sampled when IDs are categorical
+    categorical = transactions.assign(customer_id=transactions["customer_id"].astype("category"))
+    assert set(sample_transactions(categorical, 0.1)["customer_id"]) == set(sampled_ids)
+
+def test_wilson_interval():
+    """Test Wilson intervals, with and without finite population correction"""
+    low, high = wilson_interval(50, 100, 0.95)
+    assert low == pytest.approx(0.4038, abs=1e-4)
+    assert high == pytest.approx(0.5962, abs=1e-4)
+
+    # A sample of the whole population is exact
+    assert wilson_interval(30, 100, 0.95, population=100) == (0.3, 0.3)
+    assert wilson_interval(0, 0, 0.95) == (0.0, 1.0)
+
+def test_preview_intervals_cover_exact_result(transactions):
+    """Test that the sampled distribution brackets the exact one"""
+    exact = RFMAnalysisService(transactions.copy()).perform_full_analysis(ANALYSIS_DATE)
+    preview = preview_analysis(transactions, sample_customers=4000, confidence=0.99, analysis_date=ANALYSIS_DATE)
+
+    assert preview["preview"]["sampled_customers"] < exact["total_customers"]
+    assert preview["total_customers"] == pytest.approx(exact["total_customers"], rel=0.1)
+    for segment, stats in preview["segment_distribution"].items():
+        low, high = stats["percentage_interval"]
+        assert low <= exact["segment_distribution"][segment]["percentage"] <= high
+
+def test_preview_of_small_data_is_exact(transactions):
+    """Test that data smaller than the sample size gives the exact result"""
+    small = transactions[transactions["customer_id"].isin([f"cust_{i}" for i in range(500)])]
+    exact = RFMAnalysisService(small.copy()).perform_full_analysis(ANALYSIS_DATE)
+    preview = preview_analysis(small, sample_customers=1000, analysis_date=ANALYSIS_DATE)
+
+    assert preview["preview"]["sampling_rate"] == 1.0
+    assert preview["total_customers"] == exact["total_customers"]
+    for segment, stats in preview["segment_distribution"].items():
+        assert stats["count"] == exact["segment_distribution"][segment]["count"]
+        assert stats["percentage_interval"][0] == pytest.approx(stats["percentage"])
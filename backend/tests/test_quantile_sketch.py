@@ -0,0 +1,119 @@
+import pytest
+import pandas as pd
+import numpy as np
+from datetime import datetime, timedelta
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import quantile sketches
+import quantile_sketch
+from quantile_sketch import QuantileSketch, RFMSketch, score_files_streaming
+from scoring import quantile_levels, compute_breakpoints, assign_scores
+
+LEVELS = np.linspace(0.01, 0.99, 99)
+
+def rank_error(data, estimates, levels):
+    """Largest distance between the requested level and the rank range of each estimate"""
+    data = np.sort(data)
+    low = np.searchsorted(data, estimates, side="left") / len(data)
+    high = np.searchsorted(data, estimates, side="right") / len(data)
+    return np.maximum(0, np.maximum(low - levels, levels - high)).max()
+
+@pytest.fixture
+def skewed_values():
+    """Create a skewed, partly tied sample similar to monetary and frequency values"""
+    rng = np.random.default_rng(3)
+    values = np.concatenate([rng.gamma(2.0, 100.0, 150000), rng.integers(1, 10, 50000).astype(float)])
+    rng.shuffle(values)
+    return values
+
+def test_small_sketch_is_exact():
+    """Test that quantiles are exact while nothing was compacted"""
+    values = np.random.default_rng(0).normal(size=100)
+    sketch = QuantileSketch(epsilon=0.01).update(values)
+
+    assert sketch.is_exact
+    np.testing.assert_allclose(sketch.quantiles(LEVELS), np.quantile(values, LEVELS))
+
+@pytest.mark.parametrize("epsilon", [0.05, 0.02, 0.01])
+def test_error_bound_against_exact_quantiles(skewed_values, epsilon):
+    """Test that merged sketches stay within the configured rank error"""
+    sketch = QuantileSketch(epsilon, seed=1)
+    for i, chunk in enumerate(np.array_split(skewed_values, 25)):
+        sketch.merge(QuantileSketch(epsilon, seed=i).update(chunk))
+
+    assert sketch.count == len(skewed_values)
+    assert not sketch.is_exact
+    # Memory stays far below the number of values
+    assert len(sketch) < len(skewed_values) / 50
+    assert rank_error(skewed_values, sketch.quantiles(LEVELS), LEVELS) <= epsilon
+
+def test_streaming_updates_match_merged_sketches(skewed_values):
+    """Test that a sketch updated chunk by chunk has the same guarantee as merged sketches"""
+    sketch = QuantileSketch(0.01, seed=5)
+    for chunk in np.array_split(skewed_values, 40):
+        sketch.update(chunk)
+
+    assert rank_error(skewed_values, sketch.quantiles(LEVELS), LEVELS) <= 0.01
+    assert sketch.quantiles([0.0])[0] == skewed_values.min()
+    assert sketch.quantiles([1.0])[0] == skewed_values.max()
+
+def test_rfm_sketch_breakpoints(skewed_values):
+    """Test that sketched breakpoints give nearly the same scores as exact ones"""
+    rng = np.random.default_rng(9)
+    recency = rng.integers(1, 365, len(skewed_values)).astype(float)
+    frequency = rng.poisson(3, len(skewed_values)).astype(float)
+
+    sketch = RFMSketch(0.01, seed=0)
+    for chunk in np.array_split(np.arange(len(skewed_values)), 10):
+        sketch.merge(RFMSketch(0.01, seed=int(chunk[0])).update(recency[chunk], frequency[chunk], skewed_values[chunk]))
+
+    levels = quantile_levels(4)
+    approximate = sketch.breakpoints(levels)
+    exact = compute_breakpoints({"recency": recency, "frequency": frequency, "monetary": skewed_values}, levels)
+
+    approximate_scores = assign_scores(skewed_values, approximate["monetary"])
+    exact_scores = assign_scores(skewed_values, exact["monetary"])
+    # Only customers near a breakpoint can change tile
+    assert (approximate_scores != exact_scores).mean() <= 0.01 * len(levels)
+
+def test_score_files_streaming(tmp_path, monkeypatch):
+    """Test the two-pass streaming scoring of several customer files"""
+    rng = np.random.default_rng(4)
+    today = datetime.now()
+    paths = []
+    for i in range(2):
+        n = 2000
+        df = pd.DataFrame({
+            "customer": [f"c{i}_{j}" for j in range(n)],
+            "last_purchase": [(today - timedelta(days=int(d))).strftime("%Y-%m-%d") for d in rng.integers(1, 400, n)],
+            "orders": rng.integers(1, 20, n),
+            "spent": rng.gamma(2.0, 100.0, n)
+        })
+        path = tmp_path / f"customers_{i}.csv"
+        df.to_csv(path, index=False)
+        paths.append(str(path))
+
+    mapping = {"user_id": "customer", "recency": "last_purchase", "frequency": "orders", "monetary": "spent"}
+    output = str(tmp_path / "scores.parquet")
+
+    # Every chunk of every file is sketched with its own seed
+    seeds = []
+    class RecordingSketch(quantile_sketch.RFMSketch):
+        def __init__(self, epsilon=None, seed=None):
+            seeds.append(seed)
+            super().__init__(epsilon, seed)
+    monkeypatch.setattr(quantile_sketch, "RFMSketch", RecordingSketch)
+
+    stats = score_files_streaming(paths, output, mapping, n_tiles=5, epsilon=0.01, chunk_size=500, max_workers=1, seed=0)
+    assert set(seeds) == {(file << 32) + start for file in range(2) for start in range(0, 2000, 500)}
+
+    scored = pd.read_parquet(output)
+    assert stats["rows"] == len(scored) == 4000
+    assert stats["n_tiles"] == 5
+    assert len(stats["breakpoints"]["monetary"]) == 4
+    assert scored["m_score"].between(1, 5).all()
+    assert scored["segment"].notna().all()
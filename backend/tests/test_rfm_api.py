@@ -0,0 +1,116 @@
+import pytest
+import pandas as pd
+import numpy as np
+import io
+import sys
+import os
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import database and config
+from database import get_db
+from config.config import HISTORY_CONFIG
+
+COLUMNS = {
+    "segment_type": "ecommerce",
+    "user_id_col": "customer",
+    "recency_col": "last_purchase",
+    "frequency_col": "orders",
+    "monetary_col": "spent"
+}
+
+@pytest.fixture
+def api(db_session, tmp_path, monkeypatch):
+    """Serve the RFM API from a scratch working directory"""
+    monkeypatch.chdir(tmp_path)
+    # Imported here, as the module creates its storage directories in the working directory
+    import rfm_api
+    for directory in (rfm_api.HISTORY_DIR, rfm_api.MODELS_DIR, rfm_api.SCORES_DIR):
+        os.makedirs(directory, exist_ok=True)
+
+    app = FastAPI()
+    app.include_router(rfm_api.router)
+    app.dependency_overrides[get_db] = lambda: db_session
+    return TestClient(app)
+
+@pytest.fixture
+def customers_csv():
+    """Customer file of 300 customers"""
+    rng = np.random.default_rng(4)
+    n = 300
+    return pd.DataFrame({
+        "customer": [f"cust_{i}" for i in range(n)],
+        "last_purchase": (pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 300, n), unit="D")).strftime("%Y-%m-%d"),
+        "orders": rng.integers(1, 20, n),
+        "spent": rng.gamma(2.0, 50.0, n).round(2)
+    }).to_csv(index=False).encode()
+
+def analyze(api, customers_csv):
+    return api.post("/analyze-rfm", files={"file": ("customers.csv", customers_csv, "text/csv")}, data=COLUMNS)
+
+def test_analyses_started_together_get_their_own_files(api, customers_csv):
+    """Test that analyses started within the same second do not share a key or files"""
+    first = analyze(api, customers_csv)
+    second = analyze(api, customers_csv)
+    assert first.status_code == 200 and second.status_code == 200
+
+    keys = [response.json()["history_entry"]["analysis_key"] for response in (first, second)]
+    assert keys[0] != keys[1]
+    for key in keys:
+        assert os.path.exists(os.path.join("models", f"{key}.joblib"))
+
+    history = api.get("/analysis-history").json()["history"]
+    assert [entry["analysis_key"] for entry in history] == keys[::-1]
+
+def test_stored_analysis_endpoints(api, customers_csv):
+    """Test the customer pages, charts, export and batch scoring of a stored analysis"""
+    entry = analyze(api, customers_csv).json()["history_entry"]
+    key = entry["analysis_key"]
+
+    assert api.get(f"/analysis-history/{key}").json()["record_count"] == 300
+
+    page = api.get(f"/analysis-history/{key}/customers", params={"offset": 250, "limit": 100}).json()
+    assert page["total"] == 300 and len(page["customers"]) == 50
+
+    charts = api.get(f"/analysis-history/{key}/charts").json()
+    assert set(charts) == {"treemap", "polar_area", "segment_stats", "churn_histogram", "ltv_histogram"}
+    assert api.get(f"/analysis-history/{key}/charts", params={"chart": "treemap"}).json() == charts["treemap"]
+    assert api.get(f"/analysis-history/{key}/charts", params={"chart": "pie"}).status_code == 400
+
+    export = api.get(f"/analysis-history/{key}/export", params={"columns": "customer,churn_probability", "churn_above": 0.5})
+    exported = pd.read_csv(io.BytesIO(export.content))
+    assert list(exported.columns) == ["customer", "churn_probability"]
+    assert (exported["churn_probability"] > 0.5).all()
+    assert api.get("/analysis-history/unknown/export").status_code == 404
+
+    scored = api.post("/score-customers", files={"file": ("new.csv", customers_csv, "text/csv")},
+                      data={"model_id": entry["model_id"]})
+    assert scored.status_code == 200
+    assert scored.json()["rows"] == 300
+    download = api.get(f"/scores/{scored.json()['output_file']}")
+    assert len(pd.read_parquet(io.BytesIO(download.content))) == 300
+    assert api.post("/score-customers", files={"file": ("new.csv", customers_csv, "text/csv")},
+                    data={"model_id": "unknown"}).status_code == 404
+
+def test_history_limit_is_bounded(api):
+    """Test that history pages are between 1 and the configured maximum entries"""
+    assert api.get("/analysis-history", params={"limit": 0}).status_code == 422
+    assert api.get("/analysis-history", params={"limit": HISTORY_CONFIG["max_page_size"] + 1}).status_code == 422
+    assert api.get("/analysis-history", params={"limit": 1}).json() == {"history": [], "next_cursor": None}
+
+def test_mounted_with_authentication(db_session, tmp_path, monkeypatch):
+    """Test that the API is served under /api to signed-in users only"""
+    import main
+    from auth import get_current_user
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(main.app.dependency_overrides, get_db, lambda: db_session)
+    client = TestClient(main.app)
+
+    assert client.get("/api/analysis-history").status_code == 401
+    assert client.post("/api/score-customers").status_code == 401
+
+    monkeypatch.setitem(main.app.dependency_overrides, get_current_user, lambda: {"user_id": 1})
+    assert client.get("/api/analysis-history").json() == {"history": [], "next_cursor": None}
@@ -9,7 +9,11 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import RFM service
-from rfm_service import RFMAnalysisService
+from rfm_service import (
+    RFMAnalysisService, build_segment_lookup, format_rfm_group,
+    summarize_cells, validate_segment_rules
+)
+from scoring import compute_breakpoints
 
 # Create sample transaction data
 @pytest.fixture
@@ -139,13 +143,19 @@ def test_assign_rfm_scores(sample_transactions):
     )
     assert customer["rfm_score"] == expected_score
     
-    # Check if rfm_group is formed correctly
-    expected_group = (
+    # Check if rfm_group is the integer code of the three scores
+    assert customer["rfm_group"] == expected_score
+    assert format_rfm_group(customer["rfm_group"]) == (
         str(int(customer["r_quartile"])) + 
         str(int(customer["f_quartile"])) + 
         str(int(customer["m_quartile"]))
     )
-    assert customer["rfm_group"] == expected_group
+    
+    # Check if scores are stored as compact integers
+    assert rfm_scores["r_quartile"].dtype == np.int8
+    assert rfm_scores["f_quartile"].dtype == np.int8
+    assert rfm_scores["m_quartile"].dtype == np.int8
+    assert rfm_scores["rfm_group"].dtype == np.int16
 
 def test_assign_segments(sample_transactions):
     """Test segment assignment"""
@@ -163,6 +173,22 @@ def test_assign_segments(sample_transactions):
     unknown_count = (segmented["segment"] == "Unknown").sum()
     assert unknown_count < len(segmented)  # Some may be unknown if they don't match rules
 
+def test_segment_lookup_matches_rules():
+    """Test that the score-cell lookup applies rules in order on integer codes"""
+    rules = {
+        "Low": [{"r_quartile": {"max": 2}}],
+        "Exact": [{"rfm_group": ["434", "111"]}],
+        "Top": [{"rfm_score": 444}]
+    }
+    
+    lookup, segment_names = build_segment_lookup(rules)
+    
+    assert segment_names[lookup[111]] == "Exact"  # later rule overrides "Low"
+    assert segment_names[lookup[212]] == "Low"
+    assert segment_names[lookup[434]] == "Exact"
+    assert segment_names[lookup[444]] == "Top"
+    assert segment_names[lookup[333]] == "Unknown"
+
 def test_generate_summary(sample_transactions):
     """Test summary generation"""
     service = RFMAnalysisService(sample_transactions)
@@ -213,4 +239,119 @@ def test_full_analysis_workflow(sample_transactions):
     assert len(service.summary) > 0
     
     # Check if summary was returned
-    assert summary == service.summary 
\ No newline at end of file
+    assert summary == service.summary 
+
+def test_n_tile_scoring_and_stored_breakpoints(sample_transactions):
+    """Test scoring with deciles and rescoring with stored breakpoints"""
+    service = RFMAnalysisService(sample_transactions.copy(), n_tiles=10)
+    summary = service.perform_full_analysis()
+    
+    scores = service.segmented_df
+    assert summary["scoring"]["n_tiles"] == 10
+    assert len(summary["scoring"]["breakpoints"]["monetary"]) == 9
+    assert scores["m_quartile"].between(1, 10).all()
+    assert scores["m_quartile"].max() == 10
+    
+    # Deciles use two digits per score in the group code
+    customer_id = scores.index[0]
+    customer = service.get_customer_data(customer_id)
+    assert customer["rfm_group"] == "-".join(
+        str(int(scores.loc[customer_id, col])) for col in ["r_quartile", "f_quartile", "m_quartile"]
+    )
+    
+    # Reusing the stored breakpoints reproduces the same scores
+    rescored = RFMAnalysisService(sample_transactions.copy(), breakpoints=summary["scoring"]["breakpoints"])
+    rescored.perform_full_analysis()
+    assert rescored.n_tiles == 10
+    pd.testing.assert_series_equal(rescored.segmented_df["rfm_group"], scores["rfm_group"])
+
+def test_sketch_breakpoints_close_to_exact(sample_transactions):
+    """Test that sketch-based scoring matches exact scoring on a small dataset"""
+    exact = RFMAnalysisService(sample_transactions.copy())
+    exact.perform_full_analysis()
+    
+    # 100 customers fit in the sketch without compaction, so breakpoints are exact
+    sketched = RFMAnalysisService(sample_transactions.copy(), sketch_epsilon=0.01)
+    sketched.perform_full_analysis()
+    
+    assert sketched.breakpoints == pytest.approx(exact.breakpoints)
+    pd.testing.assert_series_equal(sketched.segmented_df["rfm_group"], exact.segmented_df["rfm_group"])
+
+def test_resegment_from_score_cells(sample_transactions):
+    """Test re-labelling an analysis from its score cells with other rules"""
+    service = RFMAnalysisService(sample_transactions.copy())
+    summary = service.perform_full_analysis()
+    cells = summary["score_cells"]
+    
+    assert sum(cells["count"]) == summary["total_customers"]
+    assert sum(cells["monetary"]) == pytest.approx(summary["total_revenue"])
+    
+    # The rules of the analysis reproduce its distribution
+    assert summarize_cells(cells, *service.segment_lookup()) == summary["segment_distribution"]
+    
+    # Alternative rules: split customers on recency only
+    rules = {
+        "Recent": [{"r_quartile": {"min": 3}}],
+        "Lapsed": [{"r_quartile": {"max": 2}}]
+    }
+    distribution = summarize_cells(cells, *build_segment_lookup(rules, summary["scoring"]["n_tiles"]))
+    segmented = service.segmented_df
+    recent = segmented[segmented["r_quartile"] >= 3]
+    
+    assert set(distribution) == {"Recent", "Lapsed"}
+    assert distribution["Recent"]["count"] == len(recent)
+    assert distribution["Recent"]["total_revenue"] == pytest.approx(recent["monetary"].sum())
+    assert distribution["Recent"]["avg_recency"] == pytest.approx(recent["recency"].mean())
+
+@pytest.mark.parametrize("rules", [
+    [],
+    {"Recent": {"r_quartile": {"min": 3}}},
+    {"Recent": [{"recency": {"min": 3}}]},
+    {"Recent": [{"r_quartile": {"above": 3}}]},
+    {"Recent": [{"rfm_group": ["4x4"]}]},
+    {"Recent": [{"rfm_group": ["4x4", "444"]}]},
+    {"Recent": [{"rfm_score": []}]}
+])
+def test_invalid_segment_rules(rules):
+    """Test that malformed segment rules are rejected"""
+    with pytest.raises(ValueError):
+        validate_segment_rules(rules)
+
+def test_time_decayed_scoring(sample_transactions):
+    """Test scoring on time-decayed frequency and monetary values with cohorts"""
+    analysis_date = datetime.now()
+    service = RFMAnalysisService(sample_transactions.copy(), decay_half_life=90)
+    summary = service.perform_full_analysis(analysis_date)
+    customers = service.segmented_df
+    
+    # Decayed sums computed transaction by transaction
+    ages = (analysis_date - sample_transactions["transaction_date"]).dt.total_seconds() / 86400
+    weighted = sample_transactions.assign(weight=0.5 ** (ages / 90))
+    weighted["weighted_amount"] = weighted["weight"] * weighted["transaction_amount"]
+    expected = weighted.groupby("customer_id").agg(
+        decayed_frequency=("weight", "sum"),
+        decayed_monetary=("weighted_amount", "sum"),
+        first_purchase=("transaction_date", "min")
+    )
+    np.testing.assert_allclose(customers["decayed_frequency"], expected["decayed_frequency"])
+    np.testing.assert_allclose(customers["decayed_monetary"], expected["decayed_monetary"])
+    assert (customers["cohort"] == expected["first_purchase"].dt.to_period("M").dt.to_timestamp()).all()
+    
+    # Plain metrics are kept, but scores come from the decayed ones
+    assert summary["total_revenue"] == pytest.approx(sample_transactions["transaction_amount"].sum())
+    assert summary["scoring"]["decay_half_life"] == 90
+    breakpoints = compute_breakpoints({
+        "recency": customers["recency"],
+        "frequency": customers["decayed_frequency"],
+        "monetary": customers["decayed_monetary"]
+    }, service.levels)
+    assert summary["scoring"]["breakpoints"] == breakpoints
+    
+    assert sum(summary["cohorts"].values()) == summary["total_customers"]
+    assert list(summary["cohorts"]) == sorted(summary["cohorts"])
+    
+    # Without decay the summary has no cohorts
+    plain = RFMAnalysisService(sample_transactions.copy(), decay_half_life=0).perform_full_analysis(analysis_date)
+    assert plain["scoring"]["decay_half_life"] is None
+    assert "cohorts" not in plain
+
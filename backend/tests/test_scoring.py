@@ -0,0 +1,104 @@
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import scoring engine
+from scoring import quantile_levels, compute_breakpoints, assign_scores, rescale_scores, rfm_group_code
+
+@pytest.fixture
+def metrics():
+    """Create recency, frequency and monetary values for 10,000 customers"""
+    rng = np.random.default_rng(7)
+    n = 10000
+    return {
+        "recency": rng.integers(1, 365, n).astype(float),
+        "frequency": rng.poisson(3, n).astype(float),
+        "monetary": rng.gamma(2.0, 150.0, n)
+    }
+
+@pytest.mark.parametrize("n_tiles", [4, 5, 10])
+def test_breakpoints_match_numpy_quantiles(metrics, n_tiles):
+    """Test that partition-based breakpoints equal the exact quantiles"""
+    levels = quantile_levels(n_tiles)
+    breakpoints = compute_breakpoints(metrics, levels)
+
+    assert len(levels) == n_tiles - 1
+    for name, values in metrics.items():
+        np.testing.assert_allclose(breakpoints[name], np.quantile(values, levels))
+
+def test_custom_cut_points(metrics):
+    """Test scoring with custom quantile levels"""
+    levels = quantile_levels(cut_points=[0.8, 0.2, 0.5])
+    np.testing.assert_allclose(levels, [0.2, 0.5, 0.8])
+
+    breakpoints = compute_breakpoints(metrics, levels)
+    scores = assign_scores(metrics["monetary"], breakpoints["monetary"])
+
+    # Continuous values: tile sizes follow the cut points
+    counts = np.bincount(scores, minlength=5)[1:]
+    np.testing.assert_allclose(counts / len(scores), [0.2, 0.3, 0.3, 0.2], atol=0.001)
+
+    with pytest.raises(ValueError):
+        quantile_levels(cut_points=[0.0, 0.5])
+
+def test_scores_match_qcut_without_ties(metrics):
+    """Test that scores agree with pd.qcut when values are distinct"""
+    values = metrics["monetary"]
+    breakpoints = compute_breakpoints({"monetary": values}, quantile_levels(4))["monetary"]
+
+    expected = pd.qcut(values, 4, labels=False) + 1
+    np.testing.assert_array_equal(assign_scores(values, breakpoints), expected)
+    np.testing.assert_array_equal(assign_scores(values, breakpoints, reverse=True), 5 - expected)
+
+def test_heavy_ties_keep_all_levels():
+    """Test that heavily tied values are scored deterministically without collapsing tiles"""
+    # 70% of customers bought exactly once
+    values = np.array([1.0] * 700 + [2.0] * 150 + [3.0] * 100 + [8.0] * 50)
+    breakpoints = compute_breakpoints({"frequency": values}, quantile_levels(4))["frequency"]
+    scores = assign_scores(values, breakpoints)
+
+    assert scores.dtype == np.int8
+    # Equal values always share a score
+    for value in np.unique(values):
+        assert len(np.unique(scores[values == value])) == 1
+    # The scale keeps four levels: the top customers still get a 4
+    assert scores.min() == 1
+    assert scores.max() == 4
+
+    # Scoring is independent of the row order
+    order = np.random.default_rng(0).permutation(len(values))
+    np.testing.assert_array_equal(assign_scores(values[order], breakpoints), scores[order])
+
+def test_stored_breakpoints_score_new_customers(metrics):
+    """Test that stored breakpoints score new customers consistently"""
+    breakpoints = compute_breakpoints(metrics, quantile_levels(5))
+
+    new_values = np.array([-1.0, breakpoints["monetary"][0], breakpoints["monetary"][0] + 0.01, 1e9])
+    np.testing.assert_array_equal(assign_scores(new_values, breakpoints["monetary"]), [1, 1, 2, 5])
+
+def test_breakpoints_ignore_missing_values(metrics):
+    """Test that missing values do not shift the breakpoints"""
+    with_missing = dict(metrics)
+    with_missing["monetary"] = np.append(metrics["monetary"], [np.nan] * 10)
+    with_missing["recency"] = np.append(metrics["recency"], [1.0] * 10)
+    with_missing["frequency"] = np.append(metrics["frequency"], [1.0] * 10)
+
+    breakpoints = compute_breakpoints(with_missing, quantile_levels(4))
+    np.testing.assert_allclose(breakpoints["monetary"], np.quantile(metrics["monetary"], [0.25, 0.5, 0.75]))
+
+def test_rescale_scores():
+    """Test mapping scores between scales"""
+    np.testing.assert_array_equal(rescale_scores(np.arange(1, 6), 5, 4), [1, 2, 3, 4, 4])
+    np.testing.assert_array_equal(rescale_scores(np.arange(1, 11), 10, 4), [1, 1, 2, 2, 2, 3, 3, 4, 4, 4])
+    np.testing.assert_array_equal(rescale_scores(np.arange(1, 5), 4, 4), [1, 2, 3, 4])
+
+def test_rfm_group_code():
+    """Test group codes of quartile and decile scores, including int8 scores that would overflow"""
+    assert int(rfm_group_code(4, 3, 4)) == 434
+    scores = np.array([10, 3, 7], dtype=np.int8)
+    np.testing.assert_array_equal(rfm_group_code(scores, scores[::-1], scores, 10), [100710, 30303, 71007])
@@ -0,0 +1,96 @@
+import pytest
+import datetime
+import decimal
+import json
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import serialization
+import serialization
+from serialization import FastJSONResponse, dump, dumps, load, loads, to_builtin
+
+RESULT = {
+    "count": np.int64(3),
+    "mean": np.float32(0.5),
+    "missing": float("nan"),
+    "flag": np.bool_(True),
+    "scores": np.array([1, 2, 3]),
+    "segments": pd.Series({"Campeões": 2, "Clientes em Risco": 1}),
+    "rows": pd.DataFrame({"customer_id": ["a", "b"], "monetary": [10.5, np.nan]}),
+    "generated": pd.Timestamp("2024-01-01 12:30"),
+    "day": datetime.date(2024, 1, 2),
+    "amount": decimal.Decimal("12.34"),
+    "by_score": {np.int64(111): "Perdidos", 5: "Campeões"}
+}
+
+EXPECTED = {
+    "count": 3,
+    "mean": 0.5,
+    "missing": None,
+    "flag": True,
+    "scores": [1, 2, 3],
+    "segments": {"Campeões": 2, "Clientes em Risco": 1},
+    "rows": [{"customer_id": "a", "monetary": 10.5}, {"customer_id": "b", "monetary": None}],
+    "generated": "2024-01-01T12:30:00",
+    "day": "2024-01-02",
+    "amount": 12.34,
+    "by_score": {"111": "Perdidos", "5": "Campeões"}
+}
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    """Serialize with orjson and with the standard library fallback"""
+    if request.param == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+def test_to_builtin():
+    """Test that NumPy, pandas and other values become plain Python types"""
+    converted = to_builtin(RESULT)
+
+    assert converted["by_score"] == {111: "Perdidos", 5: "Campeões"}
+    assert converted["missing"] is None and converted["rows"][1]["monetary"] is None
+    assert type(converted["count"]) is int and type(converted["flag"]) is bool
+    # The result is plain enough for the standard library encoder
+    json.dumps(converted)
+
+    with pytest.raises(TypeError):
+        to_builtin({"model": object()})
+
+def test_dumps_round_trip(encoder):
+    """Test that results serialize to the same JSON with either encoder"""
+    data = dumps(RESULT)
+
+    assert isinstance(data, bytes)
+    assert loads(data) == EXPECTED
+    assert "Campeões" in data.decode("utf-8")
+
+def test_dump_replaces_file_atomically(tmp_path, monkeypatch):
+    """Test that dump writes complete files and leaves the old file when writing fails"""
+    path = str(tmp_path / "results" / "analysis.json")
+    dump({"version": 1}, path)
+    dump({"version": 2}, path)
+    assert load(path) == {"version": 2}
+
+    def fail(obj):
+        raise RuntimeError("encoder failed")
+    monkeypatch.setattr(serialization, "dumps", fail)
+
+    with pytest.raises(RuntimeError):
+        dump({"version": 3}, path)
+    assert load(path) == {"version": 2}
+    assert os.listdir(tmp_path / "results") == ["analysis.json"]
+
+def test_fast_json_response(encoder):
+    """Test that responses are rendered with the shared serialization layer"""
+    response = FastJSONResponse(RESULT, status_code=201)
+
+    assert response.status_code == 201
+    assert response.media_type == "application/json"
+    assert loads(response.body) == EXPECTED
+    assert response.headers["content-length"] == str(len(response.body))
@@ -0,0 +1,74 @@
+import pytest
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import snapshots
+from snapshots import rolling_segment_counts, weekly_snapshot_dates
+from rfm_service import RFMAnalysisService
+
+@pytest.fixture
+def transactions():
+    """Create a year of transactions of 2,000 customers, some without transaction ID"""
+    rng = np.random.default_rng(17)
+    n = 20000
+    transaction_ids = np.arange(n).astype(str).astype(object)
+    transaction_ids[rng.random(n) < 0.02] = None
+    return pd.DataFrame({
+        "customer_id": [f"cust_{i}" for i in rng.integers(0, 2000, n)],
+        "transaction_id": transaction_ids,
+        "transaction_date": pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 365 * 86400, n), unit="s"),
+        "transaction_amount": rng.gamma(2.0, 50.0, n)
+    })
+
+def test_weekly_snapshot_dates():
+    """Test weekly snapshot dates, oldest first"""
+    dates = weekly_snapshot_dates(datetime(2024, 1, 1), weeks=3)
+    assert dates == [datetime(2023, 12, 18), datetime(2023, 12, 25), datetime(2024, 1, 1)]
+
+def test_rolling_counts_match_full_analysis(transactions):
+    """Test that every snapshot matches a full analysis at its date"""
+    snapshot_dates = weekly_snapshot_dates(datetime(2023, 12, 31), weeks=8) + [datetime(2022, 12, 1)]
+    counts = rolling_segment_counts(transactions.copy(), snapshot_dates)
+
+    assert list(counts.index) == sorted(snapshot_dates)
+    # No customer before the first transaction
+    assert counts.loc[datetime(2022, 12, 1)].sum() == 0
+
+    for snapshot in snapshot_dates[::3]:
+        upto = transactions[transactions["transaction_date"] <= snapshot].copy()
+        summary = RFMAnalysisService(upto).perform_full_analysis(snapshot)
+        expected = {segment: values["count"] for segment, values in summary["segment_distribution"].items()}
+        row = counts.loc[snapshot]
+        assert row[row > 0].to_dict() == expected
+
+def test_rolling_counts_with_fixed_breakpoints(transactions):
+    """Test scoring every snapshot against the same breakpoints"""
+    service = RFMAnalysisService(transactions.copy())
+    service.perform_full_analysis(datetime(2024, 1, 1))
+
+    counts = rolling_segment_counts(transactions.copy(), [datetime(2023, 6, 30), datetime(2024, 1, 1)],
+                                    breakpoints=service.breakpoints)
+
+    # The last snapshot is the analysis that produced the breakpoints
+    expected = service.segmented_df["segment"].value_counts()
+    assert counts.iloc[-1][expected.index].to_dict() == expected.to_dict()
+    assert counts.iloc[0].sum() < counts.iloc[-1].sum()
+
+def test_rolling_counts_with_time_decay(transactions):
+    """Test that decayed running sums match a time-decayed analysis at every snapshot"""
+    snapshot_dates = weekly_snapshot_dates(datetime(2023, 12, 31), weeks=6)
+    counts = rolling_segment_counts(transactions.copy(), snapshot_dates, decay_half_life=30)
+
+    for snapshot in snapshot_dates[::2]:
+        upto = transactions[transactions["transaction_date"] <= snapshot].copy()
+        summary = RFMAnalysisService(upto, decay_half_life=30).perform_full_analysis(snapshot)
+        expected = {segment: values["count"] for segment, values in summary["segment_distribution"].items()}
+        row = counts.loc[snapshot]
+        assert row[row > 0].to_dict() == expected
+
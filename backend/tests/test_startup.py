@@ -0,0 +1,50 @@
+import pytest
+import json
+import subprocess
+import sys
+import os
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that take seconds to import and are only needed by some requests
+HEAVY_MODULES = ["sklearn", "xgboost", "scipy", "openai"]
+
+# Start-up budgets in seconds, generous for slow CI machines
+MAX_IMPORT_SECONDS = 5.0
+MAX_FIRST_HEALTHY_SECONDS = 6.0
+
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+
+from fastapi.testclient import TestClient
+response = TestClient(main.app).get("/")
+healthy = time.perf_counter() - start
+
+print(json.dumps({{"import": imported, "healthy": healthy, "status": response.status_code, "heavy": heavy}}))
+"""
+
+@pytest.fixture(scope="module")
+def startup():
+    """Import the API and request / in a fresh interpreter"""
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT.format(heavy=HEAVY_MODULES)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def test_heavy_dependencies_are_not_imported_at_startup(startup):
+    """Test that ML and OpenAI libraries are loaded on first use only"""
+    assert startup["heavy"] == []
+
+def test_import_time(startup):
+    """Test the time to import the API application"""
+    assert startup["import"] < MAX_IMPORT_SECONDS
+
+def test_time_to_first_healthy_response(startup):
+    """Test the time from start-up to the first healthy response on /"""
+    assert startup["status"] == 200
+    assert startup["healthy"] < MAX_FIRST_HEALTHY_SECONDS
@@ -0,0 +1,77 @@
+import pytest
+import asyncio
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import usage counters
+import usage
+from usage import add_usage, get_usage, reconcile_usage, reconcile_periodically
+from database import Analysis, User
+
+@pytest.fixture
+def user_id(db_session):
+    """Create a user without usage"""
+    user = User(name="Usage User", email="usage@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.commit()
+    return user.id
+
+def test_counters_follow_analyses(db_session, user_id):
+    """Test that counters are created, incremented and decremented with the caller's transaction"""
+    assert get_usage(db_session, user_id) == {
+        "analysis_count": 0, "storage_bytes": 0, "customers_analyzed": 0, "llm_tokens": 0
+    }
+
+    for i in range(3):
+        db_session.add(Analysis(analysis_id=f"a{i}", user_id=user_id, file_size=1000, total_customers=10))
+        add_usage(db_session, str(user_id), analysis_count=1, storage_bytes=1000, customers_analyzed=10)
+        db_session.commit()
+    add_usage(db_session, user_id, llm_tokens=250)
+    db_session.commit()
+
+    # A rolled back analysis leaves the counters unchanged
+    add_usage(db_session, user_id, analysis_count=1, storage_bytes=5000)
+    db_session.rollback()
+
+    add_usage(db_session, user_id, analysis_count=-1, storage_bytes=-1000, customers_analyzed=-10)
+    db_session.query(Analysis).filter(Analysis.analysis_id == "a0").delete()
+    db_session.commit()
+
+    assert get_usage(db_session, user_id) == {
+        "analysis_count": 2, "storage_bytes": 2000, "customers_analyzed": 20, "llm_tokens": 250
+    }
+    assert reconcile_usage(db_session) == 0
+
+def test_reconcile_corrects_drift(db_session, user_id):
+    """Test that reconciliation recomputes derived counters and keeps LLM tokens"""
+    add_usage(db_session, user_id, analysis_count=5, storage_bytes=1, llm_tokens=40)
+    db_session.add(Analysis(analysis_id="b0", user_id=user_id, file_size=2048, total_customers=None))
+    db_session.commit()
+
+    assert reconcile_usage(db_session) == 1
+    assert get_usage(db_session, user_id) == {
+        "analysis_count": 1, "storage_bytes": 2048, "customers_analyzed": 0, "llm_tokens": 40
+    }
+
+def test_unknown_counter(db_session, user_id):
+    """Test that unknown counters are rejected"""
+    with pytest.raises(ValueError):
+        add_usage(db_session, user_id, rows=1)
+
+def test_reconcile_runs_at_startup(db_session, user_id, monkeypatch):
+    """Test that counters of analyses made before the counters existed are backfilled before the first wait"""
+    db_session.add(Analysis(analysis_id="c0", user_id=user_id, file_size=512, total_customers=7))
+    db_session.commit()
+    monkeypatch.setattr(usage, "_reconcile_in_new_session", lambda: reconcile_usage(db_session))
+
+    async def first_pass():
+        task = asyncio.create_task(reconcile_periodically(3600))
+        await asyncio.sleep(0.5)
+        task.cancel()
+
+    asyncio.run(first_pass())
+
+    assert get_usage(db_session, user_id)["customers_analyzed"] == 7
@@ -0,0 +1,136 @@
+# RFM Matrix - Usage Counters Module
+
+import asyncio
+from typing import Dict
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, Analysis, UserUsage
+
+# Counters of a UserUsage row
+COUNTERS = ('analysis_count', 'storage_bytes', 'customers_analyzed', 'llm_tokens')
+
+# Counters derived from the analyses table, recomputed by reconcile_usage.
+# LLM tokens have no other record and are only ever added to.
+DERIVED_COUNTERS = ('analysis_count', 'storage_bytes', 'customers_analyzed')
+
+
+def add_usage(db: Session, user_id: int, **deltas: int) -> None:
+    """
+    Add to a user's usage counters within the caller's transaction.
+
+    The counters are incremented in the database (counter = counter + delta),
+    so concurrent requests do not overwrite each other. Nothing is committed:
+    the change is committed or rolled back with the analysis it accounts for.
+
+    Args:
+        db: Database session
+        user_id: User whose counters change
+        **deltas: Amount to add to each counter (negative to subtract)
+
+    Raises:
+        ValueError: If a counter is unknown
+    """
+    unknown = set(deltas) - set(COUNTERS)
+    if unknown:
+        raise ValueError(f"Unknown usage counters: {', '.join(sorted(unknown))}")
+    deltas = {name: int(value) for name, value in deltas.items() if value}
+    if not deltas:
+        return
+
+    user_id = int(user_id)
+    increments = {name: getattr(UserUsage, name) + value for name, value in deltas.items()}
+    if db.query(UserUsage).filter(UserUsage.user_id == user_id).update(increments, synchronize_session=False):
+        return
+
+    # First usage of this user; if another request inserts the row first, increment it instead
+    try:
+        with db.begin_nested():
+            db.add(UserUsage(user_id=user_id, **{name: deltas.get(name, 0) for name in COUNTERS}))
+    except IntegrityError:
+        db.query(UserUsage).filter(UserUsage.user_id == user_id).update(increments, synchronize_session=False)
+
+
+def get_usage(db: Session, user_id: int) -> Dict[str, int]:
+    """
+    Read a user's usage counters with a single primary key lookup.
+
+    Returns:
+        Counter name -> value (zeros for users without usage)
+    """
+    row = db.get(UserUsage, int(user_id))
+    return {name: int(getattr(row, name)) if row is not None else 0 for name in COUNTERS}
+
+
+def reconcile_usage(db: Session) -> int:
+    """
+    Recompute the counters derived from the analyses table and fix any drift.
+
+    Counters only drift when a change bypassed add_usage (a failed request,
+    a manual database edit); a change committed while this runs is corrected
+    by the next run.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Number of users whose counters were corrected
+    """
+    expected = {
+        user_id: {'analysis_count': count, 'storage_bytes': storage, 'customers_analyzed': customers}
+        for user_id, count, storage, customers in db.query(
+            Analysis.user_id,
+            func.count(Analysis.id),
+            func.coalesce(func.sum(Analysis.file_size), 0),
+            func.coalesce(func.sum(Analysis.total_customers), 0)
+        ).group_by(Analysis.user_id)
+    }
+    rows = {row.user_id: row for row in db.query(UserUsage)}
+    empty = {name: 0 for name in DERIVED_COUNTERS}
+
+    corrected = 0
+    for user_id in expected.keys() | rows.keys():
+        values = expected.get(user_id, empty)
+        row = rows.get(user_id)
+        if row is None:
+            db.add(UserUsage(user_id=user_id, llm_tokens=0, **values))
+        elif any(getattr(row, name) != value for name, value in values.items()):
+            for name, value in values.items():
+                setattr(row, name, value)
+        else:
+            continue
+        corrected += 1
+
+    db.commit()
+    return corrected
+
+
+def _reconcile_in_new_session() -> int:
+    db = SessionLocal()
+    try:
+        return reconcile_usage(db)
+    finally:
+        db.close()
+
+
+async def reconcile_periodically(interval: float) -> None:
+    """
+    Reconcile usage counters now, then every interval seconds, forever.
+
+    The first pass backfills counters of users whose analyses predate them.
+    Meant to run as a background task of the API process; an interval of 0
+    reconciles once and returns.
+    """
+    while True:
+        try:
+            corrected = await run_in_threadpool(_reconcile_in_new_session)
+            if corrected:
+                print(f"Usage counters corrected for {corrected} users.")
+        except Exception as e:
+            print(f"Error reconciling usage counters: {e}")
+        if interval <= 0:
+            return
+        await asyncio.sleep(interval)
@@ -103,6 +103,114 @@ RFM_RULES = {
     }
 }
 
+# RFM Scoring Engine Configuration
+# n_tiles sets the number of score levels per metric (4 = quartiles, 5 = quintiles
+# as described in RFM_RULES["scoring"], 10 = deciles). Custom cut points, given as
+# comma-separated quantile levels (e.g. "0.2,0.5,0.8"), take precedence over n_tiles.
+# A positive decay_half_life_days scores time-decayed frequency and monetary values
+# instead (a transaction that many days old counts half) and assigns customers to
+# first-purchase month cohorts; 0 scores plain counts and sums.
+RFM_SCORING_ENGINE = {
+    "n_tiles": int(os.getenv("RFM_N_TILES", "4")),
+    "cut_points": [float(p) for p in os.getenv("RFM_CUT_POINTS", "").split(",") if p.strip()],
+    "decay_half_life_days": float(os.getenv("RFM_DECAY_HALF_LIFE_DAYS", "0"))
+}
+
+# Quantile Sketch Configuration
+# epsilon is the target rank error of approximate quantiles (0.01 = within 1% of rank)
+QUANTILE_SKETCH_CONFIG = {
+    "epsilon": float(os.getenv("QUANTILE_SKETCH_EPSILON", "0.01"))
+}
+
+# Aggregation Configuration
+# Number of worker processes used to aggregate transactions per customer (1 = single process)
+# and dataframe engine running the analysis pipeline ("pandas" or "polars")
+AGGREGATION_CONFIG = {
+    "n_workers": int(os.getenv("RFM_AGGREGATION_WORKERS", "1")),
+    "engine": os.getenv("RFM_ANALYSIS_ENGINE", "pandas")
+}
+
+# Distributed Analysis Configuration
+# Coordinator and workers authenticate with the shared authkey; TCP workers refuse to start
+# without one. Local clusters generate a random key per run.
+DISTRIBUTED_CONFIG = {
+    "authkey": os.getenv("RFM_CLUSTER_AUTHKEY"),
+    "connect_timeout": float(os.getenv("RFM_CLUSTER_CONNECT_TIMEOUT", "30")),
+    "local_workers": int(os.getenv("RFM_CLUSTER_LOCAL_WORKERS", "2"))
+}
+
+# Preview Configuration
+# Approximate analysis of a customer sample returned on upload, while the exact analysis runs
+PREVIEW_CONFIG = {
+    "enabled": os.getenv("RFM_PREVIEW_ENABLED", "true").lower() == "true",
+    "sample_customers": int(os.getenv("RFM_PREVIEW_SAMPLE_CUSTOMERS", "20000")),
+    "confidence": float(os.getenv("RFM_PREVIEW_CONFIDENCE", "0.95"))
+}
+
+# Batch Scoring Configuration
+BATCH_SCORING_CONFIG = {
+    "chunk_size": int(os.getenv("BATCH_SCORING_CHUNK_SIZE", "100000"))
+}
+
+# Ingestion Configuration
+INGESTION_CONFIG = {
+    "max_workers": int(os.getenv("INGESTION_MAX_WORKERS", str(os.cpu_count() or 1)))
+}
+
+# Customer Store Configuration
+CUSTOMER_STORE_CONFIG = {
+    "row_group_size": int(os.getenv("CUSTOMER_STORE_ROW_GROUP_SIZE", "65536")),
+    "max_page_size": int(os.getenv("CUSTOMER_STORE_MAX_PAGE_SIZE", "10000")),
+    # Rows per record batch (and per Parquet row group) of streamed exports
+    "export_batch_size": int(os.getenv("CUSTOMER_STORE_EXPORT_BATCH_SIZE", "65536"))
+}
+
+# Analysis History Configuration
+# History lists are paginated by keyset (a cursor on the creation date), so a
+# page costs the same however many analyses a user has
+HISTORY_CONFIG = {
+    "page_size": int(os.getenv("HISTORY_PAGE_SIZE", "50")),
+    "max_page_size": int(os.getenv("HISTORY_MAX_PAGE_SIZE", "500"))
+}
+
+# Usage Counters Configuration
+# Per-user usage counters are kept up to date as analyses are created and deleted;
+# a background job recomputes them from the analyses table at startup and every interval
+# (0 reconciles at startup only)
+USAGE_CONFIG = {
+    "reconcile_interval_seconds": int(os.getenv("USAGE_RECONCILE_INTERVAL_SECONDS", "3600"))
+}
+
+# HTTP Caching Configuration
+# Analysis results are always revalidated (ETag, 304 when unchanged), as they are rewritten
+# when insights are regenerated; files written once (batch scores) are reused by clients
+# for immutable_max_age seconds
+HTTP_CACHE_CONFIG = {
+    "immutable_max_age": int(os.getenv("HTTP_CACHE_IMMUTABLE_MAX_AGE", "31536000"))
+}
+
+# Response Compression Configuration
+# Responses of at least minimum_size bytes are compressed with the best encoding the
+# client accepts (zstd, br, gzip); bodies from threadpool_min_size bytes are compressed
+# off the event loop. Levels trade CPU for bytes on the wire (see benchmarks/bench_compression.py)
+COMPRESSION_CONFIG = {
+    "encodings": os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(","),
+    "minimum_size": int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024")),
+    "threadpool_min_size": int(os.getenv("COMPRESSION_THREADPOOL_MIN_SIZE", "262144")),
+    "levels": {
+        "zstd": int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3")),
+        "br": int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")),
+        "gzip": int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    }
+}
+
+# Chart Payload Cache Configuration
+# Chart payloads stored with each analysis are kept serialized in memory for the
+# most recently viewed analyses
+CHART_CACHE_CONFIG = {
+    "max_entries": int(os.getenv("CHART_CACHE_MAX_ENTRIES", "64"))
+}
+
 # OpenAI Prompts
 OPENAI_PROMPTS = {
     "rfm_insights": "Generate strategic insights based on RFM analysis data",
@@ -64,10 +64,34 @@ CREATE TABLE IF NOT EXISTS customer_segments (
     revenue_percentage FLOAT
 );
 
+-- Per-user usage counters, maintained with the analyses
+CREATE TABLE IF NOT EXISTS user_usage (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    analysis_count INTEGER NOT NULL DEFAULT 0,
+    storage_bytes BIGINT NOT NULL DEFAULT 0,
+    customers_analyzed BIGINT NOT NULL DEFAULT 0,
+    llm_tokens BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Analysis history metadata (one row per stored RFM analysis)
+CREATE TABLE IF NOT EXISTS analysis_metadata (
+    id SERIAL PRIMARY KEY,
+    analysis_key VARCHAR(64) UNIQUE NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    file_name VARCHAR(255),
+    segment_type VARCHAR(64),
+    record_count INTEGER,
+    total_customers INTEGER,
+    details TEXT  -- full history entry as JSON
+);
+
 -- Create indexes for better performance
 CREATE INDEX idx_users_email ON users(email);
 CREATE INDEX idx_analyses_user_id ON analyses(user_id);
 CREATE INDEX idx_analyses_analysis_id ON analyses(analysis_id);
+CREATE INDEX idx_analyses_user_date ON analyses(user_id, date_created DESC, id DESC);
+CREATE INDEX idx_analysis_metadata_created ON analysis_metadata(created_at DESC, id DESC);
 CREATE INDEX idx_customer_segments_analysis_id ON customer_segments(analysis_id);
 
 -- Grant permissions